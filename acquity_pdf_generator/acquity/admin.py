@@ -2,7 +2,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Calendar, UserCalendar, AppointmentType, Appointment, PricingSetting
+from .form_fields import ORDER_COLUMNS
+from .models import Calendar, UserCalendar, AppointmentType, Appointment, PricingSetting, SyncLease
 
 # Customize User Admin
 class UserCalendarInline(admin.TabularInline):
@@ -17,7 +18,7 @@ admin.site.register(User, UserAdmin)
 
 @admin.register(Calendar)
 class CalendarAdmin(admin.ModelAdmin):
-    list_display = ['name', 'acuity_calendar_id', 'is_active', 'created_at']
+    list_display = ['name', 'acuity_calendar_id', 'timezone', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'acuity_calendar_id']
 
@@ -38,7 +39,10 @@ class AppointmentAdmin(admin.ModelAdmin):
     list_display = ['client_name', 'calendar', 'appointment_type', 'start_time', 'status', 'price', 'original_timezone', 'display_form_data']
     list_filter = ['status', 'calendar', 'appointment_type', 'start_time', 'original_timezone']
     search_fields = ['client_name', 'client_email', 'acuity_appointment_id']
-    readonly_fields = ['acuity_appointment_id', 'created_at','last_synced', 'form_data', 'original_timezone']
+    # form_fields and the order columns are derived from form_data at sync time,
+    # so they are read-only like their source
+    readonly_fields = ['acuity_appointment_id', 'created_at','last_synced', 'form_data', 'form_fields',
+                       'original_timezone'] + ORDER_COLUMNS
     date_hierarchy = 'start_time'
 
     def display_form_data(self, obj):
@@ -60,3 +64,9 @@ class AppointmentAdmin(admin.ModelAdmin):
     display_form_data.short_description = "Form Data"
 
 admin.site.register(PricingSetting)
+
+@admin.register(SyncLease)
+class SyncLeaseAdmin(admin.ModelAdmin):
+    list_display = ['chunk_key', 'owner', 'shard', 'expires_at', 'last_finished_at', 'last_status']
+    list_filter = ['last_status', 'shard']
+    search_fields = ['chunk_key', 'owner']
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AcquityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'acquity'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .pdf_generator import warm_caches
+        # Styles and the seating image are loaded once here, not in the first render
+        warm_caches()
@@ -0,0 +1,200 @@
+# scheduling/batch_datetimes.py
+"""
+Batch UTC -> local conversion for syncs and backfills.
+
+The syncs parse Acuity datetimes row by row (AcuityService._parse_acuity_datetime
+handles the odd formats); the local time columns of a whole page or backfill
+batch are then computed here with `local_time_columns`. NumPy is optional: with
+it, whole arrays are shifted to local time through per-zone offset transition
+tables; without it the same API falls back to converting one value at a time.
+"""
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+
+from .utils import get_zoneinfo
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_DAY_SECONDS = 86400
+
+
+def _zone_or_none(timezone_str):
+    if not timezone_str:
+        return None
+    try:
+        return get_zoneinfo(timezone_str)
+    except Exception:
+        return None
+
+
+def _offset_seconds(zone, timestamp):
+    return int(datetime.fromtimestamp(timestamp, zone).utcoffset().total_seconds())
+
+
+@lru_cache(maxsize=1024)
+def _year_transitions(timezone_str, year):
+    """
+    UTC offset changes of a zone during one year.
+
+    Returns:
+        tuple: (offset in seconds at the start of the year,
+                tuple of (UTC epoch second, new offset in seconds))
+    """
+    zone = _zone_or_none(timezone_str)
+    start = int(datetime(year, 1, 1, tzinfo=dt_timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=dt_timezone.utc).timestamp())
+    if zone is None:
+        return 0, ()
+    initial = _offset_seconds(zone, start)
+    transitions = []
+    previous_ts, previous_offset = start, initial
+    for day_ts in range(start + _DAY_SECONDS, end + _DAY_SECONDS, _DAY_SECONDS):
+        day_ts = min(day_ts, end)
+        offset = _offset_seconds(zone, day_ts)
+        if offset != previous_offset:
+            # Bisect to the exact second the offset changed
+            low, high = previous_ts, day_ts
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _offset_seconds(zone, middle) == previous_offset:
+                    low = middle
+                else:
+                    high = middle
+            transitions.append((high, offset))
+            previous_offset = offset
+        previous_ts = day_ts
+    return initial, tuple(transitions)
+
+
+def transition_table(timezone_str, first_year, last_year):
+    """
+    Offset transition table of a zone covering `first_year`..`last_year`.
+
+    Returns:
+        tuple: (sorted int64 array of UTC epoch seconds, int64 array of the
+        offset in seconds that applies from each of those instants on). The
+        first entry starts at the smallest int64 so every instant has a row.
+    """
+    initial, _ = _year_transitions(timezone_str, first_year)
+    starts = [np.iinfo(np.int64).min]
+    offsets = [initial]
+    for year in range(first_year, last_year + 1):
+        for transition_ts, offset in _year_transitions(timezone_str, year)[1]:
+            starts.append(transition_ts)
+            offsets.append(offset)
+    return np.array(starts, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def utc_to_local_array(utc, timezone_names):
+    """
+    Shift a datetime64[s] array of UTC instants to local wall-clock time.
+
+    Each zone present is converted in one step: its transition table is
+    searched for all of its instants at once. Unknown zones stay in UTC, as
+    `convert_to_local_time` does.
+    """
+    utc = np.asarray(utc)
+    if utc.dtype.kind != 'M':
+        utc = utc.astype('datetime64[s]')
+    zones = np.asarray(['' if name is None else str(name) for name in timezone_names], dtype=str)
+    local = utc.copy()
+    present = ~np.isnat(utc)
+    if not present.any():
+        return local
+    years = utc[present].astype('datetime64[Y]').astype(np.int64) + 1970
+    first_year, last_year = int(years.min()) - 1, int(years.max()) + 1
+    epoch = utc.astype('datetime64[s]').astype(np.int64)
+    for zone_name in np.unique(zones[present]):
+        if _zone_or_none(zone_name) is None:
+            continue
+        mask = present & (zones == zone_name)
+        starts, offsets = transition_table(str(zone_name), first_year, last_year)
+        rows = np.searchsorted(starts, epoch[mask], side='right') - 1
+        local[mask] = utc[mask] + offsets[rows].astype('timedelta64[s]')
+    return local
+
+
+def _to_datetimes(values):
+    """datetime64 array -> list of naive datetimes (None for NaT)."""
+    return values.astype('datetime64[us]').tolist()
+
+
+def utc_to_local(utc_dt, timezone_str):
+    """Scalar counterpart of `utc_to_local_array` for one aware datetime."""
+    if utc_dt is None:
+        return None
+    if utc_dt.tzinfo is None:
+        utc_dt = utc_dt.replace(tzinfo=dt_timezone.utc)
+    zone = _zone_or_none(timezone_str)
+    if zone is None:
+        return utc_dt.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return utc_dt.astimezone(zone).replace(tzinfo=None)
+
+
+def datetimes_to_local(utc_datetimes, timezone_names):
+    """
+    Convert UTC datetimes (e.g. Appointment.start_time values; naive ones are
+    taken as UTC) to local wall-clock datetimes, vectorized when NumPy is
+    available.
+    """
+    utc_datetimes = list(utc_datetimes)
+    timezone_names = list(timezone_names)
+    if np is None:
+        return [utc_to_local(value, zone) for value, zone in zip(utc_datetimes, timezone_names)]
+    # Naive values are taken as UTC, as Django stores them with TIME_ZONE = 'UTC'
+    naive_utc = [
+        'NaT' if value is None else value if value.tzinfo is None
+        else value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+        for value in utc_datetimes
+    ]
+    utc = np.array(naive_utc, dtype='datetime64[us]')
+    return _to_datetimes(utc_to_local_array(utc, timezone_names))
+
+
+def as_wall_clock(local_dt):
+    """Label a naive wall-clock datetime as UTC so Django stores it unchanged."""
+    if local_dt is None:
+        return None
+    return local_dt.replace(tzinfo=dt_timezone.utc)
+
+
+def local_time_columns(start_times, end_times, timezone_names):
+    """
+    Appointment.local_start_time, local_end_time and local_date for each
+    (start, end, timezone), as stored: wall-clock times labelled UTC.
+
+    Returns:
+        list: (local_start_time, local_end_time, local_date) tuples
+    """
+    timezone_names = list(timezone_names)
+    local_starts = datetimes_to_local([_datetime_or_none(value) for value in start_times], timezone_names)
+    local_ends = datetimes_to_local([_datetime_or_none(value) for value in end_times], timezone_names)
+    return [
+        (as_wall_clock(local_start), as_wall_clock(local_end), local_start.date() if local_start else None)
+        for local_start, local_end in zip(local_starts, local_ends)
+    ]
+
+
+def _datetime_or_none(value):
+    # Unsaved instances may still hold strings; Django converts those on save
+    if isinstance(value, str):
+        from django.utils.dateparse import parse_datetime
+        value = parse_datetime(value)
+    return value if isinstance(value, datetime) else None
+
+
+def fill_local_times(appointments):
+    """Set the local time columns of Appointment instances from start_time, end_time and original_timezone."""
+    appointments = list(appointments)
+    columns = local_time_columns(
+        [appointment.start_time for appointment in appointments],
+        [appointment.end_time for appointment in appointments],
+        [appointment.original_timezone for appointment in appointments],
+    )
+    for appointment, (local_start, local_end, local_date) in zip(appointments, columns):
+        appointment.local_start_time = local_start
+        appointment.local_end_time = local_end
+        appointment.local_date = local_date
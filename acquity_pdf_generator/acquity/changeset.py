@@ -0,0 +1,79 @@
+# scheduling/changeset.py
+
+
+class SyncChangeset:
+    """
+    What an appointment sync changes (or, in dry-run mode, would change).
+
+    - inserts: appointments that do not exist locally yet
+    - updates: acuity id -> {field: (old, new)} for rows whose values differ
+    - cancellations: (acuity id, reason) for local appointments that look
+      cancelled upstream; the sync itself does not cancel them
+    - skipped_chunks: (chunk key, reason) for sync chunks that were not
+      (fully) synced, e.g. leased by another shard
+
+    A real sync keeps only the changed field names (old/new are None) unless
+    `record_diffs` is set, so large syncs do not hold every form_data twice.
+    """
+
+    def __init__(self, record_diffs=True):
+        self.record_diffs = record_diffs
+        self.inserts = []
+        self.updates = {}
+        self.cancellations = []
+        self.skipped_chunks = []
+        self.unchanged = 0
+
+    def add_insert(self, acuity_id, values):
+        self.inserts.append({
+            'acuity_id': acuity_id,
+            'client_name': values.get('client_name', ''),
+            'start_time': values.get('start_time'),
+        })
+
+    def add_update(self, acuity_id, changes):
+        if not self.record_diffs:
+            changes = {field_name: (None, None) for field_name in changes}
+        self.updates[acuity_id] = changes
+
+    def add_cancellation(self, acuity_id, reason):
+        self.cancellations.append((acuity_id, reason))
+
+    def add_skipped_chunk(self, chunk_key, reason):
+        self.skipped_chunks.append((chunk_key, reason))
+
+    @property
+    def changed_acuity_ids(self):
+        """Acuity IDs of appointments that were inserted or updated."""
+        return [insert['acuity_id'] for insert in self.inserts] + list(self.updates)
+
+    def is_empty(self):
+        return not (self.inserts or self.updates or self.cancellations)
+
+    def summary_lines(self, limit=20):
+        """Human readable summary, showing at most `limit` entries per section."""
+        lines = [
+            f"{len(self.inserts)} to insert, {len(self.updates)} to update, "
+            f"{self.unchanged} unchanged, {len(self.cancellations)} candidate cancellations"
+        ]
+        for insert in self.inserts[:limit]:
+            lines.append(f"  + {insert['acuity_id']}: {insert['client_name']} at {insert['start_time']}")
+        for acuity_id, changes in list(self.updates.items())[:limit]:
+            lines.append(f"  ~ {acuity_id}:")
+            for field_name, (old, new) in changes.items():
+                if field_name == 'form_data' or not self.record_diffs:
+                    lines.append(f"      {field_name} changed")
+                else:
+                    lines.append(f"      {field_name}: {_short(old)} -> {_short(new)}")
+        for acuity_id, reason in self.cancellations[:limit]:
+            lines.append(f"  - {acuity_id}: {reason}")
+        if self.skipped_chunks:
+            lines.append(f"{len(self.skipped_chunks)} chunk(s) skipped")
+            for chunk_key, reason in self.skipped_chunks[:limit]:
+                lines.append(f"  ! {chunk_key}: {reason}")
+        return lines
+
+
+def _short(value, width=60):
+    text = repr(value) if isinstance(value, str) else str(value)
+    return text if len(text) <= width else text[:width - 3] + '...'
@@ -0,0 +1,128 @@
+# scheduling/export.py
+"""
+Bulk export of appointment confirmations for a calendar and date range.
+
+Confirmations are rendered in parallel in the render pool (render_pool),
+through the PDF cache so ones that are already rendered are only read, and
+handed out as each one finishes:
+
+- zip: one entry per confirmation, streamed to the client entry by entry
+- pdf: every confirmation merged into one document in start-time order;
+  the merge needs all of them, so it is sent once complete
+
+Used by the export_confirmations view and management command.
+"""
+import zipfile
+from datetime import timedelta
+
+from . import render_pool
+from .form_fields import state_from_address
+from .models import Appointment
+from .pdf_cache import get_confirmation_pdf
+from .utils import local_day_start
+
+EXPORT_FORMATS = ('zip', 'pdf')
+
+
+def export_appointments(calendar, start_date=None, end_date=None):
+    """
+    Active appointments of a calendar whose local start date is within
+    [start_date, end_date], in start order. Also the rows of the calendar
+    report (PDFGenerator.generate_appointment_pdf).
+    """
+    appointments = Appointment.objects.filter(calendar=calendar).exclude(status='cancelled')
+    if start_date:
+        appointments = appointments.filter(local_start_time__gte=local_day_start(start_date))
+    if end_date:
+        appointments = appointments.filter(local_start_time__lt=local_day_start(end_date + timedelta(days=1)))
+    return appointments.select_related('calendar', 'appointment_type').order_by('start_time')
+
+
+def confirmation_filename(appointment):
+    """Download name of a confirmation, e.g. 'June-01-0600pm-JohnSmith-NJ.pdf'."""
+    dt = appointment.local_datetime('start_time') or appointment.start_time
+    month = dt.strftime('%B')  # Full month name
+    day = dt.strftime('%d')    # Day of month
+    time = dt.strftime('%I%M%p').lower()  # 12-hour format, e.g., 0730pm
+    name = appointment.client_name.replace(' ', '').replace('.', '')
+    # State of the event address (extracted at sync time), else from the notes
+    state = appointment.event_state
+    if not state and not appointment.event_address:
+        state = state_from_address(getattr(appointment, 'notes', ''))
+    filename = f"{month}-{day}-{time}-{name}"
+    if state:
+        filename += f"-{state}"
+    return filename + ".pdf"
+
+
+def render_confirmations(appointments, workers=None):
+    """
+    Render confirmations in the shared render pool, in a pool of `workers`
+    processes started for this export, or inline when `workers` is 1.
+
+    Yields:
+        tuple: (appointment, PDF bytes), in the order rendering finishes
+    """
+    if workers == 1:
+        for appointment in appointments:
+            yield appointment, get_confirmation_pdf(appointment)
+        return
+    yield from render_pool.render_confirmations(appointments, workers=workers)
+
+
+class _ZipStream:
+    """Write-only file object that collects what ZipFile writes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(appointments, workers=None):
+    """Yield a ZIP of the confirmations chunk by chunk, one entry per finished render."""
+    stream = _ZipStream()
+    used_names = set()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for appointment, pdf_content in render_confirmations(appointments, workers):
+            filename = confirmation_filename(appointment)
+            if filename in used_names:
+                filename = f"{filename[:-4]}-{appointment.pk}.pdf"
+            used_names.add(filename)
+            archive.writestr(filename, pdf_content)
+            yield stream.drain()
+    # Central directory, written when the archive is closed
+    yield stream.drain()
+
+
+def merged_pdf(appointments, workers=None, output=None):
+    """
+    One PDF with every confirmation, in start-time order. Written into
+    `output` (a binary file) when given, otherwise returned as bytes.
+    """
+    import io
+    from PyPDF2 import PdfReader, PdfWriter
+    appointments = list(appointments)
+    rendered = dict(
+        (appointment.pk, pdf_content) for appointment, pdf_content in render_confirmations(appointments, workers)
+    )
+    writer = PdfWriter()
+    for appointment in appointments:
+        for page in PdfReader(io.BytesIO(rendered.pop(appointment.pk))).pages:
+            writer.add_page(page)
+    if output is not None:
+        writer.write(output)
+        return None
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
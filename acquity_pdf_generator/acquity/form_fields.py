@@ -0,0 +1,158 @@
+# scheduling/form_fields.py
+"""
+Registry of the Acuity intake form fields the app reads.
+
+Each logical field lists the (lowercase) name fragments that identify it,
+with the same matching rules as utils.get_form_field: a form field matches
+when its name contains any fragment, and the first matching form field
+wins. All patterns are compiled into one regex, so a single walk over the
+form field names maps every logical field to its form field; that map is
+cached per form layout, so extracting a form is one dict lookup per field.
+"""
+import math
+import re
+from functools import lru_cache
+
+from .utils import flatten_form_data, normalize_field_name
+
+FORM_FIELD_PATTERNS = {
+    'address': [
+        'full address', 'address', 'location', 'event address',
+        'party address', 'venue address', 'address of the event',
+    ],
+    'adults': ['how many adult', 'number of adults'],
+    'kids': ['how many kid', 'number of children'],
+    'noodle_rice': ['noodle / rice'],
+    'gyoza': ['appetizer: pork gyoza'],
+    'edamame': ['appetizer: edamame'],
+    'filet_mignon': ['filet mignon (upgraded protein)'],
+    'lobster': ['lobster tail (upgraded protein)'],
+    'additional_premium_protein': ['additional premium protein ($15)'],
+    'additional_protein': ['additional protein ($10)'],
+    'travel_fee': ['travel fee', 'travel_fee'],
+    'deposit': ['deposit'],
+    # The fee line shown on confirmations
+    'processing_fee': ['processing fee (if any)'],
+    # Looser match used by the sync for Appointment.processing_fee
+    'processing_fee_any': ['processing fee', 'fee:'],
+    'notes': ['note / allergy / restrictions', 'allergy', 'restrictions', 'notes'],
+    'order': ['order'],
+}
+
+
+def _compile(patterns):
+    # One optional lookahead per logical field: a single match of a field name
+    # reports every logical field whose fragments it contains.
+    lookaheads = ''.join(
+        f"(?:(?=.*?(?P<{field}>{'|'.join(re.escape(fragment) for fragment in fragments)})))?"
+        for field, fragments in patterns.items()
+    )
+    return re.compile('^' + lookaheads, re.DOTALL)
+
+
+FORM_FIELD_MATCHER = _compile(FORM_FIELD_PATTERNS)
+
+
+@lru_cache(maxsize=4096)
+def logical_fields_for(field_name):
+    """Logical fields matched by a normalized form field name (cached per name)."""
+    match = FORM_FIELD_MATCHER.match(field_name)
+    return tuple(field for field, fragment in match.groupdict().items() if fragment is not None)
+
+
+def extract_form_fields(forms):
+    """
+    Extract every registered field in one pass.
+
+    Args:
+        forms: Acuity form data (list of forms) or the flattened dict stored
+            in Appointment.form_fields
+
+    Returns:
+        dict: {logical field: value or None} for every field in FORM_FIELD_PATTERNS
+    """
+    if not isinstance(forms, dict):
+        forms = flatten_form_data(forms)
+    keys = logical_field_keys(tuple(forms))
+    return {field: forms[keys[field]] if field in keys else None for field in FORM_FIELD_PATTERNS}
+
+
+@lru_cache(maxsize=1024)
+def logical_field_keys(field_names):
+    """
+    {logical field: form field name} for a form layout (the tuple of its
+    field names); the first form field matching a logical field wins.
+    """
+    keys = {}
+    for field_name in field_names:
+        for logical_field in logical_fields_for(normalize_field_name(field_name)):
+            keys.setdefault(logical_field, field_name)
+        if len(keys) == len(FORM_FIELD_PATTERNS):
+            break
+    return keys
+
+
+# "..., Newark, NJ 07102" -> "NJ"
+STATE_PATTERN = re.compile(r',\s*([A-Z]{2})\s*\d{5}')
+
+# Largest values the order columns hold: PositiveIntegerField and DecimalField(10, 2).
+# One answer past them would fail the bulk write of a whole sync page.
+MAX_QUANTITY = 2147483647
+MAX_AMOUNT = 99999999.99
+
+
+def parse_quantity(value):
+    """Form quantity ('3', ' 3 ') -> int; blank, non-numeric or out of range answers count as 0."""
+    value = str(value).strip() if value is not None else ''
+    if not value.isdigit():
+        return 0
+    quantity = int(value)
+    if quantity > MAX_QUANTITY:
+        print(f"Warning: ignoring out of range quantity {value!r}")
+        return 0
+    return quantity
+
+
+def parse_amount(value):
+    """Form money/percentage answer -> float, 0.0 when blank, not a number, infinite/NaN or out of range."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if not math.isfinite(amount) or abs(amount) > MAX_AMOUNT:
+        print(f"Warning: ignoring out of range amount {value!r}")
+        return 0.0
+    return amount
+
+
+def state_from_address(address):
+    """Two-letter state of a US address ('..., NJ 07102'), or ''."""
+    match = STATE_PATTERN.search(address or '')
+    return match.group(1) if match else ''
+
+
+def order_columns(form_values):
+    """
+    Typed Appointment order columns from extracted form values (see
+    extract_form_fields), e.g. {'adult_count': 14, 'travel_fee': 50.0, ...}.
+    """
+    address = form_values.get('address') or ''
+    return {
+        'adult_count': parse_quantity(form_values.get('adults')),
+        'kid_count': parse_quantity(form_values.get('kids')),
+        'noodle_rice_count': parse_quantity(form_values.get('noodle_rice')),
+        'gyoza_count': parse_quantity(form_values.get('gyoza')),
+        'edamame_count': parse_quantity(form_values.get('edamame')),
+        'filet_mignon_count': parse_quantity(form_values.get('filet_mignon')),
+        'lobster_count': parse_quantity(form_values.get('lobster')),
+        'additional_premium_protein_count': parse_quantity(form_values.get('additional_premium_protein')),
+        'additional_protein_count': parse_quantity(form_values.get('additional_protein')),
+        'travel_fee': parse_amount(form_values.get('travel_fee')),
+        'deposit': parse_amount(form_values.get('deposit')),
+        'event_address': address,
+        'event_state': state_from_address(address),
+    }
+
+
+# Appointment columns filled by order_columns()
+ORDER_COLUMNS = list(order_columns({}))
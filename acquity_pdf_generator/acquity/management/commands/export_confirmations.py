@@ -0,0 +1,55 @@
+# scheduling/management/commands/export_confirmations.py
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from acquity.export import EXPORT_FORMATS, export_appointments, merged_pdf, stream_zip
+from acquity.models import Calendar
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}'. Please use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = 'Export every appointment confirmation of a calendar and date range as a ZIP or one merged PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('calendar', help='Calendar id, Acuity calendar id or name')
+        parser.add_argument('output', help='File to write')
+        parser.add_argument('--start-date', help='First local date to export (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last local date to export (YYYY-MM-DD), inclusive')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='zip')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Rendering processes started for this export (default: the shared pool of '
+                 'PDF_RENDER_WORKERS; 1 renders inline)',
+        )
+
+    def handle(self, *args, **options):
+        condition = Q(acuity_calendar_id=options['calendar']) | Q(name=options['calendar'])
+        if options['calendar'].isdigit():
+            condition |= Q(id=int(options['calendar']))
+        calendar = Calendar.objects.filter(condition).first()
+        if calendar is None:
+            raise CommandError(f"Calendar '{options['calendar']}' not found")
+
+        appointments = list(export_appointments(
+            calendar, _parse_date(options['start_date']), _parse_date(options['end_date']),
+        ))
+        self.stdout.write(f"Exporting {len(appointments)} confirmation(s) of {calendar.name}...")
+        started = time.monotonic()
+        with open(options['output'], 'wb') as output:
+            if options['format'] == 'zip':
+                for chunk in stream_zip(appointments, options['workers']):
+                    output.write(chunk)
+            else:
+                merged_pdf(appointments, options['workers'], output=output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from acquity.search import rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Recreate the appointment search index triggers and repopulate the index'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f'Nothing to rebuild on {connection.vendor}')
+            return
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt (backend: {search_backend() or "icontains"})'))
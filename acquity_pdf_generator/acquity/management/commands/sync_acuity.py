@@ -65,8 +65,10 @@
 
 
 # scheduling/management/commands/sync_acuity.py
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from acquity.services import AcuityService
+from acquity.prerender import prerender_confirmations
+from acquity.sharding import parse_shard_spec
 
 class Command(BaseCommand):
     help = 'Sync data from Acuity Scheduling API'
@@ -82,10 +84,48 @@ class Command(BaseCommand):
             action='store_true',
             help='Sync only appointments',
         )
+        parser.add_argument(
+            '--shard',
+            help='Sync only shard N of M (e.g. --shard 2/4). Run one process per shard, on one or '
+                 'several hosts; chunks are claimed through the database. Only shard 1 syncs '
+                 'calendars and appointment types.',
+        )
+        parser.add_argument(
+            '--window-days',
+            type=int,
+            help='Split each calendar into date windows of this many days so large calendars '
+                 'are spread across shards too',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Fetch and diff appointments, print the changeset, and write nothing',
+        )
+        parser.add_argument(
+            '--no-prerender',
+            action='store_true',
+            help='Do not render confirmations of new or changed upcoming appointments after the sync '
+                 '(see PDF_PRERENDER_HORIZON_HOURS)',
+        )
 
     def handle(self, *args, **options):
         acuity_service = AcuityService()
+        shard = None
+        if options['shard']:
+            try:
+                shard = parse_shard_spec(options['shard'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        sync_metadata = shard is None or shard[0] == 1
+        window_days = options['window_days']
         
+        if options['dry_run']:
+            self.stdout.write('DRY RUN MODE - No changes will be made')
+            changeset = acuity_service.preview_appointment_sync(shard=shard, window_days=window_days)
+            for line in changeset.summary_lines():
+                self.stdout.write(line)
+            return
+
         try:
             if options['calendars_only']:
                 self.stdout.write('Syncing calendars...')
@@ -94,18 +134,34 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS('Calendars synced successfully'))
             elif options['appointments_only']:
                 self.stdout.write('Syncing appointments...')
-                acuity_service.sync_appointments()
+                changeset = acuity_service.sync_appointments(shard=shard, window_days=window_days)
+                self._report_skipped_chunks(changeset)
+                self._prerender(changeset, options)
                 
                 self.stdout.write(self.style.SUCCESS('Appointments synced successfully'))
             else:
                 self.stdout.write('Syncing all data...')
-                acuity_service.sync_calendars()
-                acuity_service.sync_appointment_types()
-                acuity_service.sync_appointments()
+                if sync_metadata:
+                    acuity_service.sync_calendars()
+                    acuity_service.sync_appointment_types()
+                changeset = acuity_service.sync_appointments(shard=shard, window_days=window_days)
+                self._report_skipped_chunks(changeset)
+                self._prerender(changeset, options)
                 
                 self.stdout.write(self.style.SUCCESS('All data synced successfully'))
                 
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error during sync: {str(e)}')
-            ) 
\ No newline at end of file
+            )
+
+    def _report_skipped_chunks(self, changeset):
+        if changeset.skipped_chunks:
+            self.stdout.write(self.style.WARNING(f'{len(changeset.skipped_chunks)} chunk(s) skipped:'))
+            for chunk_key, reason in changeset.skipped_chunks:
+                self.stdout.write(f'  {chunk_key}: {reason}')
+
+    def _prerender(self, changeset, options):
+        # Inline rather than in a thread: the command exits as soon as handle() returns
+        if not options['no_prerender']:
+            prerender_confirmations(changeset.changed_acuity_ids)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquity', '0013_synclease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendar',
+            name='timezone',
+            field=models.CharField(blank=True, help_text='IANA timezone of the calendar in Acuity, e.g. America/New_York', max_length=64),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.23 on 2026-10-19 00:06
+
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.db import migrations, models
+
+
+def to_local(utc_dt, timezone_str, zones):
+    """Naive wall-clock time of an aware UTC datetime in timezone_str (UTC if unknown)."""
+    if utc_dt is None:
+        return None
+    if timezone_str not in zones:
+        try:
+            zones[timezone_str] = ZoneInfo(timezone_str) if timezone_str else dt_timezone.utc
+        except Exception:
+            zones[timezone_str] = dt_timezone.utc
+    return utc_dt.astimezone(zones[timezone_str]).replace(tzinfo=None)
+
+
+def fill_local_times(apps, schema_editor):
+    """
+    Compute local start/end times and the local date of existing appointments,
+    a few thousand rows at a time. Self-contained, so later changes to the
+    app's datetime helpers do not change what this migration does.
+    """
+    Appointment = apps.get_model('acquity', 'Appointment')
+    batch_size = 2000
+    rows = Appointment.objects.only('id', 'start_time', 'end_time', 'original_timezone').order_by('id')
+    last_id = 0
+    filled = 0
+    zones = {}
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        for appointment in batch:
+            local_start = to_local(appointment.start_time, appointment.original_timezone, zones)
+            local_end = to_local(appointment.end_time, appointment.original_timezone, zones)
+            appointment.local_start_time = local_start.replace(tzinfo=dt_timezone.utc) if local_start else None
+            appointment.local_end_time = local_end.replace(tzinfo=dt_timezone.utc) if local_end else None
+            appointment.local_date = local_start.date() if local_start else None
+        Appointment.objects.bulk_update(batch, ['local_start_time', 'local_end_time', 'local_date'])
+        filled += len(batch)
+        last_id = batch[-1].id
+    print(f"Filled local times for {filled} appointments.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquity', '0014_calendar_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='local_date',
+            field=models.DateField(blank=True, db_index=True, help_text='Event date in original_timezone', null=True),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='local_end_time',
+            field=models.DateTimeField(blank=True, help_text='End time in original_timezone (wall clock)', null=True),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='local_start_time',
+            field=models.DateTimeField(blank=True, help_text='Start time in original_timezone (wall clock)', null=True),
+        ),
+        migrations.RunPython(fill_local_times, migrations.RunPython.noop),
+        # After the backfill, so it does not update the indexes row by row
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['calendar', 'local_start_time'], name='acquity_appt_cal_local_start'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['local_start_time'], name='acquity_appt_local_start'),
+        ),
+    ]
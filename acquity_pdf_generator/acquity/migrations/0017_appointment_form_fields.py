@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+def flatten_form_data(forms):
+    """{stripped, lowercased field name: value}, the first field winning (acquity.utils as of this migration)."""
+    fields = {}
+    for form in forms or []:
+        for field in form.get('values', []):
+            fields.setdefault((field.get('name', '') or '').strip().lower(), field.get('value'))
+    return fields
+
+
+def fill_form_fields(apps, schema_editor):
+    """Flatten form_data of existing appointments into form_fields."""
+    Appointment = apps.get_model('acquity', 'Appointment')
+    batch = []
+    for appointment in Appointment.objects.only('id', 'form_data').iterator(chunk_size=2000):
+        appointment.form_fields = flatten_form_data(appointment.form_data if isinstance(appointment.form_data, list) else [])
+        batch.append(appointment)
+        if len(batch) >= 2000:
+            Appointment.objects.bulk_update(batch, ['form_fields'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['form_fields'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquity', '0015_appointment_local_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='form_fields',
+            field=models.JSONField(blank=True, default=dict, help_text='Form fields by normalized name, built from form_data'),
+        ),
+        migrations.RunPython(fill_form_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,168 @@
+# Generated by Django 4.2.23 on 2026-10-19 00:11
+
+import math
+import re
+
+from django.db import migrations, models
+
+# Frozen copies of acquity.form_fields as of this migration: the columns it adds and how
+# they are parsed. Later changes to the app's registry must not change this migration.
+FORM_FIELD_PATTERNS = {
+    'address': [
+        'full address', 'address', 'location', 'event address',
+        'party address', 'venue address', 'address of the event',
+    ],
+    'adults': ['how many adult', 'number of adults'],
+    'kids': ['how many kid', 'number of children'],
+    'noodle_rice': ['noodle / rice'],
+    'gyoza': ['appetizer: pork gyoza'],
+    'edamame': ['appetizer: edamame'],
+    'filet_mignon': ['filet mignon (upgraded protein)'],
+    'lobster': ['lobster tail (upgraded protein)'],
+    'additional_premium_protein': ['additional premium protein ($15)'],
+    'additional_protein': ['additional protein ($10)'],
+    'travel_fee': ['travel fee', 'travel_fee'],
+    'deposit': ['deposit'],
+}
+QUANTITY_COLUMNS = {
+    'adult_count': 'adults',
+    'kid_count': 'kids',
+    'noodle_rice_count': 'noodle_rice',
+    'gyoza_count': 'gyoza',
+    'edamame_count': 'edamame',
+    'filet_mignon_count': 'filet_mignon',
+    'lobster_count': 'lobster',
+    'additional_premium_protein_count': 'additional_premium_protein',
+    'additional_protein_count': 'additional_protein',
+}
+AMOUNT_COLUMNS = {'travel_fee': 'travel_fee', 'deposit': 'deposit'}
+ORDER_COLUMNS = list(QUANTITY_COLUMNS) + list(AMOUNT_COLUMNS) + ['event_address', 'event_state']
+STATE_PATTERN = re.compile(r',\s*([A-Z]{2})\s*\d{5}')
+MAX_QUANTITY = 2147483647
+MAX_AMOUNT = 99999999.99
+
+
+def form_values(form_fields):
+    """{logical field: value of the first form field whose name contains one of its fragments}"""
+    values = {}
+    for field_name, value in form_fields.items():
+        name = (field_name or '').strip().lower()
+        for logical_field, fragments in FORM_FIELD_PATTERNS.items():
+            if logical_field not in values and any(fragment in name for fragment in fragments):
+                values[logical_field] = value
+    return values
+
+
+def parse_quantity(value):
+    value = str(value).strip() if value is not None else ''
+    return int(value) if value.isdigit() and int(value) <= MAX_QUANTITY else 0
+
+
+def parse_amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return amount if math.isfinite(amount) and abs(amount) <= MAX_AMOUNT else 0.0
+
+
+def order_columns(form_fields):
+    values = form_values(form_fields)
+    address = values.get('address') or ''
+    state = STATE_PATTERN.search(address)
+    columns = {column: parse_quantity(values.get(field)) for column, field in QUANTITY_COLUMNS.items()}
+    columns.update({column: parse_amount(values.get(field)) for column, field in AMOUNT_COLUMNS.items()})
+    columns['event_address'] = address
+    columns['event_state'] = state.group(1) if state else ''
+    return columns
+
+
+def fill_order_columns(apps, schema_editor):
+    """Extract the typed order columns of existing appointments from their form fields."""
+    Appointment = apps.get_model('acquity', 'Appointment')
+    batch = []
+    for appointment in Appointment.objects.only('id', 'form_fields').iterator(chunk_size=2000):
+        for column, value in order_columns(appointment.form_fields or {}).items():
+            setattr(appointment, column, value)
+        batch.append(appointment)
+        if len(batch) >= 2000:
+            Appointment.objects.bulk_update(batch, ORDER_COLUMNS)
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ORDER_COLUMNS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquity', '0017_appointment_form_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='additional_premium_protein_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='additional_protein_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='adult_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='deposit',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='edamame_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='event_address',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='event_state',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='filet_mignon_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='gyoza_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='kid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='lobster_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='noodle_rice_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='travel_fee',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(fill_order_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.23 on 2026-10-19 00:13
+
+from django.db import migrations
+
+# Frozen copy of acquity.search as of this migration, so later changes to the
+# app's search module do not change what this migration creates.
+FTS_TABLE = 'acquity_appointment_fts'
+SEARCH_COLUMNS = ['client_name', 'client_email', 'client_phone', 'event_address', 'notes']
+PG_SEARCH_EXPRESSION = "lower(" + " || ' ' || ".join(
+    f"coalesce({column}, '')" for column in SEARCH_COLUMNS
+) + ")"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        columns = ', '.join(SEARCH_COLUMNS)
+        new_values = ', '.join(f"new.{column}" for column in SEARCH_COLUMNS)
+        try:
+            schema_editor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns})")
+        except Exception as e:
+            print(f"SQLite FTS5 is not available ({e}); dashboard search will use icontains.")
+            return
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON acquity_appointment BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON acquity_appointment BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END"
+        )
+        # Only the searched columns: sync updates that just bump last_synced leave the index alone
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {columns} ON acquity_appointment BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) SELECT id, {columns} FROM acquity_appointment"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS acquity_appointment_search_trgm ON acquity_appointment "
+            f"USING gin (({PG_SEARCH_EXPRESSION}) gin_trgm_ops)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS acquity_appointment_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquity', '0018_appointment_order_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
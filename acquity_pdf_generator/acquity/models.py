@@ -8,6 +8,7 @@ class Calendar(models.Model):
     name = models.CharField(max_length=200)
     acuity_calendar_id = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True)
+    timezone = models.CharField(max_length=64, blank=True, help_text="IANA timezone of the calendar in Acuity, e.g. America/New_York")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -41,6 +42,10 @@ class AppointmentType(models.Model):
     def __str__(self):
         return f"{self.name} (${self.price})"
 
+# Appointment.local_* columns and the fields they are computed from
+LOCAL_TIME_FIELDS = {'local_start_time', 'local_end_time', 'local_date'}
+LOCAL_TIME_SOURCE_FIELDS = {'start_time', 'end_time', 'original_timezone'}
+
 class Appointment(models.Model):
     acuity_appointment_id = models.CharField(max_length=50, unique=True)
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
@@ -69,16 +74,51 @@ class Appointment(models.Model):
     # Custom form data from Acuity
     form_data = models.JSONField(default=dict, blank=True)
 
+    # form_data flattened once at sync time to {lowercased field name: value}, so
+    # lookups are a dict access and fields can be queried in SQL, e.g.
+    # Appointment.objects.filter(**{'form_fields__lobster tail (upgraded protein)__gt': '0'})
+    form_fields = models.JSONField(default=dict, blank=True,
+                                   help_text="Form fields by normalized name, built from form_data")
+
     # Color tag from Acuity
     color_tag = models.CharField(max_length=32, blank=True, default="")
 
     # Processing fee multiplier (e.g., 1.04 for 4% fee)
     processing_fee = models.FloatField(default=0.0, help_text="Multiplier for processing fee (e.g., 1.04 for 4% fee)")
     
+    # Order details extracted from form_data at sync time (see form_fields.order_columns)
+    # so reports and filters can aggregate them in SQL
+    adult_count = models.PositiveIntegerField(default=0)
+    kid_count = models.PositiveIntegerField(default=0)
+    noodle_rice_count = models.PositiveIntegerField(default=0)
+    gyoza_count = models.PositiveIntegerField(default=0)
+    edamame_count = models.PositiveIntegerField(default=0)
+    filet_mignon_count = models.PositiveIntegerField(default=0)
+    lobster_count = models.PositiveIntegerField(default=0, db_index=True)
+    additional_premium_protein_count = models.PositiveIntegerField(default=0)
+    additional_protein_count = models.PositiveIntegerField(default=0)
+    travel_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    deposit = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    event_address = models.TextField(blank=True, default="")
+    event_state = models.CharField(max_length=2, blank=True, default="", db_index=True)
+
     # Original timezone from Acuity (e.g., 'America/New_York', 'America/Los_Angeles')
     # This is needed to display times correctly regardless of server timezone
     original_timezone = models.CharField(max_length=50, blank=True, default="", 
                                        help_text="Original timezone from Acuity (e.g., America/New_York)")
+
+    # Start/end as wall-clock time in original_timezone, kept in step by save()
+    # (and the bulk sync) so pages and reports need no per-row conversion.
+    # With USE_TZ the field needs an aware value, so the wall clock is stored
+    # labelled as UTC: 18:00 in New York is saved as 18:00+00:00. These are not
+    # instants; read them with strftime and compare them only with other
+    # wall-clock values (utils.local_day_start), never convert them again.
+    local_start_time = models.DateTimeField(null=True, blank=True,
+                                            help_text="Start time in original_timezone (wall clock)")
+    local_end_time = models.DateTimeField(null=True, blank=True,
+                                          help_text="End time in original_timezone (wall clock)")
+    local_date = models.DateField(null=True, blank=True, db_index=True,
+                                  help_text="Event date in original_timezone")
     
     # Tracking
     created_at = models.DateTimeField(auto_now_add=True)
@@ -88,8 +128,35 @@ class Appointment(models.Model):
     def __str__(self):
         return f"{self.client_name} - {self.start_time.strftime('%Y-%m-%d %H:%M')}"
 
+    def save(self, *args, **kwargs):
+        # Every writer (admin, shell, create()) keeps the local time columns in step
+        from .batch_datetimes import fill_local_times
+        fill_local_times([self])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & LOCAL_TIME_SOURCE_FIELDS:
+            kwargs['update_fields'] = set(update_fields) | LOCAL_TIME_FIELDS
+        super().save(*args, **kwargs)
+
+    def local_datetime(self, field_name='start_time'):
+        """
+        Return start_time or end_time as wall-clock time of the event.
+
+        Uses the precomputed local column when it is filled, otherwise
+        converts the UTC value into original_timezone.
+        """
+        local_value = getattr(self, f'local_{field_name}', None)
+        if local_value is not None:
+            return local_value
+        from .utils import convert_to_local_time
+        return convert_to_local_time(getattr(self, field_name, None), self.original_timezone)
+
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Date filters are half-open ranges on local_start_time (see utils.local_day_start)
+            models.Index(fields=['calendar', 'local_start_time'], name='acquity_appt_cal_local_start'),
+            models.Index(fields=['local_start_time'], name='acquity_appt_local_start'),
+        ]
 
 class PDFGenerationLog(models.Model):
     """Logs each time a PDF is generated for an appointment."""
@@ -126,3 +193,21 @@ class PricingSetting(models.Model):
 
     def __str__(self):
         return f"{self.category} - {self.price} {self.currency}"
+
+class SyncLease(models.Model):
+    """
+    Database lease for one sync chunk (a calendar, or a calendar + date window).
+
+    Sharded `sync_acuity --shard N/M` processes claim chunks through this table
+    so that two cooperating processes never sync the same chunk at once.
+    """
+    chunk_key = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=200, blank=True, default="")
+    shard = models.CharField(max_length=20, blank=True, default="")
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True, default="")
+
+    def __str__(self):
+        return f"{self.chunk_key} ({self.owner or 'free'})"
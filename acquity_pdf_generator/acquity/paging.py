@@ -0,0 +1,175 @@
+# scheduling/paging.py
+import sys
+import time
+
+from django.conf import settings
+
+# Decoded JSON (dicts, strs) takes several times the bytes of the raw response.
+DECODED_BYTES_FACTOR = 5
+
+# The single request the syncs made before paging adapted. Until Acuity is known to
+# honour `page` (ACUITY_PAGE_PARAM_SUPPORTED), pages are never smaller than this.
+UNPAGED_PAGE_SIZE = 2000
+
+
+def _floor_power_of_two(value):
+    value = max(int(value), 1)
+    return 1 << (value.bit_length() - 1)
+
+
+class AdaptivePageSizer:
+    """
+    Picks the `max` for each Acuity /appointments page from what the previous
+    pages cost.
+
+    Acuity pages by number (page N of size S starts at row (N-1)*S), so sizes
+    are kept to powers of two and only grow when the rows fetched so far are a
+    multiple of the new size; the next page number then always lines up with
+    the rows already fetched.
+
+    - Memory: a page may not decode to more than the configured ceiling, based
+      on the bytes per row seen so far (long intake forms make rows huge).
+    - Latency: pages slower than the target halve the size, full pages much
+      faster than the target double it.
+
+    All of this relies on Acuity honouring `page`. Unless `page_param_supported`
+    (ACUITY_PAGE_PARAM_SUPPORTED) says it does, the size is fixed at
+    UNPAGED_PAGE_SIZE, the one request per query the syncs always made, and
+    neither limit applies: a page that decodes past the memory ceiling is only
+    reported (see print_page_mode).
+    """
+
+    def __init__(self, initial=None, min_size=None, max_size=None, memory_ceiling_mb=None, target_seconds=None,
+                 page_param_supported=None):
+        self.min_size = _floor_power_of_two(min_size or getattr(settings, 'ACUITY_PAGE_SIZE_MIN', 32))
+        self.max_size = _floor_power_of_two(max_size or getattr(settings, 'ACUITY_PAGE_SIZE_MAX', 2048))
+        ceiling_mb = memory_ceiling_mb or getattr(settings, 'ACUITY_SYNC_MEMORY_CEILING_MB', 256)
+        self.memory_ceiling_bytes = ceiling_mb * 1024 * 1024
+        self.target_seconds = target_seconds or getattr(settings, 'ACUITY_PAGE_TARGET_SECONDS', 2.0)
+        initial = initial or getattr(settings, 'ACUITY_PAGE_SIZE_INITIAL', 256)
+        self.size = min(max(_floor_power_of_two(initial), self.min_size), self.max_size)
+        if page_param_supported is None:
+            page_param_supported = getattr(settings, 'ACUITY_PAGE_PARAM_SUPPORTED', False)
+        self.adaptive = bool(page_param_supported)
+        if not self.adaptive:
+            self.min_size = self.max_size = self.size = UNPAGED_PAGE_SIZE
+        self.rows_requested = 0
+        self.bytes_per_row = None
+        self.peak_page_bytes = 0
+        self.over_ceiling_reported = False
+
+    @property
+    def page(self):
+        """The 1-based page number for the next request at the current size."""
+        return self.rows_requested // self.size + 1
+
+    def record(self, rows, response_bytes, seconds):
+        """Account for a page of `self.size` that returned `rows` rows and pick the next size."""
+        self.rows_requested += self.size
+        self.peak_page_bytes = max(self.peak_page_bytes, response_bytes)
+        if rows:
+            observed = response_bytes / rows
+            if self.bytes_per_row is None:
+                self.bytes_per_row = observed
+            else:
+                # Weighted towards the latest page, but one odd page does not swing the size
+                self.bytes_per_row = 0.7 * observed + 0.3 * self.bytes_per_row
+
+        if not self.adaptive:
+            decoded_bytes = response_bytes * DECODED_BYTES_FACTOR
+            if decoded_bytes > self.memory_ceiling_bytes and not self.over_ceiling_reported:
+                self.over_ceiling_reported = True
+                print(f"Warning: a page of {rows} appointments decodes to about {decoded_bytes / (1024 * 1024):.0f} MB, "
+                      f"over the {self.memory_ceiling_bytes // (1024 * 1024)} MB sync memory ceiling; pages can "
+                      f"only shrink once ACUITY_PAGE_PARAM_SUPPORTED is enabled.")
+            return
+
+        desired = self.size
+        if seconds > self.target_seconds * 1.5:
+            desired = self.size // 2
+        elif seconds < self.target_seconds / 2 and rows >= self.size:
+            desired = self.size * 2
+        if self.bytes_per_row:
+            memory_rows = self.memory_ceiling_bytes / (self.bytes_per_row * DECODED_BYTES_FACTOR)
+            desired = min(desired, _floor_power_of_two(memory_rows))
+        desired = min(max(desired, self.min_size), self.max_size)
+
+        # Growing is only possible once the rows fetched so far line up with the bigger size
+        while desired > self.size and self.rows_requested % desired:
+            desired //= 2
+        self.size = desired
+
+
+def print_page_mode(sizer):
+    """Print how a sync's pages are sized, with a warning when adaptive paging is off."""
+    if sizer.adaptive:
+        print(f"Page size: adaptive, first page {sizer.size} rows "
+              f"(memory ceiling {sizer.memory_ceiling_bytes // (1024 * 1024)} MB)")
+    else:
+        print(f"Warning: adaptive paging is off (ACUITY_PAGE_PARAM_SUPPORTED is False): every page asks for "
+              f"{UNPAGED_PAGE_SIZE} rows and the sync memory ceiling is not applied.")
+
+
+class AppointmentPager:
+    """
+    Iterates an Acuity /appointments query page by page, sized by an AdaptivePageSizer.
+
+    `fetch(params)` performs the request and returns the `requests` response;
+    errors propagate to the caller. Iterating yields (page_number, appointments,
+    page_stats). Paging stops on an empty page, after a short page (fewer rows
+    than the `max` it asked for), on a page that repeats appointments already
+    seen, or after `max_pages` pages. `complete` is True only in the first two
+    cases, i.e. when the end of the query was reached: a repeated page means
+    Acuity ignored `page`, so rows past the first page were never fetched.
+    """
+
+    def __init__(self, fetch, params, sizer=None, max_pages=1000):
+        self.fetch = fetch
+        self.params = params
+        self.sizer = sizer or AdaptivePageSizer()
+        self.max_pages = max_pages
+        self.pages = 0
+        self.complete = False
+
+    def __iter__(self):
+        seen_ids = set()
+        while self.pages < self.max_pages:
+            page_params = dict(self.params, page=self.sizer.page, max=self.sizer.size)
+            started = time.monotonic()
+            response = self.fetch(page_params)
+            response.raise_for_status()
+            appointments = response.json()
+            page_stats = {
+                'max': page_params['max'],
+                'bytes': len(response.content),
+                'seconds': time.monotonic() - started,
+            }
+            self.sizer.record(len(appointments), page_stats['bytes'], page_stats['seconds'])
+            self.pages += 1
+            if not appointments:
+                self.complete = True
+                return
+            batch_ids = {apt.get('id') for apt in appointments}
+            if batch_ids & seen_ids:
+                print(f"Warning: Page {self.pages} repeats appointments already fetched; Acuity may be "
+                      f"ignoring the page parameter. Some appointments may not be fetched.")
+                return
+            seen_ids.update(batch_ids)
+            yield self.pages, appointments, page_stats
+            if len(appointments) < page_params['max']:
+                self.complete = True
+                return
+        print(f"Warning: Reached maximum page limit ({self.max_pages}). Some appointments may not be fetched.")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
@@ -0,0 +1,156 @@
+# scheduling/pdf_cache.py
+"""
+Content-addressed cache of appointment confirmation PDFs.
+
+A confirmation is stored under the sha256 of everything it is rendered
+from: the appointment's form data, times, timezone, client fields and order
+columns, the PricingSetting rows of its calendar (and the global ones, from
+its pricing snapshot), and CONFIRMATION_TEMPLATE_VERSION. Confirmations are built with ReportLab's
+invariant mode, so the same inputs always give the same bytes.
+
+Files live under settings.PDF_CACHE_DIR as <appointment id>/<key>.pdf. A
+changed appointment or price gives a new key, so a stale file is never
+served; the signal handlers (and the bulk sync) also remove files that can
+no longer be hit.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+
+from .form_fields import ORDER_COLUMNS
+from .models import Appointment
+from .pdf_generator import CONFIRMATION_TEMPLATE_VERSION, PDFGenerator
+from .pricing import pricing_snapshot
+
+# Appointment fields printed on (or used to compute) the confirmation
+CONFIRMATION_FIELDS = [
+    'client_name', 'client_email', 'client_phone', 'notes', 'form_data',
+    'start_time', 'end_time', 'original_timezone', 'local_start_time', 'calendar_id',
+] + ORDER_COLUMNS
+
+
+def cache_dir():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', None) or Path(settings.BASE_DIR) / 'pdf_cache')
+
+
+# Amount columns, hashed as '12.50' whether the value is an int, float or Decimal
+_AMOUNT_FIELDS = {
+    field.attname for field in Appointment._meta.concrete_fields if isinstance(field, models.DecimalField)
+}
+
+
+def _canonical(field_name, value):
+    # Saved and freshly synced (unsaved) appointments must hash alike
+    if field_name in _AMOUNT_FIELDS and value is not None:
+        return f"{Decimal(str(value)):.2f}"
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(dt_timezone.utc).isoformat()
+    return value
+
+
+def confirmation_cache_key(appointment):
+    """sha256 of the rendered inputs of an appointment's confirmation."""
+    content = {
+        'template': CONFIRMATION_TEMPLATE_VERSION,
+        'appointment': {
+            field: _canonical(field, getattr(appointment, field, None)) for field in CONFIRMATION_FIELDS
+        },
+        'pricing': pricing_snapshot(getattr(appointment, 'calendar_id', None)).rows,
+    }
+    encoded = json.dumps(content, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+# Renders open_confirmation_file tries before rendering in memory
+OPEN_ATTEMPTS = 3
+
+
+def confirmation_path(appointment, key=None):
+    return cache_dir() / str(appointment.pk) / f"{key or confirmation_cache_key(appointment)}.pdf"
+
+
+def get_confirmation_file(appointment, generator=None):
+    """
+    Path of the cached confirmation of a saved appointment, rendered straight
+    into the cache only when there is no file for its current inputs.
+    """
+    path = confirmation_path(appointment)
+    if not path.exists():
+        _render_into_cache(appointment, path, generator or PDFGenerator())
+    return path
+
+
+def open_confirmation_file(appointment, generator=None):
+    """
+    The cached confirmation of a saved appointment, opened for reading.
+
+    Opening is part of the lookup: a discard_confirmations or
+    clear_confirmations running concurrently (signals, the bulk sync, a
+    pricing change) can remove the file between a check and a later open,
+    but not an open file. A file removed before it is opened is rendered
+    again; after OPEN_ATTEMPTS the confirmation is rendered in memory.
+    """
+    generator = generator or PDFGenerator()
+    for attempt in range(OPEN_ATTEMPTS):
+        path = confirmation_path(appointment)
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            pass
+        try:
+            _render_into_cache(appointment, path, generator)
+        except FileNotFoundError:
+            # The cache directory was removed while rendering
+            continue
+    return io.BytesIO(generator.generate_appointment_confirmation(appointment))
+
+
+def get_confirmation_pdf(appointment, generator=None):
+    """Confirmation PDF bytes of a saved appointment (see open_confirmation_file)."""
+    with open_confirmation_file(appointment, generator) as pdf_file:
+        return pdf_file.read()
+
+
+def _render_into_cache(appointment, path, generator):
+    """Render a confirmation into `path`, replacing the appointment's older versions."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale in path.parent.glob('*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    # Written to a temporary file and renamed, so a concurrent download never reads a partial file
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            generator.generate_appointment_confirmation(appointment, output=temp_file)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def discard_confirmations(appointment_ids):
+    """Remove the cached confirmations of these appointments."""
+    root = cache_dir()
+    for appointment_id in appointment_ids:
+        shutil.rmtree(root / str(appointment_id), ignore_errors=True)
+
+
+def clear_confirmations():
+    """Remove every cached confirmation (e.g. after a pricing change)."""
+    # Only the per-appointment directories: the pricing version file stays
+    try:
+        entries = list(os.scandir(cache_dir()))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
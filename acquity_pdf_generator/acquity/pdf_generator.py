@@ -1,119 +1,445 @@
 # scheduling/pdf_generator.py
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.platypus import HRFlowable
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Image
+from reportlab.platypus import HRFlowable, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+import reportlab
+try:
+    # Private: the hash drawImage names images by (see StaticImage)
+    from reportlab.lib.utils import _digester
+except ImportError:
+    _digester = None
+from django.conf import settings
 from django.http import HttpResponse
 from django.utils import timezone
 import io
-from .models import PricingSetting
-from acquity.utils import get_form_field
+import threading
+from pathlib import Path
+from .pricing import PricingSnapshot, pricing_snapshot, pricing_version
+from acquity.utils import flatten_form_data
+from acquity.form_fields import ORDER_COLUMNS, extract_form_fields, order_columns, parse_amount
 import re
+import hashlib
+import json
 from acquity.openai_utils import extract_guest_counts_with_gpt
 
-class PDFGenerator:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.title_style = ParagraphStyle(
+# Page setup of appointment confirmations
+CONFIRMATION_MARGINS = dict(rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=18)
+CONFIRMATION_FONT_SIZES = (8, 9, 10, 11, 12)
+# Bump when the confirmation layout changes, so cached PDFs (pdf_cache) are re-rendered
+CONFIRMATION_TEMPLATE_VERSION = 2
+# Frame padding SimpleDocTemplate puts inside the margins
+FRAME_PADDING = 6
+
+# Page setup and columns of the calendar report
+REPORT_MARGINS = dict(rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+REPORT_COLUMNS = ['Client', 'Service', 'Date & Time', 'Duration', 'Status', 'Price']
+REPORT_COL_WIDTHS = [1.5*inch, 1.5*inch, 1.5*inch, 0.8*inch, 0.8*inch, 0.8*inch]
+REPORT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 1), (0, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white]),
+])
+
+# Layout signature -> (font_size, spacing) that fit on one page
+_FONT_SIZE_CACHE = {}
+FONT_SIZE_CACHE_LIMIT = 10000
+
+SEATING_IMAGE_PATH = Path(settings.BASE_DIR) / 'seating_arrangement.png'
+# Drawn size of the seating image (points), and the pixels per point it is downscaled to
+SEATING_IMAGE_SIZE = (200, 80)
+IMAGE_PIXELS_PER_POINT = 3
+# ReportLab major versions whose drawImage naming StaticImage reproduces; others draw plainly
+STATIC_IMAGE_REPORTLAB_VERSIONS = ('3', '4', '5')
+
+# Process-wide caches of what every render reuses (filled by warm_caches or on first use).
+# Styles are only read while a document is built, so renders share them.
+_SAMPLE_STYLES = None
+_CONFIRMATION_STYLES = {}
+_CONFIRMATION_TABLE_STYLES = {}
+_ENCODED_IMAGES = {}
+# Per thread: StaticRegion key -> laid out flowable
+_STATIC_REGIONS = threading.local()
+
+
+def sample_styles():
+    """ReportLab's sample style sheet, built once per process."""
+    global _SAMPLE_STYLES
+    if _SAMPLE_STYLES is None:
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(
             'CustomTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=24,
             spaceAfter=30,
             textColor=colors.darkblue,
             alignment=1  # Center alignment
-        )
+        ))
+        _SAMPLE_STYLES = styles
+    return _SAMPLE_STYLES
+
+
+def confirmation_styles(font_size):
+    """Paragraph styles of a confirmation laid out at `font_size`."""
+    styles = _CONFIRMATION_STYLES.get(font_size)
+    if styles is None:
+        dark = colors.HexColor('#222222')
+        styles = {
+            'company_title': ParagraphStyle(
+                'CompanyTitle', fontSize=font_size+12, fontName='Helvetica-Bold', textColor=dark, alignment=0, spaceAfter=0, spaceBefore=0
+            ),
+            'seating_label': ParagraphStyle(
+                'SeatingLabel', fontSize=font_size-1, fontName='Helvetica-Bold', textColor=dark, alignment=1, leading=font_size+1, spaceAfter=0, spaceBefore=0, wordWrap='LTR'
+            ),
+            'note': ParagraphStyle('Normal', fontSize=font_size, leading=font_size+2),
+            'contact': ParagraphStyle('Contact', fontSize=font_size, fontName='Helvetica-Bold', textColor=colors.black),
+            'order_heading': ParagraphStyle('OrderDetailsHeading', fontSize=font_size, fontName='Helvetica-Bold', alignment=0, spaceAfter=2),
+            'fee_label': ParagraphStyle('Normal', fontSize=font_size, alignment=0, leftIndent=0),
+            'deposit_note': ParagraphStyle('DepositNote', fontSize=font_size-2, fontName='Helvetica', alignment=0, textColor=colors.HexColor('#666666'), spaceBefore=1),
+            'side_note': ParagraphStyle('NoteStyle', fontSize=font_size-1, leading=font_size+1, wordWrap='CJK', fontName='Helvetica-Bold', alignment=0),
+            'website': ParagraphStyle('Normal', fontSize=font_size, alignment=0, spaceBefore=1, spaceAfter=1),
+            'fine_print': ParagraphStyle('Normal', fontSize=font_size-2, alignment=0, spaceBefore=1, spaceAfter=1),
+            'phones': ParagraphStyle('Normal', fontSize=font_size-2, alignment=0, spaceBefore=1, spaceAfter=1, textColor=colors.black),
+        }
+        _CONFIRMATION_STYLES[font_size] = styles
+    return styles
+
+
+def confirmation_table_styles(font_size, spacing):
+    """TableStyles of a confirmation laid out at `font_size` with `spacing`."""
+    key = (font_size, spacing)
+    styles = _CONFIRMATION_TABLE_STYLES.get(key)
+    if styles is None:
+        header = [
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (0,0), (0,0), 'LEFT'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT'),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+            ('TOPPADDING', (0,0), (-1,-1), 0),
+        ]
+        styles = {
+            'image_col': TableStyle([
+                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+                ('TOPPADDING', (0,0), (-1,-1), 0),
+            ]),
+            'header': TableStyle(header),
+            'header_with_note': TableStyle(header + [
+                # Style the note box row with minimal spacing
+                ('BACKGROUND', (0,1), (0,1), colors.HexColor('#f9f9c5')),
+                ('BOX', (0,1), (0,1), 1, colors.black),
+                ('LEFTPADDING', (0,1), (0,1), spacing//2),  # Reduced left padding
+                ('RIGHTPADDING', (0,1), (0,1), spacing//2),  # Reduced right padding
+                ('TOPPADDING', (0,1), (0,1), 1),  # Minimal top padding (1 pixel)
+                ('BOTTOMPADDING', (0,1), (0,1), spacing*8),  # Reduced bottom padding
+                # Remove any row spacing
+                ('ROWBREAKS', (0,0), (-1,-1), 0),
+            ]),
+            'contact': TableStyle([
+                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#cccccc')),
+                ('TEXTCOLOR', (0,0), (-1,-1), colors.black),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0,0), (-1,-1), font_size),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('BOTTOMPADDING', (0,0), (-1,-1), spacing//2),
+                ('TOPPADDING', (0,0), (-1,-1), spacing//2),
+            ]),
+            # Address and event details boxes
+            'details': TableStyle([
+                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f2f2f2')),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), 9),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+                ('TOPPADDING', (0,0), (-1,-1), 2),
+            ]),
+            'order_details': TableStyle([
+                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f2f2f2')),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), 8),
+                ('GRID', (0,0), (-1,-1), 1, colors.grey),
+                ('TOPPADDING', (0,0), (-1,-1), 2),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+                ('LEFTPADDING', (0,0), (-1,-1), 2),
+                ('RIGHTPADDING', (0,0), (-1,-1), 2),
+            ]),
+            'order': TableStyle([
+                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f2f2f2')),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), font_size),
+                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+                ('TOPPADDING', (0,0), (-1,-1), spacing//2),
+                ('BOTTOMPADDING', (0,0), (-1,-1), spacing//2),
+                ('LEFTPADDING', (0,0), (-1,-1), 8),
+                ('RIGHTPADDING', (0,0), (-1,-1), 0),
+            ]),
+            'deposit_cell': TableStyle([
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+                ('LEFTPADDING', (0,0), (-1,-1), 0),
+                ('RIGHTPADDING', (0,0), (-1,-1), 0),
+                ('TOPPADDING', (0,0), (-1,-1), 0),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+            ]),
+            'fees': TableStyle([
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('LEFTPADDING', (0,0), (-1,-1), 4),
+                ('RIGHTPADDING', (0,0), (-1,-1), 4),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), font_size),
+            ]),
+            'fees_row': TableStyle([
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('LEFTPADDING', (0,0), (-1,-1), 0),
+                ('RIGHTPADDING', (0,0), (-1,-1), 0),
+            ]),
+            'tip': TableStyle([
+                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f2f2f2')),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), 8),
+                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+                ('TOPPADDING', (0,0), (-1,-1), 2),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+            ]),
+            'tip_row': TableStyle([
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ]),
+        }
+        _CONFIRMATION_TABLE_STYLES[key] = styles
+    return styles
+
+
+def encoded_image(path, width):
+    """
+    The image at `path` as encoded for a PDF, prepared once per process for
+    drawing `width` points wide (None if it cannot be read): transparency
+    flattened onto white, downscaled to IMAGE_PIXELS_PER_POINT and
+    compressed. See StaticImage.
+    """
+    key = (str(path), width)
+    if key not in _ENCODED_IMAGES:
+        try:
+            from PIL import Image as PILImage
+            with PILImage.open(path) as source:
+                source = source.convert('RGBA')
+                image = PILImage.new('RGB', source.size, 'white')
+                image.paste(source, mask=source.getchannel('A'))
+            pixels_wide = min(image.width, round(width * IMAGE_PIXELS_PER_POINT))
+            image = image.resize((pixels_wide, round(image.height * pixels_wide / image.width)), PILImage.LANCZOS)
+            xobject = PDFImageXObject('encoded', ImageReader(image), mask=None)
+            encoded = {attr: value for attr, value in vars(xobject).items() if attr != 'name'}
+        except Exception:
+            import logging
+            logging.exception(f"Could not load image {path}")
+            encoded = None
+        _ENCODED_IMAGES[key] = encoded
+    return _ENCODED_IMAGES[key]
+
+
+def warm_caches():
+    """Fill the style and image caches, e.g. at startup or in a new render worker."""
+    sample_styles()
+    for font_size in CONFIRMATION_FONT_SIZES:
+        confirmation_styles(font_size)
+        confirmation_table_styles(font_size, max(font_size - 2, 2))
+    confirmation_table_styles(8, 2)  # layout used when nothing fits
+    encoded_image(SEATING_IMAGE_PATH, SEATING_IMAGE_SIZE[0])
+
+
+def static_images_supported():
+    """Whether StaticImage can hand drawImage a pre-encoded stream on this ReportLab."""
+    return _digester is not None and reportlab.Version.split('.')[0] in STATIC_IMAGE_REPORTLAB_VERSIONS
+
+
+class StaticImage(Flowable):
+    """
+    Image flowable drawing a stream from encoded_image.
+
+    canvas.drawImage compresses and ASCII85-encodes an image's pixels for
+    every document. This registers the already encoded stream in the
+    document under the name drawImage looks the image up by, so drawImage
+    finds it and only places it. That name comes from ReportLab internals
+    (`_digester`, the document's `idToObject`), so on a ReportLab without
+    them (see static_images_supported) or should the lookup miss, drawImage
+    reads and encodes `path` itself: slower and bigger, but the same picture.
+    """
+
+    def __init__(self, encoded, path, width, height, hAlign='CENTER'):
+        super().__init__()
+        self.encoded = encoded
+        self.path = str(path)
+        self.width = width
+        self.height = height
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        document = self.canv._doc
+        if static_images_supported() and hasattr(document, 'idToObject'):
+            # The name drawImage gives an image drawn from a file name, without a mask
+            name = _digester(f"{self.path}None".encode('utf-8'))
+            internal_name = document.getXObjectName(name)
+            if internal_name not in document.idToObject:
+                xobject = PDFImageXObject(name)
+                vars(xobject).update(self.encoded)
+                document.Reference(xobject, internal_name)
+        self.canv.drawImage(self.path, 0, 0, self.width, self.height, mask=None)
+
+
+class StaticRegion(Flowable):
+    """
+    Constant part of a confirmation (company header, contact bar, notes,
+    footer), laid out once and reused by every later render.
+
+    `build` makes the flowable the first time `key` is seen. It is kept
+    wrapped at the width it was last given, so later documents skip its
+    markup parsing and line breaking. Kept per thread, since a flowable
+    holds the canvas it is drawing on.
+    """
+
+    def __init__(self, key, build):
+        super().__init__()
+        self.key = key
+        self.build = build
+
+    def _region(self):
+        regions = getattr(_STATIC_REGIONS, 'regions', None)
+        if regions is None:
+            regions = _STATIC_REGIONS.regions = {}
+        region = regions.get(self.key)
+        if region is None:
+            region = regions[self.key] = {'flowable': self.build(), 'width': None, 'size': None}
+        return region
+
+    def wrap(self, availWidth, availHeight):
+        region = self._region()
+        if region['width'] != availWidth:
+            region['size'] = region['flowable'].wrap(availWidth, availHeight)
+            region['width'] = availWidth
+        self.hAlign = getattr(region['flowable'], 'hAlign', 'LEFT')
+        self.width, self.height = region['size']
+        return region['size']
+
+    def split(self, availWidth, availHeight):
+        region = self._region()
+        region['width'] = None  # splitting may re-wrap it at another height
+        return region['flowable'].split(availWidth, availHeight)
+
+    def getSpaceBefore(self):
+        return self._region()['flowable'].getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self._region()['flowable'].getSpaceAfter()
+
+    def draw(self):
+        # Already placed by our own drawOn; _drawOn skips a second, empty translation
+        self._region()['flowable']._drawOn(self.canv)
+
+
+def frame_size(pagesize, margins):
+    """(width, height) of the single frame SimpleDocTemplate puts on a page."""
+    return (
+        pagesize[0] - margins['leftMargin'] - margins['rightMargin'] - 2 * FRAME_PADDING,
+        pagesize[1] - margins['topMargin'] - margins['bottomMargin'] - 2 * FRAME_PADDING,
+    )
+
+
+def stacked_height(elements, width, height):
+    """
+    Height the flowables take at the top of a frame, measured with wrap()
+    the way platypus' Frame places them (no space before the first
+    flowable, the space after the last one included).
+    """
+    used = 0
+    for position, flowable in enumerate(elements):
+        if position:
+            used += flowable.getSpaceBefore()
+        used += flowable.wrap(width, max(height - used, 0))[1] + flowable.getSpaceAfter()
+    return used
+
+
+def fits_on_one_page(elements, pagesize=letter, margins=CONFIRMATION_MARGINS):
+    """Whether the flowables fit in the single frame of one page (the last space after may overflow)."""
+    width, height = frame_size(pagesize, margins)
+    used = 0
+    for position, flowable in enumerate(elements):
+        if position:
+            used += flowable.getSpaceBefore()
+        _, flowable_height = flowable.wrap(width, height - used)
+        used += flowable_height
+        if used > height + 1e-6:
+            return False
+        used += flowable.getSpaceAfter()
+    return True
+
 
-    def generate_appointment_pdf(self, appointments_data, calendar_name):
-        """Generate PDF for multiple appointments in a calendar"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, 
-                              topMargin=72, bottomMargin=18)
+class PDFGenerator:
+    def __init__(self):
+        # Shared by every generator in the process (see sample_styles)
+        self.styles = sample_styles()
+        self.title_style = self.styles['CustomTitle']
+
+    def generate_appointment_pdf(self, appointments, calendar_name, output=None):
+        """
+        Generate PDF for multiple appointments in a calendar.
+
+        `appointments` are Appointment rows in report order (e.g. a chunked
+        queryset iterator); they are read once. With `output` (a binary
+        file) the PDF is written straight into it and None is returned,
+        instead of returning the bytes.
+        """
+        buffer = output if output is not None else io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, **REPORT_MARGINS)
         
         # Container for the 'Flowable' objects
         elements = []
         try:
-            # Sort appointments by 'datetime' field ascending (earliest to latest)
-            def get_dt(appointment):
-                from datetime import datetime
-                dt_str = appointment.get('datetime', '')
-                try:
-                    # Support both with and without 'Z' at the end
-                    if dt_str.endswith('Z'):
-                        return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-                    return datetime.fromisoformat(dt_str)
-                except Exception:
-                    return datetime.max
-            appointments_data = sorted(appointments_data, key=get_dt)
-            
-            # Debug: print sorted dates
-            print('Sorted appointment dates:')
-            for appt in appointments_data:
-                print(appt.get('datetime', 'NO DATE'))
-            
             # Title
             title = Paragraph(f"Appointments Report - {calendar_name}", self.title_style)
             elements.append(title)
             elements.append(Spacer(1, 20))
             
+            rows = []
+            for appointment in appointments:
+                client_name = appointment.client_name.strip() or 'N/A'
+                service_name = appointment.appointment_type.name
+                duration = f"{appointment.appointment_type.duration} min"
+                price = f"${appointment.price}"
+                
+                # Local wall-clock time of the appointment
+                dt = appointment.local_datetime('start_time') or appointment.start_time
+                date_time = dt.strftime('%m/%d/%Y %I:%M %p') if dt else 'N/A'
+                
+                status = appointment.status.title()
+                
+                rows.append([client_name, service_name, date_time, duration, status, price])
+            
             # Summary
-            summary_text = f"Total Appointments: {len(appointments_data)}"
+            summary_text = f"Total Appointments: {len(rows)}"
             summary = Paragraph(summary_text, self.styles['Heading2'])
             elements.append(summary)
             elements.append(Spacer(1, 20))
             
-            if appointments_data:
-                # Appointments Table
-                # The appointments_data is already sorted from most recent to future
-                table_data = [['Client', 'Service', 'Date & Time', 'Duration', 'Status', 'Price']]
-                
-                for appointment in appointments_data:
-                    # Get appointment details from API data
-                    client_name = f"{appointment.get('firstName', '')} {appointment.get('lastName', '')}".strip()
-                    if not client_name:
-                        client_name = 'N/A'
-                    
-                    service_name = appointment.get('appointmentType', {}).get('name', 'N/A')
-                    duration = f"{appointment.get('appointmentType', {}).get('duration', 'N/A')} min"
-                    price = f"${appointment.get('price', 'N/A')}"
-                    
-                    # Format date and time
-                    datetime_str = appointment.get('datetime', '')
-                    if datetime_str:
-                        try:
-                            # Parse ISO datetime string
-                            from datetime import datetime
-                            dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-                            date_time = dt.strftime('%m/%d/%Y %I:%M %p')
-                        except:
-                            date_time = 'N/A'
-                    else:
-                        date_time = 'N/A'
-                    
-                    # Get status
-                    status = appointment.get('status', 'N/A').title()
-                    
-                    table_data.append([client_name, service_name, date_time, duration, status, price])
-                
-                # Create table
-                table = Table(table_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 0.8*inch, 0.8*inch, 0.8*inch])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('FONTNAME', (0, 1), (0, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white]),
-                ]))
-                
-                elements.append(table)
+            if rows:
+                elements.extend(self._report_tables(rows, elements))
             else:
                 # No appointments message
                 no_appointments = Paragraph("No appointments found for the selected date range.", self.styles['Normal'])
@@ -128,6 +454,8 @@ class PDFGenerator:
             
             # Build PDF
             doc.build(elements)
+            if output is not None:
+                return None
             
             # Get PDF content
             pdf_content = buffer.getvalue()
@@ -136,56 +464,122 @@ class PDFGenerator:
         except Exception as e:
             import logging
             logging.exception('Error generating appointments PDF')
-            buffer.close()
+            if output is None:
+                buffer.close()
             raise e
 
-    def _get_pricing(self, category, calendar=None):
-        try:
-            # Try to get price for the specific calendar
-            if calendar:
-                setting = PricingSetting.objects.filter(category=category, calendar=calendar).first()
-                if setting:
-                    return float(setting.price)
-            # Fallback to global/default (calendar=None)
-            setting = PricingSetting.objects.filter(category=category, calendar=None).first()
-            if setting:
-                return float(setting.price)
-        except Exception:
-            pass
-        # fallback default if not found
-        return 0.0
+    def _report_tables(self, rows, elements_before):
+        """
+        The report table as one LongTable per page.
+
+        A single Table of thousands of rows lays out in quadratic time (every
+        page split re-measures the rest). Report rows are plain one-line
+        strings, so they all have the same height: the rows fitting on each
+        page are computed up front and every page gets its own table with the
+        header on top. Should a row not fit after all, LongTable splits it
+        onto the next page with the header repeated.
+        """
+        width, height = frame_size(letter, REPORT_MARGINS)
+        header_height = self._report_table([]).wrap(width, height)[1]
+        row_height = self._report_table(rows[:1]).wrap(width, height)[1] - header_height
+        rows_per_page = max(int((height - header_height) / row_height + 1e-6), 1)
+        first_page_rows = int((height - stacked_height(elements_before, width, height) - header_height) / row_height + 1e-6)
+        
+        tables = []
+        start = 0
+        page_rows = first_page_rows if first_page_rows > 0 else rows_per_page
+        while start < len(rows):
+            tables.append(self._report_table(rows[start:start + page_rows]))
+            start += page_rows
+            page_rows = rows_per_page
+        return tables
+
+    def _report_table(self, rows):
+        table = LongTable([REPORT_COLUMNS] + rows, colWidths=REPORT_COL_WIDTHS, repeatRows=1)
+        table.setStyle(REPORT_TABLE_STYLE)
+        return table
 
-    def generate_appointment_confirmation(self, appointment):
-        """Generate PDF confirmation for an appointment (custom layout for Hibachi)"""
+    def _form_fields(self, appointment):
+        """Flattened form fields of an appointment, built from form_data if the row predates them."""
+        form_fields = getattr(appointment, 'form_fields', None)
+        if form_fields:
+            return form_fields
+        form_data = getattr(appointment, 'form_data', None)
+        return flatten_form_data(form_data if isinstance(form_data, list) else [])
+
+    def _order_values(self, appointment, form_values):
+        """Typed order values: the Appointment columns for saved rows, parsed from the form otherwise."""
+        if getattr(appointment, 'pk', None):
+            return {column: getattr(appointment, column) for column in ORDER_COLUMNS}
+        return order_columns(form_values)
+
+    def generate_appointment_confirmation(self, appointment, output=None):
+        """
+        Generate PDF confirmation for an appointment (custom layout for Hibachi).
+
+        With `output` (a binary file) the PDF is written straight into it and
+        None is returned, instead of returning the bytes.
+        """
         import io
         from reportlab.lib.pagesizes import letter
         from reportlab.platypus import SimpleDocTemplate
-        from PyPDF2 import PdfReader
-        # Try font sizes from 12 down to 8
-        for font_size in range(12, 7, -1):
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=18)
-            elements = self._build_elements_dynamic(appointment, font_size=font_size, spacing=max(font_size-2, 2))
-            doc.build(elements)
-            buffer.seek(0)
-            try:
-                reader = PdfReader(buffer)
-                if len(reader.pages) == 1:
-                    pdf_content = buffer.getvalue()
-                    buffer.close()
-                    return pdf_content
-            except Exception:
-                pass
-            buffer.close()
-        # If nothing fits, return the smallest version
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=18)
-        elements = self._build_elements_dynamic(appointment, font_size=8, spacing=2)
-        doc.build(elements)
+        buffer = output if output is not None else io.BytesIO()
+        # invariant: no creation date or random document ID, so equal inputs give equal bytes
+        doc = SimpleDocTemplate(buffer, pagesize=letter, invariant=True, **CONFIRMATION_MARGINS)
+        doc.build(self._fit_confirmation_elements(appointment))
+        if output is not None:
+            return None
         pdf_content = buffer.getvalue()
         buffer.close()
         return pdf_content
 
+    def _fit_confirmation_elements(self, appointment):
+        """
+        Build the confirmation at the largest font size (12 down to 8) whose
+        content fits on one page.
+
+        Heights are measured with wrap() instead of rendering the PDF, the
+        sizes are binary searched, and the chosen size is remembered per
+        content signature so a repeat render builds the elements only once.
+        If nothing fits, the smallest layout (font 8, spacing 2) is used.
+        """
+        signature = self._layout_signature(appointment)
+        cached = _FONT_SIZE_CACHE.get(signature)
+        if cached:
+            return self._build_elements_dynamic(appointment, font_size=cached[0], spacing=cached[1])
+
+        best = None
+        low, high = 0, len(CONFIRMATION_FONT_SIZES) - 1
+        while low <= high:
+            middle = (low + high) // 2
+            font_size = CONFIRMATION_FONT_SIZES[middle]
+            spacing = max(font_size - 2, 2)
+            elements = self._build_elements_dynamic(appointment, font_size=font_size, spacing=spacing)
+            if fits_on_one_page(elements):
+                best = (font_size, spacing, elements)
+                low = middle + 1
+            else:
+                high = middle - 1
+        if best is None:
+            best = (8, 2, self._build_elements_dynamic(appointment, font_size=8, spacing=2))
+
+        if len(_FONT_SIZE_CACHE) >= FONT_SIZE_CACHE_LIMIT:
+            _FONT_SIZE_CACHE.clear()
+        _FONT_SIZE_CACHE[signature] = best[:2]
+        return best[2]
+
+    def _layout_signature(self, appointment):
+        """Hash of everything printed on a confirmation that can change its height."""
+        content = [
+            getattr(appointment, 'client_name', ''), getattr(appointment, 'client_email', ''),
+            getattr(appointment, 'client_phone', ''), getattr(appointment, 'notes', ''),
+            str(getattr(appointment, 'start_time', '')), getattr(appointment, 'original_timezone', ''),
+            getattr(appointment, 'calendar_id', None), self._form_fields(appointment),
+            # Prices set the width of the order table's amounts
+            pricing_version(),
+        ]
+        return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
     def _build_elements_dynamic(self, appointment, font_size=10, spacing=8):
         from reportlab.lib.pagesizes import letter
         from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, Image, HRFlowable
@@ -195,47 +589,38 @@ class PDFGenerator:
         LEFT_MARGIN = 36
         RIGHT_MARGIN = 36
         USABLE_WIDTH = PAGE_WIDTH - LEFT_MARGIN - RIGHT_MARGIN
+        # Every form field the confirmation uses, extracted in one pass
+        form_values = extract_form_fields(self._form_fields(appointment))
+        # Prebuilt per font size, shared by every render (see warm_caches)
+        styles = confirmation_styles(font_size)
+        table_styles = confirmation_table_styles(font_size, spacing)
         elements = []
         # --- HEADER ---
+        # Constant regions are StaticRegions: laid out once per font size, then reused
         company_name = "Mobile Hibachi 4U"
-        company_title_style = ParagraphStyle(
-            'CompanyTitle', fontSize=font_size+12, fontName='Helvetica-Bold', textColor=colors.HexColor('#222222'), alignment=0, spaceAfter=0, spaceBefore=0
-        )
-        company_title = Paragraph(company_name, company_title_style)
-        # Seating arrangement image path
-        image_path = 'seating_arrangement.png'
-        img = None
-        try:
-            img = Image(image_path, width=200, height=80)
-            img.hAlign = 'RIGHT'
-        except Exception:
-            img = None
-        seating_label_style = ParagraphStyle(
-            'SeatingLabel', fontSize=font_size-1, fontName='Helvetica-Bold', textColor=colors.HexColor('#222222'), alignment=1, leading=font_size+1, spaceAfter=0, spaceBefore=0, wordWrap='LTR'
+        company_title = StaticRegion(
+            ('company_title', font_size), lambda: Paragraph(company_name, styles['company_title'])
         )
-        seating_label = Paragraph('Recommended Seating Arrangement', seating_label_style)
-        if img:
-            img.drawWidth = 200
-            img.drawHeight = 80
-            image_col = Table([[seating_label], [img]], colWidths=[2.8*inch], hAlign='RIGHT')
-            image_col.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-                ('TOPPADDING', (0,0), (-1,-1), 0),
-            ]))
+        # Seating arrangement image, encoded once per process
+        encoded = encoded_image(SEATING_IMAGE_PATH, SEATING_IMAGE_SIZE[0])
+        if encoded is not None:
+            def seating_column():
+                img = StaticImage(encoded, SEATING_IMAGE_PATH, *SEATING_IMAGE_SIZE, hAlign='RIGHT')
+                seating_label = Paragraph('Recommended Seating Arrangement', styles['seating_label'])
+                column = Table([[seating_label], [img]], colWidths=[2.8*inch], hAlign='RIGHT')
+                column.setStyle(table_styles['image_col'])
+                return column
+            image_col = StaticRegion(('seating', font_size), seating_column)
         else:
             image_col = ''
         # Create a combined header and note box table to eliminate gaps
         note_text = getattr(appointment, 'note_allergy_restrictions', None)
         if not note_text:
-            note_text = get_form_field(getattr(appointment, 'form_data', []), [
-                'Note / Allergy / Restrictions', 'Allergy', 'Restrictions', 'Notes'
-            ])
+            note_text = form_values['notes']
         
         if note_text:
             # Create note box content with proper width
-            note_content = Paragraph(f"<b>Note / Allergy / Restrictions:</b> {note_text}", 
-                                   ParagraphStyle('Normal', fontSize=font_size, leading=font_size+2))
+            note_content = Paragraph(f"<b>Note / Allergy / Restrictions:</b> {note_text}", styles['note'])
             # Ensure the note content fits in the column width
             note_content.width = 3.8*inch
             
@@ -245,22 +630,7 @@ class PDFGenerator:
                 [note_content, '']           # Second row: note box (left) + empty (right)
             ], colWidths=[4.0*inch, 2.8*inch], hAlign='LEFT')  # Restored proper column widths
             
-            combined_table.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('ALIGN', (0,0), (0,0), 'LEFT'),
-                ('ALIGN', (1,0), (1,0), 'RIGHT'),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-                ('TOPPADDING', (0,0), (-1,-1), 0),
-                # Style the note box row with minimal spacing
-                ('BACKGROUND', (0,1), (0,1), colors.HexColor('#f9f9c5')),
-                ('BOX', (0,1), (0,1), 1, colors.black),
-                ('LEFTPADDING', (0,1), (0,1), spacing//2),  # Reduced left padding
-                ('RIGHTPADDING', (0,1), (0,1), spacing//2),  # Reduced right padding
-                ('TOPPADDING', (0,1), (0,1), 1),  # Minimal top padding (1 pixel)
-                ('BOTTOMPADDING', (0,1), (0,1), spacing*8),  # Reduced bottom padding
-                # Remove any row spacing
-                ('ROWBREAKS', (0,0), (-1,-1), 0),
-            ]))
+            combined_table.setStyle(table_styles['header_with_note'])
             
             elements.append(combined_table)
             elements.append(Spacer(1, spacing))  # Keep spacing below the combined table
@@ -268,31 +638,19 @@ class PDFGenerator:
             # If no note text, just add the header table
             header_row = [[company_title, image_col]]
             header_table = Table(header_row, colWidths=[4.0*inch, 2.8*inch], hAlign='LEFT')
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('ALIGN', (0,0), (0,0), 'LEFT'),
-                ('ALIGN', (1,0), (1,0), 'RIGHT'),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-                ('TOPPADDING', (0,0), (-1,-1), 0),
-            ]))
+            header_table.setStyle(table_styles['header'])
             elements.append(header_table)
 
         # --- CONTACT INFO BAR ---
-        contact_style = ParagraphStyle('Contact', fontSize=font_size, fontName='Helvetica-Bold', textColor=colors.black)
-        contact_data = [
-            [Paragraph(f"<b>Phone:</b> 201-586-4588", contact_style), Paragraph(f"<b>Website:</b> www.mobilehibachi4u.com", contact_style)]
-        ]
-        contact_table = Table(contact_data, colWidths=[2.5*inch, 4.3*inch], hAlign='LEFT')
-        contact_table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#cccccc')),
-            ('TEXTCOLOR', (0,0), (-1,-1), colors.black),
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), font_size),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('BOTTOMPADDING', (0,0), (-1,-1), spacing//2),
-            ('TOPPADDING', (0,0), (-1,-1), spacing//2),
-        ]))
-        elements.append(contact_table)
+        def contact_bar():
+            contact_style = styles['contact']
+            contact_data = [
+                [Paragraph(f"<b>Phone:</b> 201-586-4588", contact_style), Paragraph(f"<b>Website:</b> www.mobilehibachi4u.com", contact_style)]
+            ]
+            contact_table = Table(contact_data, colWidths=[2.5*inch, 4.3*inch], hAlign='LEFT')
+            contact_table.setStyle(table_styles['contact'])
+            return contact_table
+        elements.append(StaticRegion(('contact', font_size, spacing), contact_bar))
         elements.append(Spacer(1, spacing//2))
         # Address of the event (from form_data or appointment)
         address = None
@@ -315,67 +673,23 @@ class PDFGenerator:
         subtotal = 0.0  # Ensure subtotal is always defined
         # Parse form_data for custom fields
         if hasattr(appointment, 'form_data') and appointment.form_data:
-            forms = appointment.form_data
-            form_fields = {}
-            # Build a normalized field dictionary for all possible fields
-            for form in forms:
-                for field in form.get('values', []):
-                    name = field.get('name', '').strip().upper()
-                    value = field.get('value', '')
-                    form_fields[name] = value
-            # Use robust extraction for key fields
-            address = get_form_field(forms, [
-                'full address',
-                'address',
-                'location',
-                'event address',
-                'party address',
-                'venue address',
-                'address of the event',
-            ])
-            guests = get_form_field(forms, ['order', 'how many adult', '# of guests'])
-            # Fetch all relevant values directly from Acuity form data
-            num_adult_val = get_form_field(forms, ['how many adult', 'number of adults'])
-            num_kid_val = get_form_field(forms, ['how many kid', 'number of children'])
-            noodle_rice = get_form_field(forms, ['noodle / rice'])
-            gyoza = get_form_field(forms, ['appetizer: pork gyoza'])
-            edamame = get_form_field(forms, ['appetizer: edamame'])
-            filet_mignon = get_form_field(forms, ['filet mignon (upgraded protein)'])
-            lobster_tail = get_form_field(forms, ['lobster tail (upgraded protein)'])
-            add_premium_protein = get_form_field(forms, ['additional premium protein ($15)'])
-            add_protein = get_form_field(forms, ['additional protein ($10)'])
-            travel_fee = get_form_field(forms, [
-                'travel fee', 'Travel fee', 'Travel Fee', 'TRAVEL FEE',
-                'travel_fee', 'Travel_Fee', 'Travel_Fee', 'TRAVEL_FEE'
-            ])
-            deposit = get_form_field(forms, [
-                'deposit', 'Deposit', 'deposit (deducted from total)', 'Deposit (Deducted from Total)', 'DEPOSIT',
-                'deposit_deducted_from_total', 'Deposit_Deducted_From_Total', 'DEPOSIT_DEDUCTED_FROM_TOTAL'
-            ])
-            print('Travel fee from form:', travel_fee)
-            print('Deposit from form:', deposit)
-            try:
-                travel_fee = float(travel_fee)
-            except (TypeError, ValueError):
-                travel_fee = 0.0
-            try:
-                deposit = float(deposit)
-            except (TypeError, ValueError):
-                deposit = 0.0
+            # Typed order values, extracted once at sync time
+            order = self._order_values(appointment, form_values)
+            address = order['event_address']
+            num_adult = order['adult_count']
+            num_kid = order['kid_count']
+            noodle_rice = order['noodle_rice_count']
+            gyoza = order['gyoza_count']
+            edamame = order['edamame_count']
+            filet_mignon = order['filet_mignon_count']
+            lobster_tail = order['lobster_count']
+            add_premium_protein = order['additional_premium_protein_count']
+            add_protein = order['additional_protein_count']
+            travel_fee = float(order['travel_fee'])
+            deposit = float(order['deposit'])
             # Extract processing fee ONLY from form data - this is the source of truth
             # If no processing fee exists in the form data, this will be 0.0
-            processing_fee = get_form_field(forms, ['processing fee (if any)'])
-            processing_fee = float(processing_fee) if processing_fee and str(processing_fee).replace('.','',1).isdigit() else 0.0
-            # Convert to int/float where appropriate
-            num_adult = int(num_adult_val) if num_adult_val and str(num_adult_val).strip().isdigit() else 0
-            num_kid = int(num_kid_val) if num_kid_val and str(num_kid_val).strip().isdigit() else 0
-            noodle_rice = int(noodle_rice) if noodle_rice and str(noodle_rice).strip().isdigit() else 0
-            gyoza = int(gyoza) if gyoza and str(gyoza).strip().isdigit() else 0
-            edamame = int(edamame) if edamame and str(edamame).strip().isdigit() else 0
-            filet_mignon = int(filet_mignon) if filet_mignon and str(filet_mignon).strip().isdigit() else 0
-            lobster_tail = int(lobster_tail) if lobster_tail and str(lobster_tail).strip().isdigit() else 0
-            add_premium_protein = int(add_premium_protein) if add_premium_protein and str(add_premium_protein).strip().isdigit() else 0
-            add_protein = int(add_protein) if add_protein and str(add_protein).strip().isdigit() else 0
+            processing_fee = parse_amount(form_values['processing_fee'])
             num_guests = num_adult + num_kid
             if not address:
                 address = getattr(appointment, 'notes', '')
@@ -414,24 +728,20 @@ class PDFGenerator:
             # This ensures we don't show processing fees when they don't exist in the API response
             # The processing_fee variable is already set from form data extraction above
             # If it's 0.0, it means no processing fee was found in the form data
-            # Fetch dynamic prices
-            # Optionally, you can use appointment/calendar location if available
-            location = getattr(appointment, 'calendar', None)
-            adult_price = self._get_pricing('adult', location)
-            kid_price = self._get_pricing('kid', location)
+            # Fetch dynamic prices: the calendar's (else global) PricingSettings, cached per calendar
+            try:
+                pricing = pricing_snapshot(getattr(appointment, 'calendar_id', None))
+            except Exception as e:
+                print(f"Could not load pricing, using default prices: {e}")
+                pricing = PricingSnapshot(None, [])
+            adult_price = pricing.price('adult')
+            kid_price = pricing.price('kid')
             # --- HEADER TABLE (Address) ---
             header_data = [
                 [Paragraph(f"<b>Address of the Event:</b> {address}", self.styles['Normal'])]
             ]
             address_table = Table(header_data, colWidths=[7*inch], hAlign='LEFT')
-            address_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f2f2f2')),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('FONTSIZE', (0,0), (-1,-1), 9),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-                ('TOPPADDING', (0,0), (-1,-1), 2),
-            ]))
+            address_table.setStyle(table_styles['details'])
             elements.append(address_table)
             elements.append(Spacer(1, 4))
             
@@ -439,10 +749,14 @@ class PDFGenerator:
             # Format time in the original timezone from Acuity
             from acquity.utils import format_time_in_timezone
             original_tz_str = getattr(appointment, 'original_timezone', 'UTC')
-            start_time_display = format_time_in_timezone(
-                getattr(appointment, 'start_time', None), 
-                original_tz_str
-            )
+            local_start = appointment.local_datetime('start_time') if hasattr(appointment, 'local_datetime') else None
+            if local_start is not None:
+                start_time_display = local_start.strftime('%A, %B %d, %Y at %I:%M %p')
+            else:
+                start_time_display = format_time_in_timezone(
+                    getattr(appointment, 'start_time', None), 
+                    original_tz_str
+                )
             
             event_details = [
                 [Paragraph(f"<b>When:</b> {start_time_display}", self.styles['Normal'])],
@@ -450,61 +764,31 @@ class PDFGenerator:
                 [Paragraph(f"<b>Phone:</b> {getattr(appointment, 'client_phone', 'N/A')}", self.styles['Normal'])],
             ]
             event_table = Table(event_details, colWidths=[7*inch], hAlign='LEFT')
-            event_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f2f2f2')),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('FONTSIZE', (0,0), (-1,-1), 9),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-                ('TOPPADDING', (0,0), (-1,-1), 2),
-            ]))
+            event_table.setStyle(table_styles['details'])
             elements.append(event_table)
             elements.append(Spacer(1, 8))
             
             # --- ORDER DETAILS BOX (formatted, one-pager style) ---
             # Add heading for Order Details
-            order_details_heading_style = ParagraphStyle('OrderDetailsHeading', fontSize=font_size, fontName='Helvetica-Bold', alignment=0, spaceAfter=2)
-            elements.append(Paragraph('Order Details', order_details_heading_style))
+            elements.append(Paragraph('Order Details', styles['order_heading']))
             elements.append(Spacer(1, 4))
             if hasattr(appointment, 'form_data') and appointment.form_data:
-                form_fields = {}
-                for form in appointment.form_data:
-                    for field in form.get('values', []):
-                        name = field.get('name', '').strip().upper()
-                        value = field.get('value', '')
-                        form_fields[name] = value
                 order_details_content = []
                 # Only show the 'order' field value in Order Details section
-                order_summary = get_form_field(forms, ['order'])
+                order_summary = form_values['order']
                 if order_summary:
                     order_details_content.append(f'<font size="{font_size}">&#9679; {order_summary}</font>')
                 if order_details_content:
                     order_details_text = '<br/><br/>'.join(order_details_content)
                     order_details_paragraph = Paragraph(order_details_text, self.styles['Normal'])
                     order_details_table = Table([[order_details_paragraph]], colWidths=[7*inch], hAlign='LEFT')
-                    order_details_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f2f2f2')),
-                        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                        ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                        ('FONTSIZE', (0,0), (-1,-1), 8),
-                        ('GRID', (0,0), (-1,-1), 1, colors.grey),
-                        ('TOPPADDING', (0,0), (-1,-1), 2),
-                        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-                        ('LEFTPADDING', (0,0), (-1,-1), 2),
-                        ('RIGHTPADDING', (0,0), (-1,-1), 2),
-                    ]))
+                    order_details_table.setStyle(table_styles['order_details'])
                     elements.append(order_details_table)
                     elements.append(Spacer(1, 6))
             
             # --- ORDER BREAKDOWN ---
-            # Fetch currency from PricingSetting for this calendar (or default USD)
-            currency = 'USD'
-            if hasattr(appointment, 'calendar') and appointment.calendar:
-                from .models import PricingSetting
-                ps = PricingSetting.objects.filter(calendar=appointment.calendar).first()
-                if ps:
-                    currency = ps.currency
-            currency_symbol = self._get_currency_symbol(currency)
+            # Currency of this calendar's PricingSettings (or default USD)
+            currency_symbol = self._get_currency_symbol(pricing.currency)
             # Map form field names to PricingSetting categories and display names
             item_fields = [
                 ("Adult", num_adult, "adult"),
@@ -521,7 +805,7 @@ class PDFGenerator:
             # Add Unit Price column to order_table_data
             order_table_data = [["Item", "Quantity", "Unit Price", f"Total ({currency_symbol})"]]
             for label, qty, category in item_fields:
-                price = self._get_pricing(category, getattr(appointment, 'calendar', None)) if category else 0.0
+                price = pricing.price(category) if category else 0.0
                 total = float(qty) * float(price)
                 order_table_data.append([
                     label,
@@ -532,17 +816,7 @@ class PDFGenerator:
             col_width = 2.5*inch  # Consistent left column width for all tables
             # Order Breakdown Table
             order_table = Table(order_table_data, colWidths=[col_width, 1*inch, 1.2*inch, 1.3*inch], hAlign='LEFT')
-            order_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f2f2f2')),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('FONTSIZE', (0,0), (-1,-1), font_size),
-                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                ('TOPPADDING', (0,0), (-1,-1), spacing//2),
-                ('BOTTOMPADDING', (0,0), (-1,-1), spacing//2),
-                ('LEFTPADDING', (0,0), (-1,-1), 8),
-                ('RIGHTPADDING', (0,0), (-1,-1), 0),
-            ]))
+            order_table.setStyle(table_styles['order'])
             elements.append(order_table)
             elements.append(Spacer(1, spacing//2))
             # Use currency_symbol everywhere a price is shown (e.g., Total, tips, fees, etc.)
@@ -555,13 +829,13 @@ class PDFGenerator:
             # Ensure subtotal and final_total are calculated before use
             subtotal = 0.0
             for label, qty, category in item_fields:
-                price = self._get_pricing(category, getattr(appointment, 'calendar', None)) if category else 0.0
+                price = pricing.price(category) if category else 0.0
                 total = float(qty) * float(price)
                 subtotal += total
             # Calculate Total (sum of all item totals)
             total = 0.0
             for label, qty, category in item_fields:
-                price = self._get_pricing(category, getattr(appointment, 'calendar', None)) if category else 0.0
+                price = pricing.price(category) if category else 0.0
                 item_total = float(qty) * float(price)
                 total += item_total
             # Travel fee and deposit from form data, ensure float
@@ -584,61 +858,43 @@ class PDFGenerator:
                 final_total = base_total
             # --- FEES/TOTAL + NOTE, SIDE BY SIDE, BORDERLESS ---
             fees_data = [
-                [Paragraph("<b>Traveling Fee</b>", ParagraphStyle('Normal', fontSize=font_size, alignment=0, leftIndent=0)), f"{currency_symbol}{travel_fee:.2f}"],
+                [Paragraph("<b>Traveling Fee</b>", styles['fee_label']), f"{currency_symbol}{travel_fee:.2f}"],
             ]
             # Add deposit with note
             if deposit > 0:
                 deposit_cell = Table([
-                    [Paragraph("<b>Deposit</b>", ParagraphStyle('Normal', fontSize=font_size, alignment=0, leftIndent=0))],
-                    [Paragraph("The deposit has already been deducted from the total shown on this invoice.", 
-                              ParagraphStyle('DepositNote', fontSize=font_size-2, fontName='Helvetica', alignment=0, textColor=colors.HexColor('#666666'), spaceBefore=1))]
+                    [Paragraph("<b>Deposit</b>", styles['fee_label'])],
+                    [Paragraph("The deposit has already been deducted from the total shown on this invoice.", styles['deposit_note'])]
                 ], colWidths=[2.5*inch])
-                deposit_cell.setStyle(TableStyle([
-                    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                    ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                    ('LEFTPADDING', (0,0), (-1,-1), 0),
-                    ('RIGHTPADDING', (0,0), (-1,-1), 0),
-                    ('TOPPADDING', (0,0), (-1,-1), 0),
-                    ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-                ]))
+                deposit_cell.setStyle(table_styles['deposit_cell'])
                 fees_data.append([deposit_cell, f"{currency_symbol}{deposit:.2f}"])
             else:
-                fees_data.append([Paragraph("<b>Deposit</b>", ParagraphStyle('Normal', fontSize=font_size, alignment=0, leftIndent=0)), f"{currency_symbol}{deposit:.2f}"])
+                fees_data.append([Paragraph("<b>Deposit</b>", styles['fee_label']), f"{currency_symbol}{deposit:.2f}"])
             # Only show processing fee if it was found in the form data (processing_fee_percent > 0)
             # This prevents showing default/fallback values from the database
             if processing_fee_percent > 0:
                 processing_fee_display = (total + travel_fee - deposit) * processing_fee_percent
                 fees_data.append([
-                    Paragraph("<b>Processing Fee (If Applicable)</b>", ParagraphStyle('Normal', fontSize=font_size, alignment=0, leftIndent=0)),
+                    Paragraph("<b>Processing Fee (If Applicable)</b>", styles['fee_label']),
                     f"{currency_symbol}{processing_fee_display:.2f}"
                 ])
             fees_data.append([
-                Paragraph(f"<b>Total ({currency_symbol}):</b>", ParagraphStyle('Normal', fontSize=font_size, alignment=0, leftIndent=0)),
+                Paragraph(f"<b>Total ({currency_symbol}):</b>", styles['fee_label']),
                 f"{currency_symbol}{total:.2f}"
             ])
             fees_table = Table(fees_data, colWidths=[2.5*inch, 1.5*inch], hAlign='LEFT')
-            fees_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('LEFTPADDING', (0,0), (-1,-1), 4),
-                ('RIGHTPADDING', (0,0), (-1,-1), 4),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('FONTSIZE', (0,0), (-1,-1), font_size),
-            ]))
+            fees_table.setStyle(table_styles['fees'])
             # Restore the side-by-side layout with the note or right-side text
-            fees_note_paragraph = Paragraph(
+            fees_note_paragraph = StaticRegion(('fees_note', font_size), lambda: Paragraph(
                 "1. Each meal includes vegetables, fried rice, salad, and sake as part of the service.<br/>"
                 "Please make sure that tables, chairs, plates, and utensils are fully set up before the chef arrives so we can begin cooking on time and keep everything running smoothly. We don't provide any plates or to go boxes of any sort.",
-                ParagraphStyle('FeesNoteStyle', fontSize=font_size-1, leading=font_size+1, wordWrap='CJK', fontName='Helvetica-Bold', alignment=0)
-            )
+                styles['side_note']
+            ))
             fees_row_table = Table(
                 [[fees_table, fees_note_paragraph]],
                 colWidths=[4.0*inch, 2.5*inch], hAlign='LEFT'
             )
-            fees_row_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('LEFTPADDING', (0,0), (-1,-1), 0),
-                ('RIGHTPADDING', (0,0), (-1,-1), 0),
-            ]))
+            fees_row_table.setStyle(table_styles['fees_row'])
             elements.append(fees_row_table)
             elements.append(Spacer(1, 4))
             # --- ALLERGIES ---
@@ -658,24 +914,14 @@ class PDFGenerator:
             ]
             # --- TIP TABLE + NOTE, SIDE BY SIDE, BORDERLESS ---
             tip_table = Table(tip_table_data, colWidths=[1.1*inch, 1.1*inch, 1.1*inch], hAlign='LEFT')
-            tip_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f2f2f2')),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('FONTSIZE', (0,0), (-1,-1), 8),
-                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                ('TOPPADDING', (0,0), (-1,-1), 2),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-            ]))
-            note_style = ParagraphStyle('NoteStyle', fontSize=font_size-1, leading=font_size+1, wordWrap='CJK', fontName='Helvetica-Bold', alignment=0)
-            tip_note_paragraph = Paragraph("Note: Cash payment is due on the day of the event.Other payment methods must be arranged and completed 2–3 days in advance.", note_style)
+            tip_table.setStyle(table_styles['tip'])
+            note_style = styles['side_note']
+            tip_note_paragraph = StaticRegion(('payment_note', font_size), lambda: Paragraph("Note: Cash payment is due on the day of the event.Other payment methods must be arranged and completed 2–3 days in advance.", note_style))
             tip_row_table = Table(
                 [[tip_table, tip_note_paragraph]],
                 colWidths=[4.0*inch, 2.5*inch], hAlign='LEFT'
             )
-            tip_row_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ]))
+            tip_row_table.setStyle(table_styles['tip_row'])
             elements.append(tip_row_table)
             elements.append(Spacer(1, 3))
             # --- FOOTER ---
@@ -684,10 +930,16 @@ class PDFGenerator:
             elements.append(Spacer(1, 3))
             # elements.append(Paragraph("Thank you for having us. Hope you enjoyed it!", ParagraphStyle('Normal', fontSize=compact_font_size+1, alignment=0, spaceBefore=4, spaceAfter=2)))
             # elements.append(Paragraph("Follow/tag us on instagram: @mobilehibachi_4u", ParagraphStyle('Normal', fontSize=compact_font_size, alignment=0, spaceBefore=2, spaceAfter=2)))
-            elements.append(Paragraph('<b>Our website:</b> <font color="blue">https://www.mobilehibachi4u.com/</font>', ParagraphStyle('Normal', fontSize=font_size, alignment=0, spaceBefore=1, spaceAfter=1)))
-            elements.append(Paragraph("<b>Weather:</b> Please ensure there is some type of covering for the chef to cook under in case of rain. We can cook under tents, patios, garages, or indoors — whichever works best for your space.", ParagraphStyle('Normal', fontSize=font_size-2, alignment=0, spaceBefore=1, spaceAfter=1)))
-            elements.append(Paragraph("<b>If you have any questions about this invoice, feel free to call us at 240-689-8383 or email chef@mobilehibachi4u.com.</b>", ParagraphStyle('Normal', fontSize=font_size-2, alignment=0, spaceBefore=1, spaceAfter=1)))
-            elements.append(Paragraph("<b>917-238-2030 / 201-586-4588</b>", ParagraphStyle('Normal', fontSize=font_size-2, alignment=0, spaceBefore=1, spaceAfter=1, textColor=colors.black)))
+            footer = [
+                ('website', '<b>Our website:</b> <font color="blue">https://www.mobilehibachi4u.com/</font>', 'website'),
+                ('weather', "<b>Weather:</b> Please ensure there is some type of covering for the chef to cook under in case of rain. We can cook under tents, patios, garages, or indoors — whichever works best for your space.", 'fine_print'),
+                ('questions', "<b>If you have any questions about this invoice, feel free to call us at 240-689-8383 or email chef@mobilehibachi4u.com.</b>", 'fine_print'),
+                ('phones', "<b>917-238-2030 / 201-586-4588</b>", 'phones'),
+            ]
+            for name, text, style in footer:
+                elements.append(StaticRegion(
+                    ('footer', name, font_size), lambda text=text, style=style: Paragraph(text, styles[style])
+                ))
             # Build PDF
             # doc.build(elements) # This line is removed as per the edit hint.
             return elements # Return the list of elements instead of building the PDF.
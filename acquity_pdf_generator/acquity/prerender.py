@@ -0,0 +1,78 @@
+# scheduling/prerender.py
+"""
+Pre-rendering of upcoming confirmations after a sync.
+
+Chefs download confirmations in bursts right before their events, so once a
+sync has written its changes, the confirmations of new or changed
+appointments starting within settings.PDF_PRERENDER_HORIZON_HOURS are
+rendered into the PDF cache (pdf_cache). download_pdf then finds them there
+instead of rendering on demand.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Appointment
+from .pdf_cache import confirmation_path
+from .render_pool import render_confirmations
+
+
+def prerender_horizon_hours():
+    return getattr(settings, 'PDF_PRERENDER_HORIZON_HOURS', 72)
+
+
+def upcoming_appointments(acuity_ids=None, horizon_hours=None):
+    """
+    Active appointments starting within the horizon; only those with the
+    given Acuity IDs when `acuity_ids` is not None.
+    """
+    horizon_hours = prerender_horizon_hours() if horizon_hours is None else horizon_hours
+    now = timezone.now()
+    appointments = Appointment.objects.filter(
+        start_time__gte=now, start_time__lt=now + timedelta(hours=horizon_hours),
+    ).exclude(status='cancelled').select_related('calendar').order_by('start_time')
+    if acuity_ids is not None:
+        appointments = appointments.filter(acuity_appointment_id__in=list(acuity_ids))
+    return appointments
+
+
+def prerender_confirmations(acuity_ids=None, horizon_hours=None):
+    """
+    Render the confirmations of upcoming appointments that are not cached yet.
+
+    Returns:
+        int: number of confirmations rendered
+    """
+    horizon_hours = prerender_horizon_hours() if horizon_hours is None else horizon_hours
+    if horizon_hours <= 0 or (acuity_ids is not None and not acuity_ids):
+        return 0
+    missing = [
+        appointment for appointment in upcoming_appointments(acuity_ids, horizon_hours)
+        if not confirmation_path(appointment).exists()
+    ]
+    rendered = 0
+    try:
+        # Rendered in the render pool, so a web process running this in a thread stays responsive
+        for _ in render_confirmations(missing):
+            rendered += 1
+    except Exception:
+        import logging
+        logging.exception(f"Pre-rendering stopped after {rendered} of {len(missing)} confirmation(s)")
+    print(f"Pre-rendered {rendered} confirmation(s) starting within {horizon_hours}h")
+    return rendered
+
+
+def prerender_in_background(acuity_ids=None, horizon_hours=None):
+    """Run prerender_confirmations in a daemon thread so the caller (e.g. a sync request) does not wait."""
+    def run():
+        try:
+            prerender_confirmations(acuity_ids, horizon_hours)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name='prerender-confirmations', daemon=True)
+    thread.start()
+    return thread
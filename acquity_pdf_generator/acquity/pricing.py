@@ -0,0 +1,106 @@
+# scheduling/pricing.py
+"""
+Pricing snapshots for confirmations.
+
+A PricingSnapshot holds every PricingSetting row a calendar's confirmations
+read (the calendar's own and the global ones), loaded in one query, with
+the prices resolved the way confirmations always have: the calendar's own
+price of a category, else the global one, else 0. Confirmations of the same
+calendar share it across renders and font-size retries.
+
+Snapshots are cached per calendar and stamped with the pricing version, a
+token in PDF_CACHE_DIR that bump_pricing_version replaces whenever a
+PricingSetting is saved or deleted (signals.py). A snapshot whose stamp no
+longer matches is reloaded. Being a file, the version is shared with the
+render pool workers and every other process writing the same PDF cache;
+each process stats it per render and only rereads it when it was replaced.
+"""
+import os
+import tempfile
+import uuid
+
+from django.db.models import Q
+
+from .models import PricingSetting
+
+DEFAULT_CURRENCY = 'USD'
+
+# Calendar id -> PricingSnapshot
+_SNAPSHOTS = {}
+# [(path, inode, mtime) of the version file, its contents]
+_VERSION = [None, '']
+
+
+class PricingSnapshot:
+    """PricingSetting rows of one calendar (and the global ones), with their prices resolved."""
+
+    def __init__(self, calendar_id, rows, version=''):
+        self.calendar_id = calendar_id
+        # (id, category, price, currency, calendar_id), by id; also hashed into confirmation cache keys
+        self.rows = rows
+        self.version = version
+        self.prices = {}
+        self.currency = DEFAULT_CURRENCY
+        own = {}
+        for _, category, price, currency, row_calendar_id in rows:
+            if row_calendar_id is None:
+                self.prices.setdefault(category, float(price))
+                continue
+            if not own:
+                # The calendar's first row sets its currency
+                self.currency = currency
+            own.setdefault(category, float(price))
+        self.prices.update(own)
+
+    def price(self, category):
+        return self.prices.get(category, 0.0)
+
+
+def _version_path():
+    from .pdf_cache import cache_dir
+    return cache_dir() / 'pricing.version'
+
+
+def pricing_version():
+    """Current pricing version stamp ('' until prices first change)."""
+    path = _version_path()
+    try:
+        stat = os.stat(path)
+        # bump_pricing_version replaces the file, so a new version is a new inode
+        stamp = (str(path), stat.st_ino, stat.st_mtime_ns)
+        if _VERSION[0] != stamp:
+            _VERSION[:] = [stamp, path.read_text()]
+    except OSError:
+        return ''
+    return _VERSION[1]
+
+
+def bump_pricing_version():
+    """Give prices a new version, so every process reloads its snapshots."""
+    path = _version_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as temp_file:
+        temp_file.write(uuid.uuid4().hex)
+    os.replace(temp_path, path)
+
+
+def load_pricing_rows(calendar_id):
+    """The PricingSetting rows a confirmation of this calendar can read, in one query."""
+    condition = Q(calendar__isnull=True)
+    if calendar_id:
+        condition |= Q(calendar_id=calendar_id)
+    return list(
+        PricingSetting.objects.filter(condition).order_by('id')
+        .values_list('id', 'category', 'price', 'currency', 'calendar_id')
+    )
+
+
+def pricing_snapshot(calendar_id):
+    """Cached PricingSnapshot of a calendar (None: global prices only), reloaded when prices changed."""
+    version = pricing_version()
+    snapshot = _SNAPSHOTS.get(calendar_id)
+    if snapshot is None or snapshot.version != version:
+        snapshot = PricingSnapshot(calendar_id, load_pricing_rows(calendar_id), version)
+        _SNAPSHOTS[calendar_id] = snapshot
+    return snapshot
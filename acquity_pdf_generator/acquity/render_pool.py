@@ -0,0 +1,256 @@
+# scheduling/render_pool.py
+"""
+Process pool that renders PDFs off the web workers.
+
+ReportLab is pure Python and CPU bound: rendering in the request thread
+holds the GIL and starves every other request of the same worker. Views
+submit render jobs here instead and wait for them with a timeout
+(settings.PDF_RENDER_TIMEOUT), so PDF load spreads over all cores.
+
+- PDF_RENDER_WORKERS: pool size per web process (default 2, None = one per
+  CPU, 0 = render inline). Every web worker process starts its own pool, so
+  N gunicorn workers run N times this many render processes.
+- PDF_RENDER_START_METHOD: multiprocessing start method; 'spawn' by default,
+  since forking a threaded web worker is unsafe
+
+Workers are started once and kept: each sets up Django and loads the PDF
+styles and images up front, so a job only pays for its own layout. A pool
+broken by a dead worker (e.g. killed for memory) is replaced, and the job
+retried once before it is rendered inline.
+"""
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+
+# Per worker process: the PDFGenerator built by _warm_worker
+_generator = None
+
+# Appointment rows fetched per database round trip for calendar reports
+REPORT_CHUNK_SIZE = 2000
+
+# Pool size when PDF_RENDER_WORKERS is not set
+DEFAULT_WORKERS = 2
+
+
+def pool_size():
+    workers = getattr(settings, 'PDF_RENDER_WORKERS', DEFAULT_WORKERS)
+    if workers is None:
+        return os.cpu_count() or 1
+    return workers
+
+
+def render_timeout():
+    return getattr(settings, 'PDF_RENDER_TIMEOUT', 60)
+
+
+def _warm_worker():
+    global _generator
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from .pdf_generator import PDFGenerator, warm_caches
+    warm_caches()
+    _generator = PDFGenerator()
+
+
+def _start_executor(size):
+    start_method = getattr(settings, 'PDF_RENDER_START_METHOD', 'spawn')
+    if start_method == 'fork':
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+    context = multiprocessing.get_context(start_method)
+    return ProcessPoolExecutor(max_workers=size, mp_context=context, initializer=_warm_worker)
+
+
+def get_executor():
+    """The process-wide render pool, started on first use (None when rendering inline)."""
+    global _executor, _executor_size
+    size = pool_size()
+    if size <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = _start_executor(size)
+            _executor_size = size
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _discard_executor(executor):
+    """Drop a broken pool so the next job starts a fresh one (unless another thread already has)."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _worker_generator():
+    if _generator is None:
+        _warm_worker()
+    return _generator
+
+
+# Jobs return file paths rather than PDF bytes, so documents are not copied between processes
+
+def _confirmation_job(appointment):
+    from .pdf_cache import get_confirmation_file
+    return appointment.pk, str(get_confirmation_file(appointment, _worker_generator()))
+
+
+def _calendar_report_job(calendar_id, start_date=None, end_date=None):
+    from .export import export_appointments
+    from .models import Calendar
+    calendar = Calendar.objects.get(pk=calendar_id)
+    # Rows are read from the database in chunks, not loaded all at once
+    appointments = export_appointments(calendar, start_date, end_date).iterator(chunk_size=REPORT_CHUNK_SIZE)
+    fd, path = tempfile.mkstemp(prefix='calendar-report-', suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            _worker_generator().generate_appointment_pdf(appointments, calendar.name, output=output)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _result(future, timeout):
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeoutError:
+        future.cancel()
+        raise
+
+
+def _run(job, *args, timeout=None):
+    """
+    Run a job in the pool and wait for it. When a worker died (e.g. killed
+    for memory) the broken pool is replaced and the job retried once; after
+    that, or without a pool, it runs inline.
+    """
+    for attempt in range(2):
+        executor = get_executor()
+        if executor is None:
+            break
+        try:
+            return _result(executor.submit(job, *args), timeout or render_timeout())
+        except BrokenProcessPool:
+            print(f"PDF render pool is broken, starting a new one ({job.__name__})")
+            _discard_executor(executor)
+    return job(*args)
+
+
+def render_confirmation_file(appointment, timeout=None):
+    """
+    Path of the cached confirmation PDF, rendered in the pool on a cache miss.
+
+    Raises:
+        concurrent.futures.TimeoutError: rendering took longer than `timeout`
+        (PDF_RENDER_TIMEOUT)
+    """
+    from .pdf_cache import confirmation_path
+    # Cache hits need no round trip to the pool
+    path = confirmation_path(appointment)
+    if path.exists():
+        return path
+    return Path(_run(_confirmation_job, appointment, timeout=timeout)[1])
+
+
+def open_confirmation_file(appointment, timeout=None):
+    """
+    The confirmation PDF (see render_confirmation_file), opened for reading.
+
+    A concurrent discard or clear of the PDF cache can remove the file between
+    the render and the open; it is then rendered once more, and after that
+    inline (pdf_cache.open_confirmation_file).
+    """
+    from .pdf_cache import open_confirmation_file as open_cached
+    for attempt in range(2):
+        try:
+            return open(render_confirmation_file(appointment, timeout), 'rb')
+        except FileNotFoundError:
+            continue
+    return open_cached(appointment)
+
+
+def render_calendar_report_file(calendar, start_date=None, end_date=None, timeout=None):
+    """
+    Calendar report (PDFGenerator.generate_appointment_pdf) of the synced
+    appointments of a calendar and local date range, rendered in the pool
+    into a temporary file; the caller deletes the returned path.
+    """
+    return _run(_calendar_report_job, calendar.pk, start_date, end_date, timeout=timeout)
+
+
+def render_confirmations(appointments, timeout=None, workers=None):
+    """
+    Render many confirmations in the pool.
+
+    With `workers`, the batch gets a pool of its own of that size (e.g.
+    export_confirmations --workers), shut down once the batch is done;
+    otherwise it uses the shared pool.
+
+    Yields:
+        tuple: (appointment, PDF bytes), in the order rendering finishes
+
+    Raises:
+        concurrent.futures.TimeoutError: the batch took longer than `timeout`
+        per job, spread over the pool's workers
+    """
+    from .pdf_cache import get_confirmation_pdf
+    appointments = list(appointments)
+    if workers:
+        executor, size = _start_executor(workers), workers
+    else:
+        executor, size = get_executor(), _executor_size
+    if executor is None:
+        for appointment in appointments:
+            yield appointment, get_confirmation_pdf(appointment)
+        return
+    by_pk = {appointment.pk: appointment for appointment in appointments}
+    pending = dict(by_pk)
+    futures = []
+    try:
+        futures = [executor.submit(_confirmation_job, appointment) for appointment in appointments]
+        rounds = math.ceil(len(futures) / size) + 1
+        for future in as_completed(futures, timeout=(timeout or render_timeout()) * rounds):
+            pk, path = _result(future, 0)
+            try:
+                pdf_content = Path(path).read_bytes()
+            except FileNotFoundError:
+                # Removed by a concurrent discard or clear of the cache since it was rendered
+                pdf_content = get_confirmation_pdf(by_pk[pk])
+            del pending[pk]
+            yield by_pk[pk], pdf_content
+    except BrokenProcessPool:
+        # A worker died: the next job gets a fresh pool, this batch finishes inline
+        print("PDF render pool is broken, rendering the rest of the batch inline")
+        _discard_executor(executor)
+        for appointment in list(pending.values()):
+            yield appointment, get_confirmation_pdf(appointment)
+    finally:
+        # Also reached when the client disconnects from a streamed export
+        for future in futures:
+            future.cancel()
+        if workers:
+            executor.shutdown(wait=False, cancel_futures=True)
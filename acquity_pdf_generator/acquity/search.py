@@ -0,0 +1,186 @@
+# scheduling/search.py
+"""
+Full-text search over appointments for the dashboard.
+
+- SQLite: an FTS5 table (acquity_appointment_fts) keyed by appointment id,
+  kept up to date by triggers, so every sync write (bulk or not) updates it
+  incrementally. Results are ranked with bm25: the index is queried once for
+  the SEARCH_RANKED_RESULTS best hits, which sort first in rank order.
+- PostgreSQL: a pg_trgm GIN index over the same columns, ranked by
+  similarity.
+- Anything else, or a database where the index is missing: the previous
+  icontains search.
+
+The index is created by migration 0019. SQLite drops the triggers whenever a
+migration rebuilds acquity_appointment, so the FTS5 index is only used while
+all three exist; rebuild_search_index() (or the rebuild_search_index command)
+recreates them and repopulates the table.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import AppointmentType
+
+FTS_TABLE = 'acquity_appointment_fts'
+FTS_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+SEARCH_COLUMNS = ['client_name', 'client_email', 'client_phone', 'event_address', 'notes']
+
+# PostgreSQL: the indexed expression, repeated verbatim in queries so the index is used
+PG_SEARCH_EXPRESSION = "lower(" + " || ' ' || ".join(
+    f"coalesce({column}, '')" for column in SEARCH_COLUMNS
+) + ")"
+
+# Best full-text hits ordered by bm25; the rest follow in start time order
+SEARCH_RANKED_RESULTS = 200
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+_index_available = {}
+
+
+def search_backend():
+    """'fts5', 'trigram' or None when only the icontains fallback is available."""
+    vendor = connection.vendor
+    if vendor not in _index_available:
+        _index_available[vendor] = _detect_backend(vendor)
+    return _index_available[vendor]
+
+
+def _detect_backend(vendor):
+    try:
+        with connection.cursor() as cursor:
+            if vendor == 'sqlite':
+                names = [FTS_TABLE, *FTS_TRIGGERS]
+                cursor.execute(
+                    f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names
+                )
+                found = {row[0] for row in cursor.fetchall()}
+                if FTS_TABLE not in found:
+                    return None
+                missing = [name for name in FTS_TRIGGERS if name not in found]
+                if missing:
+                    # A table rebuild dropped them: the index is stale, so fall back to icontains
+                    print(f"Warning: search index triggers missing ({', '.join(missing)}); "
+                          f"run 'manage.py rebuild_search_index'. Using icontains search.")
+                    return None
+                return 'fts5'
+            if vendor == 'postgresql':
+                cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'acquity_appointment_search_trgm'")
+                return 'trigram' if cursor.fetchone() else None
+    except Exception:
+        pass
+    return None
+
+
+def fts_match_expression(query):
+    """User input -> FTS5 query: every word must match, as a prefix ('jo smi' finds 'John Smith')."""
+    terms = _TERM_PATTERN.findall(query.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def like_contains_pattern(query):
+    """LIKE pattern matching `query` anywhere, with its % _ and \\ taken literally (ESCAPE '\\')."""
+    escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _ranked_fts_ids(queryset, match):
+    """Ids of the best SEARCH_RANKED_RESULTS hits within `queryset`, best first, in one index query."""
+    candidates_sql, candidates_params = queryset.order_by().values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        # `+rowid`: a plain rowid constraint is handed to FTS5, which then runs the MATCH once per candidate
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({candidates_sql}) "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT %s",
+            [match, *candidates_params, SEARCH_RANKED_RESULTS],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_appointments(queryset, query):
+    """
+    Filter an Appointment queryset by a search string, best matches first.
+
+    Matches client name, email, phone, event address and notes through the
+    full-text index, plus the appointment type name (a small table, matched
+    separately so the index stays usable).
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    type_ids = list(AppointmentType.objects.filter(name__icontains=query).values_list('id', flat=True))
+    backend = search_backend()
+
+    if backend == 'fts5':
+        match = fts_match_expression(query)
+        if not match:
+            return _icontains_search(queryset, query, type_ids)
+        hit = Q(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,)))
+        ranked_ids = _ranked_fts_ids(queryset, match)
+        # Rank positions of the best hits (the IN check keeps the CASE off every other row);
+        # other text matches and type-only matches come after them
+        unranked = Value(len(ranked_ids))
+        search_rank = Case(
+            When(id__in=ranked_ids, then=Case(
+                *[When(id=pk, then=Value(position)) for position, pk in enumerate(ranked_ids)],
+                default=unranked,
+            )),
+            default=unranked,
+            output_field=IntegerField(),
+        ) if ranked_ids else unranked
+        return queryset.filter(hit | Q(appointment_type_id__in=type_ids)).annotate(
+            search_rank=search_rank,
+        ).order_by('search_rank', 'start_time')
+
+    if backend == 'trigram':
+        hit = Q(id__in=RawSQL(
+            f"SELECT id FROM acquity_appointment WHERE {PG_SEARCH_EXPRESSION} LIKE %s ESCAPE '\\'",
+            (like_contains_pattern(query),),
+        ))
+        return queryset.filter(hit | Q(appointment_type_id__in=type_ids)).annotate(
+            search_rank=RawSQL(f"similarity({PG_SEARCH_EXPRESSION}, %s)", (query.lower(),), output_field=FloatField()),
+        ).order_by('-search_rank', 'start_time')
+
+    return _icontains_search(queryset, query, type_ids)
+
+
+def _icontains_search(queryset, query, type_ids):
+    condition = Q(appointment_type_id__in=type_ids)
+    for column in SEARCH_COLUMNS:
+        condition |= Q(**{f'{column}__icontains': query})
+    return queryset.filter(condition).order_by('start_time')
+
+
+def rebuild_search_index(db_connection=None):
+    """
+    Recreate the SQLite FTS table and its triggers where missing, then
+    repopulate it from acquity_appointment (PostgreSQL indexes need no rebuild).
+    """
+    db_connection = db_connection or connection
+    if db_connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f"new.{column}" for column in SEARCH_COLUMNS)
+    ai_trigger, ad_trigger, au_trigger = FTS_TRIGGERS
+    with db_connection.cursor() as cursor:
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns})")
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {ai_trigger} AFTER INSERT ON acquity_appointment BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {ad_trigger} AFTER DELETE ON acquity_appointment BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {au_trigger} AFTER UPDATE OF {columns} ON acquity_appointment BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) SELECT id, {columns} FROM acquity_appointment"
+        )
+    _index_available.pop(db_connection.vendor, None)
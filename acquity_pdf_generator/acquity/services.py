@@ -26,8 +26,79 @@ except ImportError:
 
 from .models import Calendar, AppointmentType, Appointment
 from django.db import transaction
-from acquity.utils import get_form_field
+from acquity.utils import fast_parse_acuity_datetime, flatten_form_data, get_zoneinfo
+from acquity.form_fields import ORDER_COLUMNS, extract_form_fields, order_columns
+from acquity.pdf_cache import discard_confirmations
 from acquity.openai_utils import extract_guest_counts_with_gpt
+from .changeset import SyncChangeset
+from .paging import AdaptivePageSizer, AppointmentPager, peak_rss_mb, print_page_mode
+from .timezones import CalendarTimezoneResolver, resolve_timezone, split_offset
+from .batch_datetimes import local_time_columns
+from .sharding import (
+    build_sync_chunks, chunks_for_shard, claim_chunk, lease_owner_id, release_chunk, renew_chunk,
+)
+
+# Appointment fields written by the sync (everything but the Acuity ID)
+APPOINTMENT_SYNC_FIELDS = [
+    'calendar', 'appointment_type', 'client_name', 'client_email', 'client_phone',
+    'start_time', 'end_time', 'notes', 'price', 'status', 'form_data', 'form_fields',
+    'processing_fee', 'original_timezone', 'last_synced', 'color_tag',
+    'local_start_time', 'local_end_time', 'local_date',
+] + ORDER_COLUMNS
+
+# Fields left out of the change comparison (they differ on every sync)
+DIFF_IGNORED_FIELDS = {'last_synced'}
+
+def diff_model_fields(instance, values, ignored=()):
+    """
+    Compare new field values with a model instance, normalising them the way
+    the database would store them (e.g. '95' vs Decimal('95.00')).
+
+    Returns:
+        dict: {field_name: (old, new)} for every field that differs
+    """
+    changes = {}
+    for field_name, value in values.items():
+        if field_name in ignored:
+            continue
+        field = instance._meta.get_field(field_name)
+        if field.is_relation:
+            old, new = getattr(instance, field.attname), getattr(value, 'pk', value)
+        else:
+            old = getattr(instance, field_name)
+            try:
+                new = field.to_python(value)
+            except Exception:
+                new = value
+            if isinstance(new, datetime) and timezone.is_naive(new):
+                # Naive values are stored in the default time zone; compare them the same way
+                new = timezone.make_aware(new)
+        if old != new:
+            changes[field_name] = (old, new)
+    return changes
+
+
+def add_local_times(values_list):
+    """
+    Fill local_start_time, local_end_time and local_date of decoded appointment
+    values (see `AcuityService._appointment_field_values`), converting a whole
+    page at once.
+    """
+    columns = local_time_columns(
+        [values['start_time'] for values in values_list],
+        [values['end_time'] for values in values_list],
+        [values.get('original_timezone') for values in values_list],
+    )
+    for values, (local_start, local_end, local_date) in zip(values_list, columns):
+        values['local_start_time'] = local_start
+        values['local_end_time'] = local_end
+        values['local_date'] = local_date
+
+
+def _format_rss():
+    peak = peak_rss_mb()
+    return f"{peak:.1f} MB" if peak is not None else "unavailable"
+
 
 def safe_convert_to_utc(dt_with_tz, original_tz):
     """
@@ -42,7 +113,7 @@ def safe_convert_to_utc(dt_with_tz, original_tz):
     """
     try:
         # Try to convert to UTC
-        utc_dt = dt_with_tz.astimezone(ZoneInfo('UTC'))
+        utc_dt = dt_with_tz.astimezone(get_zoneinfo('UTC'))
         return utc_dt, True
     except Exception as e:
         print(f"Warning: Could not convert to UTC: {e}")
@@ -52,7 +123,7 @@ def safe_convert_to_utc(dt_with_tz, original_tz):
                 offset = original_tz.utcoffset(dt_with_tz)
                 if offset:
                     utc_dt = dt_with_tz - offset
-                    utc_dt = utc_dt.replace(tzinfo=ZoneInfo('UTC'))
+                    utc_dt = utc_dt.replace(tzinfo=get_zoneinfo('UTC'))
                     return utc_dt, True
         except Exception as fallback_e:
             print(f"Fallback UTC conversion also failed: {fallback_e}")
@@ -87,12 +158,14 @@ def debug_timezone_parsing(datetime_str, appointment_id):
     print("=" * 50)
 
 
-def extract_timezone_from_datetime(datetime_str):
+def extract_timezone_from_datetime(datetime_str, calendar_timezone=''):
     """
     Extract timezone information from a datetime string.
     
     Args:
         datetime_str: the datetime string from Acuity API
+        calendar_timezone: IANA timezone of the appointment's calendar, if known;
+            it decides between zones that share the offset on that date
     
     Returns:
         string: timezone name or 'UTC' if not found
@@ -101,53 +174,10 @@ def extract_timezone_from_datetime(datetime_str):
         return 'UTC'
     
     try:
-        # Handle Z suffix (UTC)
-        if datetime_str.endswith('Z'):
+        on_date, offset = split_offset(datetime_str)
+        if not offset:
             return 'UTC'
-        
-        # Handle timezone offset patterns
-        if 'T' in datetime_str and len(datetime_str) > 4:
-            # Look for timezone offset at the end
-            if datetime_str[-5] in ('+', '-'):
-                offset = datetime_str[-5:]
-                # Map common US timezone offsets
-                if offset == '-0500':
-                    return 'America/New_York'  # EST
-                elif offset == '-0400':
-                    return 'America/New_York'  # EDT
-                elif offset == '-0800':
-                    return 'America/Los_Angeles'  # PST
-                elif offset == '-0700':
-                    return 'America/Los_Angeles'  # PDT
-                elif offset == '-0600':
-                    return 'America/Chicago'  # CST
-                elif offset == '-0500':
-                    return 'America/Chicago'  # CDT
-                elif offset == '-0700':
-                    return 'America/Denver'  # MST
-                elif offset == '-0600':
-                    return 'America/Denver'  # MDT
-                elif offset == '-0900':
-                    return 'America/Anchorage'  # AKST
-                elif offset == '-0800':
-                    return 'America/Anchorage'  # AKDT
-                elif offset == '-1000':
-                    return 'Pacific/Honolulu'  # HST
-                else:
-                    # For other offsets, try to create a timezone name
-                    try:
-                        hours = int(offset[1:3])
-                        minutes = int(offset[3:5])
-                        if offset[0] == '-':
-                            return f"UTC-{hours:02d}:{minutes:02d}"
-                        else:
-                            return f"UTC+{hours:02d}:{minutes:02d}"
-                    except:
-                        return 'UTC'
-        
-        # If no timezone info found, return UTC
-        return 'UTC'
-        
+        return resolve_timezone(calendar_timezone, offset, on_date)
     except Exception as e:
         print(f"Error extracting timezone from datetime string: {e}")
         return 'UTC'
@@ -157,8 +187,29 @@ class AcuityService:
     def __init__(self):
         self.base_url = "https://acuityscheduling.com/api/v1"
         self.auth = HTTPBasicAuth(settings.ACUITY_USER_ID, settings.ACUITY_API_KEY)
+        # Calendar list from the last sync_calendars() call, reused by sync_appointments()
+        self._calendars_data = None
+        self._timezone_resolver = None
 
     def _parse_acuity_datetime(self, apt_data, time_key):
+        """
+        Parses a datetime field of an Acuity appointment, converted to UTC.
+
+        The common formats go through `fast_parse_acuity_datetime`; anything it
+        does not recognise falls back to `_parse_acuity_datetime_slow`.
+
+        Returns:
+            tuple: (datetime, None) or (None, error message)
+        """
+        time_str = apt_data.get(time_key)
+        if not time_str:
+            return None, f"Missing '{time_key}' field"
+        parsed = fast_parse_acuity_datetime(time_str, apt_data.get('date'), apt_data.get('timezone'))
+        if parsed is not None:
+            return parsed, None
+        return self._parse_acuity_datetime_slow(apt_data, time_key)
+
+    def _parse_acuity_datetime_slow(self, apt_data, time_key):
         """
         Parses the many datetime formats returned by the Acuity API.
         
@@ -221,7 +272,7 @@ class AcuityService:
                 tz_str = apt_data.get('timezone')
                 if tz_str:
                     try:
-                        tz = ZoneInfo(tz_str)
+                        tz = get_zoneinfo(tz_str)
                         dt_with_tz = naive_dt.replace(tzinfo=tz)
                         # Convert to UTC for storage using safe conversion
                         utc_dt, success = safe_convert_to_utc(dt_with_tz, tz)
@@ -264,355 +315,482 @@ class AcuityService:
             logging.exception('Unexpected error in get_appointment_types')
             return []
 
+    def _fetch_appointments_page(self, params):
+        """GET one page of /appointments; used by AppointmentPager."""
+        return requests.get(f"{self.base_url}/appointments", auth=self.auth, params=params)
+
     def get_appointments(self, calendar_id=None, start_date=None, end_date=None):
         """Fetch appointments from Acuity API with pagination support"""
         all_appointments = []
-        page = 1
-        
-        while True:
-            try:
-                params = {'page': page}
-                if calendar_id:
-                    params['calendarID'] = calendar_id
-                if start_date:
-                    params['minDate'] = start_date.strftime('%Y-%m-%d')
-                if end_date:
-                    params['maxDate'] = end_date.strftime('%Y-%m-%d')
-                    
-                response = requests.get(f"{self.base_url}/appointments", auth=self.auth, params=params)
-                response.raise_for_status()
-                appointments = response.json()
-                
-                # If no appointments returned, we've reached the end
-                if not appointments:
-                    break
-                    
+        params = {}
+        if calendar_id:
+            params['calendarID'] = calendar_id
+        if start_date:
+            params['minDate'] = start_date.strftime('%Y-%m-%d')
+        if end_date:
+            params['maxDate'] = end_date.strftime('%Y-%m-%d')
+        pager = AppointmentPager(self._fetch_appointments_page, params)
+
+        try:
+            for page, appointments, page_stats in pager:
                 all_appointments.extend(appointments)
-                page += 1
-                
-                # Optional: Add a safety limit to prevent infinite loops
-                if page > 1000:  # Max 1000 pages (100,000 appointments)
-                    print("Warning: Reached maximum page limit (1000). Some appointments may not be fetched.")
-                    break
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"Error fetching appointments page {page}: {e}")
-                break
-            except Exception as e:
-                import logging
-                logging.exception(f'Unexpected error in get_appointments page {page}')
-                break
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching appointments page {pager.pages + 1}: {e}")
+        except Exception as e:
+            import logging
+            logging.exception(f'Unexpected error in get_appointments page {pager.pages + 1}')
         
-        print(f"Fetched {len(all_appointments)} total appointments across {page-1} pages")
+        print(f"Fetched {len(all_appointments)} total appointments across {pager.pages} pages")
         return all_appointments
 
+    def _bulk_upsert(self, model, key_field, rows):
+        """
+        Set-based upsert of Acuity metadata rows.
+
+        `rows` maps the Acuity ID (stored in `key_field`) to the field values.
+        Existing rows are read with one query and diffed in memory; new rows go
+        in with one bulk_create and changed rows with one bulk_update. Unchanged
+        rows are not written at all.
+
+        Returns:
+            tuple: (created_count, updated_count)
+        """
+        existing = model.objects.in_bulk(list(rows), field_name=key_field)
+        has_updated_at = any(f.name == 'updated_at' for f in model._meta.concrete_fields)
+        new_objs = []
+        update_objs = []
+        update_fields = set()
+        for key, values in rows.items():
+            obj = existing.get(key)
+            if obj is None:
+                new_objs.append(model(**{key_field: key}, **values))
+                continue
+            changes = diff_model_fields(obj, values)
+            if not changes:
+                continue
+            for field_name in changes:
+                setattr(obj, field_name, values[field_name])
+            update_fields.update(changes)
+            update_objs.append(obj)
+        if new_objs:
+            model.objects.bulk_create(new_objs)
+        if update_objs:
+            if has_updated_at:
+                # bulk_update skips auto_now, so stamp it like save() would
+                now = timezone.now()
+                for obj in update_objs:
+                    obj.updated_at = now
+                update_fields.add('updated_at')
+            model.objects.bulk_update(update_objs, sorted(update_fields))
+        return len(new_objs), len(update_objs)
+
     def sync_calendars(self):
-        """Sync calendars from Acuity to local database"""
+        """
+        Sync calendars from Acuity to local database.
+
+        The fetched list is kept on the service so a following
+        `sync_appointments` call does not fetch it again.
+        """
         calendars_data = self.get_calendars()
+        self._calendars_data = calendars_data
+        self._timezone_resolver = CalendarTimezoneResolver.from_acuity_calendars(calendars_data)
+        rows = {}
         for cal_data in calendars_data:
-            Calendar.objects.update_or_create(
-                acuity_calendar_id=str(cal_data['id']),
-                defaults={
-                    'name': cal_data['name'],
-                    'description': cal_data.get('description', ''),
-                }
-            )
+            rows[str(cal_data['id'])] = {
+                'name': cal_data['name'],
+                'description': cal_data.get('description', ''),
+                'timezone': cal_data.get('timezone') or '',
+            }
+        created, updated = self._bulk_upsert(Calendar, 'acuity_calendar_id', rows)
+        print(f"Calendars synced: {created} new, {updated} updated, {len(rows) - created - updated} unchanged")
+        return calendars_data
 
     def sync_appointment_types(self):
         """Sync appointment types from Acuity to local database"""
         types_data = self.get_appointment_types()
+        rows = {}
         for type_data in types_data:
-            AppointmentType.objects.update_or_create(
-                acuity_type_id=str(type_data['id']),
-                defaults={
-                    'name': type_data['name'],
-                    'duration': type_data['duration'],
-                    'price': type_data.get('price', 0),
-                    'description': type_data.get('description', ''),
-                }
-            )
-
-    def sync_appointments(self, calendar_id=None, batch_size=100, days_back=60):
-        """Sync appointments from Acuity to local database in batches to prevent memory issues"""
-        from django.db import transaction
-        from datetime import datetime, timedelta
-        
+            rows[str(type_data['id'])] = {
+                'name': type_data['name'],
+                'duration': type_data['duration'],
+                'price': type_data.get('price', 0),
+                'description': type_data.get('description', ''),
+            }
+        created, updated = self._bulk_upsert(AppointmentType, 'acuity_type_id', rows)
+        print(f"Appointment types synced: {created} new, {updated} updated, {len(rows) - created - updated} unchanged")
+        return types_data
+
+    @property
+    def timezone_resolver(self):
+        """Calendar timezone lookups, loaded from the database unless sync_calendars ran first."""
+        if self._timezone_resolver is None:
+            self._timezone_resolver = CalendarTimezoneResolver.from_database()
+        return self._timezone_resolver
+
+    def _extract_appointment_timezone(self, apt_data, default='UTC'):
+        """
+        Return the IANA timezone for an Acuity appointment.
+
+        Acuity normally sends it; otherwise it is resolved from the calendar's
+        timezone and the offset of the appointment datetime.
+        """
+        timezone_str = apt_data.get('timezone', '')
+        if not timezone_str:
+            dt_str = apt_data.get('datetime', '')
+            calendar_id = apt_data.get('calendarID')
+            if 'T' in dt_str:
+                # Debug timezone parsing for troubleshooting (commented out for production)
+                # debug_timezone_parsing(dt_str, apt_data.get('id', 'unknown'))
+                timezone_str = self.timezone_resolver.resolve(calendar_id, dt_str)
+            else:
+                timezone_str = self.timezone_resolver.calendar_timezone(calendar_id) or default
+        return timezone_str
+
+    def _appointment_field_values(self, apt_data):
+        """
+        Decode one Acuity appointment into local Appointment field values.
+
+        The calendar and appointment type are resolved by the caller.
+
+        Returns:
+            tuple: (dict of field values, None) or (None, error message)
+        """
+        start_time, start_err = self._parse_acuity_datetime(apt_data, 'datetime')
+        if start_err:
+            return None, f"start time error: {start_err}"
+        end_time, end_err = self._parse_acuity_datetime(apt_data, 'endTime')
+        if end_err:
+            return None, f"end time error: {end_err}"
+
+        # Extract processing fee from form data (default to 0.0 if not found)
+        forms = apt_data.get('forms', [])
+        form_fields = flatten_form_data(forms)
+        form_values = extract_form_fields(form_fields)
+        processing_fee = form_values['processing_fee_any']
+        try:
+            processing_fee = float(processing_fee) if processing_fee is not None else 0.0
+        except Exception:
+            processing_fee = 0.0
+
+        # Extract color tag from labels
+        color_tag = ''
+        labels = apt_data.get('labels', [])
+        if labels and isinstance(labels, list) and len(labels) > 0:
+            color_tag = labels[0].get('color', '')
+
+        return {
+            'client_name': f"{apt_data.get('firstName', '')} {apt_data.get('lastName', '')}",
+            'client_email': apt_data.get('email', ''),
+            'client_phone': apt_data.get('phone', ''),
+            'start_time': start_time,
+            'end_time': end_time,
+            'notes': apt_data.get('notes', ''),
+            'price': apt_data.get('price', 0),
+            'status': apt_data.get('status', 'scheduled').lower(),
+            'form_data': forms,
+            'form_fields': form_fields,
+            'processing_fee': processing_fee,
+            'original_timezone': self._extract_appointment_timezone(apt_data),
+            'last_synced': timezone.now(),
+            'color_tag': color_tag,
+            **order_columns(form_values),
+        }, None
+
+    def _diff_appointment(self, appt, values):
+        """
+        Compare decoded Acuity values with an existing Appointment.
+
+        Returns:
+            dict: {field_name: (old, new)} for every field that differs
+        """
+        return diff_model_fields(appt, values, ignored=DIFF_IGNORED_FIELDS)
+
+    def sync_appointments(self, calendar_id=None, batch_size=100, days_back=60, shard=None, window_days=None,
+                          dry_run=False, calendars=None):
+        """
+        Sync appointments from Acuity to local database in batches to prevent memory issues.
+
+        The work is split into chunks: one per calendar, or one per calendar and
+        `window_days`-day window. When `shard` is an (index, count) tuple, e.g.
+        (2, 4), only the chunks that hash to that shard are synced and each one is
+        claimed through a `SyncLease` row first, so M cooperating processes (on one
+        host or several) split an account between them without overlapping.
+
+        The calendar list comes from `calendars`, else from the preceding
+        `sync_calendars()` call on this service, else from the API.
+
+        Fetched rows are compared with the local ones field by field; only new and
+        changed rows are written. With `dry_run=True` nothing is written at all
+        (not even leases) and the returned changeset carries field-level diffs.
+
+        Returns:
+            SyncChangeset: the inserts, updates and candidate cancellations
+        """
         # Calculate date range: yesterday to 3 weeks (21 days) in the future
         end_date = datetime.now() + timedelta(days=21)
         start_date = datetime.now() - timedelta(days=1)
-        
-        print(f"Starting sync with batch size: {batch_size}")
+
+        # batch_size is kept for existing callers; page sizes come from AdaptivePageSizer
+        print(f"Starting {'dry-run ' if dry_run else ''}sync")
+        print_page_mode(AdaptivePageSizer())
         print(f"Calendar ID filter: {calendar_id}")
         print(f"Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')} (last 21 days)")
-        
-        if calendar_id is None:
-            # Fetch all calendars and sync each one
-            calendars = self.get_calendars()
-            total_created = 0
-            total_updated = 0
-            total_processed = 0
-            total_appointments = 0
-            for cal in calendars:
-                cal_id = str(cal['id'])
-                cal_name = cal.get('name', '')
-                print(f"\n--- Syncing calendar: {cal_name} (ID: {cal_id}) ---")
-                created_count = 0
-                updated_count = 0
-                processed_appointment_ids = set()
-                page = 1
-                while True:
+
+        if calendars is None:
+            calendars = self._calendars_data if self._calendars_data is not None else self.get_calendars()
+        if calendar_id is not None:
+            calendars = [cal for cal in calendars if str(cal['id']) == str(calendar_id)]
+        chunks = build_sync_chunks(calendars, start_date, end_date, window_days)
+
+        owner = None
+        shard_label = ''
+        if shard:
+            shard_index, shard_count = shard
+            shard_label = f"{shard_index}/{shard_count}"
+            chunks = chunks_for_shard(chunks, shard_index, shard_count)
+            if not dry_run:
+                owner = lease_owner_id()
+            print(f"Shard {shard_label}: {len(chunks)} chunk(s) assigned to {owner or 'dry run'}")
+
+        # Resolve appointment types once per sync instead of once per row
+        appointment_types = {t.acuity_type_id: t for t in AppointmentType.objects.all()}
+        changeset = SyncChangeset(record_diffs=dry_run)
+
+        total_processed = 0
+        for chunk in chunks:
+            if owner and not claim_chunk(chunk, owner, shard_label):
+                print(f"Chunk {chunk.key} is leased by another process, skipping")
+                changeset.add_skipped_chunk(chunk.key, 'leased by another process')
+                continue
+            status = 'failed'
+            try:
+                total_processed += self._sync_appointment_chunk(chunk, appointment_types, changeset, dry_run, owner)
+                status = 'done'
+            finally:
+                if owner:
+                    release_chunk(chunk, owner, status)
+
+        verb = 'to be ' if dry_run else ''
+        print(f"\n=== All calendars {'dry-run ' if dry_run else ''}sync summary ===")
+        print(f"Total new appointments {verb}created: {len(changeset.inserts)}")
+        print(f"Total existing appointments {verb}updated: {len(changeset.updates)}")
+        print(f"Total existing appointments unchanged: {changeset.unchanged}")
+        print(f"Total candidate cancellations: {len(changeset.cancellations)}")
+        print(f"Total chunks skipped: {len(changeset.skipped_chunks)} of {len(chunks)}")
+        print(f"Total unique appointments processed: {total_processed}")
+        print(f"Total appointments in database: {Appointment.objects.count()}")
+        print(f"Peak RSS: {_format_rss()}")
+        return changeset
+
+    def preview_appointment_sync(self, calendar_id=None, shard=None, window_days=None):
+        """
+        Fetch and decode appointments exactly like `sync_appointments` but write nothing.
+
+        Returns:
+            SyncChangeset: inserts, updates with (old, new) per field, and candidate cancellations
+        """
+        return self.sync_appointments(calendar_id=calendar_id, shard=shard, window_days=window_days, dry_run=True)
+
+    def _sync_appointment_chunk(self, chunk, appointment_types, changeset, dry_run=False, owner=None):
+        """
+        Fetch every appointment of one sync chunk page by page, diff it against
+        the local rows and save the inserts and updates (unless `dry_run`).
+
+        With a lease `owner`, the chunk's lease is renewed after every page;
+        if another process took it over meanwhile, the chunk stops there.
+
+        Returns:
+            int: number of unique appointments processed
+        """
+        try:
+            calendar_obj = Calendar.objects.get(acuity_calendar_id=chunk.calendar_id)
+        except Calendar.DoesNotExist:
+            print(f"Warning: calendar {chunk.calendar_id} is not synced locally, skipping chunk {chunk.key}")
+            changeset.add_skipped_chunk(chunk.key, f'calendar {chunk.calendar_id} is not synced locally')
+            return 0
+
+        print(f"\n--- Syncing calendar: {chunk.calendar_name} (ID: {chunk.calendar_id}) "
+              f"{chunk.min_date} to {chunk.max_date} ---")
+        created_count = 0
+        updated_count = 0
+        processed_appointment_ids = set()
+        params = {
+            'calendarID': chunk.calendar_id,
+            'canceled': 'all',
+            'minDate': chunk.min_date.strftime('%Y-%m-%d'),
+            'maxDate': chunk.max_date.strftime('%Y-%m-%d'),
+        }
+        pager = AppointmentPager(self._fetch_appointments_page, params, AdaptivePageSizer())
+        lease_lost = False
+        try:
+            for page, appointments_batch, page_stats in pager:
+                print(f"API returned {len(appointments_batch)} appointments for page {page} "
+                      f"(max {page_stats['max']}, {page_stats['bytes'] // 1024} KB, {page_stats['seconds']:.2f}s)")
+                current_batch_ids = {apt.get('id') for apt in appointments_batch}
+                processed_appointment_ids.update(current_batch_ids)
+                new_objs = []
+                update_objs = []
+                unchanged_pks = []
+                batch_ids = [str(apt.get('id')) for apt in appointments_batch]
+                existing_appointments = Appointment.objects.filter(acuity_appointment_id__in=batch_ids)
+                existing_map = {a.acuity_appointment_id: a for a in existing_appointments}
+                decoded = []
+                for apt_data in appointments_batch:
+                    appointment_type_id_val = str(apt_data.get('appointmentTypeID'))
+                    appointment_type = appointment_types.get(appointment_type_id_val)
+                    if appointment_type is None:
+                        print(f"Skipping appointment {apt_data.get('id', 'N/A')}: "
+                              f"appointment type {appointment_type_id_val} is not synced locally")
+                        continue
                     try:
-                        params = {'page': page, 'max': 2000, 'calendarID': cal_id, 'canceled': 'all'}
-                        params['minDate'] = start_date.strftime('%Y-%m-%d')
-                        params['maxDate'] = end_date.strftime('%Y-%m-%d')
-                        print(f"Fetching page {page} with params: {params}")
-                        response = requests.get(f"{self.base_url}/appointments", auth=self.auth, params=params)
-                        response.raise_for_status()
-                        appointments_batch = response.json()
-                        print(f"API returned {len(appointments_batch)} appointments for page {page}")
-                        if not appointments_batch:
-                            print(f"No appointments returned for page {page}, stopping sync for this calendar")
-                            break
-                        current_batch_ids = {apt.get('id') for apt in appointments_batch}
-                        if page > 1 and current_batch_ids.intersection(processed_appointment_ids):
-                            print(f"Page {page} contains duplicate appointments. Stopping sync for this calendar.")
-                            break
-                        processed_appointment_ids.update(current_batch_ids)
-                        batch_created = 0
-                        batch_updated = 0
-                        new_objs = []
-                        update_objs = []
-                        batch_ids = [str(apt.get('id')) for apt in appointments_batch]
-                        existing_appointments = Appointment.objects.filter(acuity_appointment_id__in=batch_ids)
-                        existing_map = {a.acuity_appointment_id: a for a in existing_appointments}
-                        for apt_data in appointments_batch:
-                            try:
-                                calendar_obj = Calendar.objects.get(acuity_calendar_id=cal_id)
-                                appointment_type_id_val = str(apt_data.get('appointmentTypeID'))
-                                appointment_type = AppointmentType.objects.get(acuity_type_id=appointment_type_id_val)
-                                start_time, start_err = self._parse_acuity_datetime(apt_data, 'datetime')
-                                end_time, end_err = self._parse_acuity_datetime(apt_data, 'endTime')
-                                if start_err or end_err:
-                                    continue
-                                processing_fee = 0.0
-                                forms = apt_data.get('forms', [])
-                                for form in forms:
-                                    for field in form.get('values', []):
-                                        name = field.get('name', '').lower()
-                                        if 'processing fee' in name or 'fee:' in name:
-                                            try:
-                                                processing_fee = float(field.get('value', 0.0))
-                                            except Exception:
-                                                processing_fee = 0.0
-                                            break
-                                color_tag = ''
-                                labels = apt_data.get('labels', [])
-                                if labels and isinstance(labels, list) and len(labels) > 0:
-                                    color_tag = labels[0].get('color', '')
-                                
-                                # Extract timezone information
-                                timezone_str = apt_data.get('timezone', '')
-                                if not timezone_str:
-                                    # Try to get timezone from the datetime string if available
-                                    if 'T' in apt_data.get('datetime', ''):
-                                        dt_str = apt_data.get('datetime', '')
-                                        # Debug timezone parsing for troubleshooting (commented out for production)
-                                        # debug_timezone_parsing(dt_str, apt_data.get('id', 'unknown'))
-                                        # Use the new robust timezone extraction function
-                                        timezone_str = extract_timezone_from_datetime(dt_str)
-                                    else:
-                                        timezone_str = 'UTC'
-                                
-                                acuity_id = str(apt_data.get('id', ''))
-                                if acuity_id in existing_map:
-                                    # Update existing
-                                    appt = existing_map[acuity_id]
-                                    appt.calendar = calendar_obj
-                                    appt.appointment_type = appointment_type
-                                    appt.client_name = f"{apt_data.get('firstName', '')} {apt_data.get('lastName', '')}"
-                                    appt.client_email = apt_data.get('email', '')
-                                    appt.client_phone = apt_data.get('phone', '')
-                                    appt.start_time = start_time
-                                    appt.end_time = end_time
-                                    appt.notes = apt_data.get('notes', '')
-                                    appt.price = apt_data.get('price', 0)
-                                    appt.status = apt_data.get('status', 'scheduled').lower()
-                                    appt.form_data = forms
-                                    appt.processing_fee = processing_fee
-                                    appt.original_timezone = timezone_str
-                                    appt.last_synced = timezone.now()
-                                    appt.color_tag = color_tag
-                                    update_objs.append(appt)
-                                    batch_updated += 1
-                                    updated_count += 1
-                                else:
-                                    # New object
-                                    appt = Appointment(
-                                        acuity_appointment_id=acuity_id,
-                                        calendar=calendar_obj,
-                                        appointment_type=appointment_type,
-                                        client_name=f"{apt_data.get('firstName', '')} {apt_data.get('lastName', '')}",
-                                        client_email=apt_data.get('email', ''),
-                                        client_phone=apt_data.get('phone', ''),
-                                        start_time=start_time,
-                                        end_time=end_time,
-                                        notes=apt_data.get('notes', ''),
-                                        price=apt_data.get('price', 0),
-                                        status=apt_data.get('status', 'scheduled').lower(),
-                                        form_data=forms,
-                                        processing_fee=processing_fee,
-                                        original_timezone=timezone_str,
-                                        last_synced=timezone.now(),
-                                        color_tag=color_tag,
-                                    )
-                                    new_objs.append(appt)
-                                    batch_created += 1
-                                    created_count += 1
-                            except Exception as e:
-                                import logging
-                                logging.exception(f"Unexpected error syncing appointment {apt_data.get('id', 'unknown')}")
+                        values, error = self._appointment_field_values(apt_data)
+                    except Exception:
+                        import logging
+                        logging.exception(f"Unexpected error decoding appointment {apt_data.get('id', 'unknown')}")
+                        continue
+                    if error:
+                        continue
+                    values['calendar'] = calendar_obj
+                    values['appointment_type'] = appointment_type
+                    decoded.append((apt_data, values))
+                add_local_times([values for _, values in decoded])
+
+                for apt_data, values in decoded:
+                    try:
+                        acuity_id = str(apt_data.get('id', ''))
+                        if acuity_id in existing_map:
+                            appt = existing_map[acuity_id]
+                            if apt_data.get('canceled') and appt.status != 'cancelled':
+                                changeset.add_cancellation(acuity_id, 'canceled in Acuity')
+                            changes = self._diff_appointment(appt, values)
+                            if not changes:
+                                changeset.unchanged += 1
+                                unchanged_pks.append(appt.pk)
                                 continue
-                        # Bulk create and update
-                        if new_objs:
-                            Appointment.objects.bulk_create(new_objs, batch_size=2000)
-                        if update_objs:
-                            Appointment.objects.bulk_update(update_objs, [
-                                'calendar', 'appointment_type', 'client_name', 'client_email', 'client_phone',
-                                'start_time', 'end_time', 'notes', 'price', 'status', 'form_data',
-                                'processing_fee', 'original_timezone', 'last_synced', 'color_tag'
-                            ], batch_size=2000)
-                        print(f"Batch {page} saved to database: {batch_created} created, {batch_updated} updated")
-                        page += 1
-                        if page > 1000:
-                            print("Warning: Reached maximum page limit (1000). Some appointments may not be fetched.")
-                            break
+                            # Update existing
+                            changeset.add_update(acuity_id, changes)
+                            for field_name, value in values.items():
+                                setattr(appt, field_name, value)
+                            update_objs.append(appt)
+                        else:
+                            # New object
+                            changeset.add_insert(acuity_id, values)
+                            new_objs.append(Appointment(acuity_appointment_id=acuity_id, **values))
                     except Exception as e:
                         import logging
-                        logging.exception(f'Unexpected error in sync_appointments page {page}')
-                        break
-                print(f"Sync completed for calendar {cal_name}: {created_count} new, {updated_count} updated, {len(processed_appointment_ids)} unique appointments processed.")
-                total_created += created_count
-                total_updated += updated_count
-                total_processed += len(processed_appointment_ids)
-            print(f"\n=== All calendars sync summary ===")
-            print(f"Total new appointments created: {total_created}")
-            print(f"Total existing appointments updated: {total_updated}")
-            print(f"Total unique appointments processed: {total_processed}")
-            print(f"Total appointments in database: {Appointment.objects.count()}")
-            return
-        # If calendar_id is provided, use the original logic for a single calendar
-        # ... existing code ...
+                        logging.exception(f"Unexpected error syncing appointment {apt_data.get('id', 'unknown')}")
+                        continue
+                if not dry_run:
+                    # Bulk create and update; unchanged rows only get their sync timestamp bumped
+                    if new_objs:
+                        Appointment.objects.bulk_create(new_objs, batch_size=2000)
+                    if update_objs:
+                        Appointment.objects.bulk_update(update_objs, APPOINTMENT_SYNC_FIELDS, batch_size=2000)
+                        # bulk_update sends no post_save, so drop the changed rows' cached PDFs here
+                        discard_confirmations([appt.pk for appt in update_objs])
+                    if unchanged_pks:
+                        Appointment.objects.filter(pk__in=unchanged_pks).update(last_synced=timezone.now())
+                created_count += len(new_objs)
+                updated_count += len(update_objs)
+                print(f"Batch {page} {'diffed' if dry_run else 'saved to database'}: {len(new_objs)} new, "
+                      f"{len(update_objs)} changed, {len(unchanged_pks)} unchanged")
+                del appointments_batch
+                if owner and not renew_chunk(chunk, owner):
+                    print(f"Warning: lease on chunk {chunk.key} was taken over by another process, stopping")
+                    changeset.add_skipped_chunk(chunk.key, f'lease lost after page {page}')
+                    lease_lost = True
+                    break
+        except Exception as e:
+            import logging
+            logging.exception(f'Unexpected error in sync_appointments page {pager.pages + 1}')
+
+        # Only once the query reached its end (an empty or short page): after an error, a
+        # repeated page, the page limit or a lost lease, rows missing from the fetch prove nothing.
+        if pager.complete and not lease_lost:
+            # Local appointments in this window that Acuity no longer returns. minDate/maxDate
+            # are calendar-local dates, so trim a day off both ends of the UTC window to stay
+            # clear of appointments that belong to a neighbouring window.
+            window_start = timezone.make_aware(datetime.combine(chunk.min_date + timedelta(days=1), datetime.min.time()))
+            window_end = timezone.make_aware(datetime.combine(chunk.max_date, datetime.min.time()))
+            seen_ids = {str(apt_id) for apt_id in processed_appointment_ids}
+            missing = Appointment.objects.filter(
+                calendar=calendar_obj, start_time__gte=window_start, start_time__lt=window_end,
+            ).exclude(status='cancelled').values_list('acuity_appointment_id', flat=True)
+            for acuity_id in missing:
+                if acuity_id not in seen_ids:
+                    changeset.add_cancellation(acuity_id, 'no longer returned by Acuity')
+
+        print(f"Sync completed for calendar {chunk.calendar_name}: {created_count} new, {updated_count} updated, "
+              f"{len(processed_appointment_ids)} unique appointments processed.")
+        return len(processed_appointment_ids)
 
     def sync_appointments_by_date_range(self, start_date=None, end_date=None, calendar_id=None, batch_size=100):
         """Sync appointments from Acuity to local database by date range to minimize memory usage"""
         from django.db import transaction
         
-        print(f"Starting date-range sync: {start_date} to {end_date} with batch size: {batch_size}")
+        print(f"Starting date-range sync: {start_date} to {end_date}")
         
         created_count = 0
         updated_count = 0
         total_processed = 0
-        page = 1
+        params = {}
+        if calendar_id:
+            params['calendarID'] = calendar_id
+        if start_date:
+            params['minDate'] = start_date.strftime('%Y-%m-%d')
+        if end_date:
+            params['maxDate'] = end_date.strftime('%Y-%m-%d')
+        # With ACUITY_PAGE_PARAM_SUPPORTED, batch_size is the first page size and later pages adapt
+        # to the observed row size and latency; otherwise it is ignored and every page asks for
+        # UNPAGED_PAGE_SIZE rows
+        sizer = AdaptivePageSizer(initial=batch_size)
+        print_page_mode(sizer)
+        pager = AppointmentPager(self._fetch_appointments_page, params, sizer)
         
-        while True:
-            try:
-                # Fetch one batch of appointments for the date range
-                params = {'page': page, 'max': batch_size}
-                if calendar_id:
-                    params['calendarID'] = calendar_id
-                if start_date:
-                    params['minDate'] = start_date.strftime('%Y-%m-%d')
-                if end_date:
-                    params['maxDate'] = end_date.strftime('%Y-%m-%d')
-                    
-                response = requests.get(f"{self.base_url}/appointments", auth=self.auth, params=params)
-                response.raise_for_status()
-                appointments_batch = response.json()
-                
-                # If no appointments returned, we've reached the end
-                if not appointments_batch:
-                    break
-                
+        try:
+            for page, appointments_batch, page_stats in pager:
                 print(f"Processing batch {page}: {len(appointments_batch)} appointments")
                 
                 # Process this batch and save to database immediately
                 batch_created = 0
                 batch_updated = 0
                 
-                with transaction.atomic():
-                    for apt_data in appointments_batch:
-                        try:
-                            calendar_id_val = str(apt_data.get('calendarID'))
-                            appointment_type_id_val = str(apt_data.get('appointmentTypeID'))
-
-                            if not calendar_id_val or not appointment_type_id_val:
-                                print(f"Skipping appointment {apt_data.get('id', 'N/A')} due to missing calendarID or appointmentTypeID.")
-                                continue
+                decoded = []
+                for apt_data in appointments_batch:
+                    try:
+                        calendar_id_val = str(apt_data.get('calendarID'))
+                        appointment_type_id_val = str(apt_data.get('appointmentTypeID'))
 
-                            calendar = Calendar.objects.get(acuity_calendar_id=calendar_id_val)
-                            appointment_type = AppointmentType.objects.get(acuity_type_id=appointment_type_id_val)
-                            
-                            # Defensive: handle missing or malformed datetime fields
-                            start_time, start_err = self._parse_acuity_datetime(apt_data, 'datetime')
-                            end_time, end_err = self._parse_acuity_datetime(apt_data, 'endTime')
+                        if not calendar_id_val or not appointment_type_id_val:
+                            print(f"Skipping appointment {apt_data.get('id', 'N/A')} due to missing calendarID or appointmentTypeID.")
+                            continue
 
-                            if start_err:
-                                print(f"Skipping appointment {apt_data.get('id', 'N/A')} due to start time error: {start_err}")
-                                continue
-                            if end_err:
-                                # We might have a valid start but not a valid end.
-                                print(f"Skipping appointment {apt_data.get('id', 'N/A')} due to end time error: {end_err}")
-                                continue
+                        calendar = Calendar.objects.get(acuity_calendar_id=calendar_id_val)
+                        appointment_type = AppointmentType.objects.get(acuity_type_id=appointment_type_id_val)
 
-                            # Extract processing fee from form data (default to 0.0 if not found)
-                            forms = apt_data.get('forms', [])
-                            processing_fee = get_form_field(forms, ['processing fee', 'fee:'])
-                            if processing_fee is not None:
-                                try:
-                                    processing_fee = float(processing_fee)
-                                except Exception:
-                                    processing_fee = 0.0
-                            else:
-                                processing_fee = 0.0
-
-                            # Extract color tag from labels
-                            color_tag = ''
-                            labels = apt_data.get('labels', [])
-                            if labels and isinstance(labels, list) and len(labels) > 0:
-                                color_tag = labels[0].get('color', '')
-
-                            # Extract timezone information
-                            timezone_str = apt_data.get('timezone', '')
-                            if not timezone_str:
-                                # Try to get timezone from the datetime string if available
-                                if 'T' in apt_data.get('datetime', ''):
-                                    dt_str = apt_data.get('datetime', '')
-                                    # Debug timezone parsing for troubleshooting (commented out for production)
-                                    # debug_timezone_parsing(dt_str, apt_data.get('id', 'unknown'))
-                                    # Use the new robust timezone extraction function
-                                    timezone_str = extract_timezone_from_datetime(dt_str)
-                                else:
-                                    timezone_str = 'UTC'
+                        # Defensive: handle missing or malformed datetime fields
+                        values, error = self._appointment_field_values(apt_data)
+                        if error:
+                            print(f"Skipping appointment {apt_data.get('id', 'N/A')} due to {error}")
+                            continue
+                        values['calendar'] = calendar
+                        values['appointment_type'] = appointment_type
+                        decoded.append((apt_data, values))
+                    except (Calendar.DoesNotExist, AppointmentType.DoesNotExist) as e:
+                        print(f"Error syncing appointment {apt_data.get('id', 'unknown')}: {e}")
+                        continue
+                    except Exception as e:
+                        import logging
+                        logging.exception(f"Unexpected error syncing appointment {apt_data.get('id', 'unknown')}")
+                        continue
+                add_local_times([values for _, values in decoded])
 
+                with transaction.atomic():
+                    for apt_data, values in decoded:
+                        try:
                             appointment, created = Appointment.objects.update_or_create(
                                 acuity_appointment_id=str(apt_data.get('id', '')),
-                                defaults={
-                                    'calendar': calendar,
-                                    'appointment_type': appointment_type,
-                                    'client_name': f"{apt_data.get('firstName', '')} {apt_data.get('lastName', '')}",
-                                    'client_email': apt_data.get('email', ''),
-                                    'client_phone': apt_data.get('phone', ''),
-                                    'start_time': start_time,
-                                    'end_time': end_time,
-                                    'notes': apt_data.get('notes', ''),
-                                    'price': apt_data.get('price', 0),
-                                    'status': apt_data.get('status', 'scheduled').lower(),
-                                    'form_data': forms,
-                                    'processing_fee': processing_fee,
-                                    'original_timezone': timezone_str,
-                                    'last_synced': timezone.now(),
-                                    'color_tag': color_tag,
-                                }
+                                defaults=values,
                             )
                             
                             if created:
@@ -624,9 +802,6 @@ class AcuityService:
                             
                             total_processed += 1
                                 
-                        except (Calendar.DoesNotExist, AppointmentType.DoesNotExist) as e:
-                            print(f"Error syncing appointment {apt_data.get('id', 'unknown')}: {e}")
-                            continue
                         except Exception as e:
                             import logging
                             logging.exception(f"Unexpected error syncing appointment {apt_data.get('id', 'unknown')}")
@@ -637,25 +812,16 @@ class AcuityService:
                 
                 # Clear the batch from memory
                 del appointments_batch
-                
-                # Move to next page
-                page += 1
-                
-                # Optional: Add a safety limit to prevent infinite loops
-                if page > 1000:  # Max 1000 pages (100,000 appointments with batch_size=100)
-                    print("Warning: Reached maximum page limit (1000). Some appointments may not be fetched.")
-                    break
                     
-            except requests.exceptions.RequestException as e:
-                print(f"Error fetching appointments page {page}: {e}")
-                break
-            except Exception as e:
-                import logging
-                logging.exception(f'Unexpected error in sync_appointments_by_date_range page {page}')
-                break
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching appointments page {pager.pages + 1}: {e}")
+        except Exception as e:
+            import logging
+            logging.exception(f'Unexpected error in sync_appointments_by_date_range page {pager.pages + 1}')
         
         print(f"Date-range sync completed: {created_count} new appointments created, {updated_count} existing appointments updated")
-        print(f"Total appointments processed: {total_processed} across {page-1} pages")
+        print(f"Total appointments processed: {total_processed} across {pager.pages} pages")
+        print(f"Peak RSS: {_format_rss()}")
         return created_count, updated_count, total_processed
 
     def get_appointments_count(self, calendar_id=None):
@@ -725,14 +891,7 @@ class AcuityService:
                 return False
             
             # Extract timezone information
-            timezone_str = acuity_data.get('timezone', '')
-            if not timezone_str:
-                # Try to get timezone from the datetime string if available
-                if 'T' in acuity_data.get('datetime', ''):
-                    dt_str = acuity_data.get('datetime', '')
-                    timezone_str = extract_timezone_from_datetime(dt_str)
-                else:
-                    timezone_str = 'America/New_York'  # Default fallback
+            timezone_str = self._extract_appointment_timezone(acuity_data, default='America/New_York')
             
             # Update the appointment
             appointment.original_timezone = timezone_str
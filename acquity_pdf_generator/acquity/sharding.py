@@ -0,0 +1,133 @@
+# scheduling/sharding.py
+import os
+import socket
+import zlib
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SyncLease
+
+# One unit of sync work: a calendar, optionally restricted to a date window.
+SyncChunk = namedtuple('SyncChunk', ['key', 'calendar_id', 'calendar_name', 'min_date', 'max_date'])
+
+# A lease that is not released (e.g. the process was killed) expires after this long.
+# The holder renews it after every page it syncs, so only a stalled page has to fit.
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+
+def parse_shard_spec(spec):
+    """
+    Parse a shard spec of the form 'N/M' (1-based), e.g. '2/4'.
+
+    Returns:
+        tuple: (index, count) with 1 <= index <= count
+
+    Raises:
+        ValueError: if the spec is malformed
+    """
+    try:
+        index_str, count_str = spec.split('/')
+        index, count = int(index_str), int(count_str)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid shard spec '{spec}', expected N/M (e.g. 2/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard spec '{spec}', N must be between 1 and M")
+    return index, count
+
+
+def shard_for_key(key, count):
+    """Deterministically map a chunk key to a 1-based shard index."""
+    return zlib.crc32(key.encode('utf-8')) % count + 1
+
+
+def build_sync_chunks(calendars, start_date, end_date, window_days=None):
+    """
+    Split the calendars (as returned by the Acuity API) into sync chunks.
+
+    Without `window_days` there is one chunk per calendar covering the whole
+    date range. With `window_days` each calendar is further split into
+    consecutive, non-overlapping windows of that many days (Acuity's
+    minDate/maxDate are inclusive).
+    """
+    chunks = []
+    first_day = start_date.date() if hasattr(start_date, 'date') else start_date
+    last_day = end_date.date() if hasattr(end_date, 'date') else end_date
+    for cal in calendars:
+        cal_id = str(cal['id'])
+        cal_name = cal.get('name', '')
+        if not window_days:
+            chunks.append(SyncChunk(f"cal:{cal_id}", cal_id, cal_name, first_day, last_day))
+            continue
+        window_start = first_day
+        while window_start <= last_day:
+            window_end = min(window_start + timedelta(days=window_days - 1), last_day)
+            key = f"cal:{cal_id}:{window_start.strftime('%Y-%m-%d')}"
+            chunks.append(SyncChunk(key, cal_id, cal_name, window_start, window_end))
+            window_start = window_end + timedelta(days=1)
+    return chunks
+
+
+def chunks_for_shard(chunks, index, count):
+    """Return the chunks owned by shard `index` of `count`."""
+    return [chunk for chunk in chunks if shard_for_key(chunk.key, count) == index]
+
+
+def lease_owner_id():
+    """Identify this process across hosts, e.g. 'worker-3:41721'."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_chunk(chunk, owner, shard_label='', lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Try to take the lease for a chunk.
+
+    The claim is a single conditional UPDATE, so it is atomic on every
+    database backend and needs no broker. It succeeds if the lease is free,
+    expired, or already held by `owner`.
+
+    Returns:
+        bool: True if this process now holds the lease
+    """
+    now = timezone.now()
+    try:
+        SyncLease.objects.get_or_create(chunk_key=chunk.key)
+    except IntegrityError:
+        # Another process created the row first, which is fine.
+        pass
+    claimed = SyncLease.objects.filter(chunk_key=chunk.key).filter(
+        Q(owner='') | Q(owner=owner) | Q(expires_at__isnull=True) | Q(expires_at__lt=now)
+    ).update(
+        owner=owner,
+        shard=shard_label,
+        expires_at=now + timedelta(seconds=lease_seconds),
+        last_started_at=now,
+        last_status='running',
+    )
+    return claimed == 1
+
+
+def renew_chunk(chunk, owner, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Extend a lease held by `owner`, e.g. after each synced page of a long chunk.
+
+    Returns:
+        bool: False if the lease expired and another process took the chunk
+    """
+    renewed = SyncLease.objects.filter(chunk_key=chunk.key, owner=owner).update(
+        expires_at=timezone.now() + timedelta(seconds=lease_seconds),
+    )
+    return renewed == 1
+
+
+def release_chunk(chunk, owner, status='done'):
+    """Release a lease held by `owner` and record how the chunk finished."""
+    SyncLease.objects.filter(chunk_key=chunk.key, owner=owner).update(
+        owner='',
+        expires_at=None,
+        last_finished_at=timezone.now(),
+        last_status=status,
+    )
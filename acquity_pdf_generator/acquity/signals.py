@@ -0,0 +1,25 @@
+# scheduling/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Appointment, PricingSetting
+from .pdf_cache import clear_confirmations, discard_confirmations
+from .pricing import bump_pricing_version
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def discard_appointment_confirmation(sender, instance, **kwargs):
+    # Saves that only touch bookkeeping fields keep the cached confirmation
+    update_fields = kwargs.get('update_fields')
+    if update_fields and update_fields <= {'last_synced', 'updated_at'}:
+        return
+    discard_confirmations([instance.pk])
+
+
+@receiver(post_save, sender=PricingSetting)
+@receiver(post_delete, sender=PricingSetting)
+def clear_confirmations_on_pricing_change(sender, instance, **kwargs):
+    # Bump first: a render between the two then already uses the new prices
+    bump_pricing_version()
+    clear_confirmations()
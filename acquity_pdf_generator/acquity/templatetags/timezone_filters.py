@@ -1,9 +1,23 @@
 from django import template
 from django.utils import timezone
-from acquity.utils import format_time_in_timezone, django_format_to_python_format
+from acquity.utils import django_format_to_python_format, timezone_formatter
 
 register = template.Library()
 
+
+def _format_local(appointment, field_name, format_string):
+    """
+    Format an appointment datetime in its original timezone with a Django
+    format string, preferring the precomputed local column.
+    """
+    local_value = getattr(appointment, f'local_{field_name}', None)
+    if local_value is not None:
+        return timezone_formatter('', format_string)(local_value)
+    value = getattr(appointment, field_name)
+    if not value:
+        return 'N/A'
+    return timezone_formatter(appointment.original_timezone, format_string)(value)
+
 @register.filter
 def timezone_time(value, format_string="g:i A"):
     """
@@ -16,9 +30,7 @@ def timezone_time(value, format_string="g:i A"):
     # If this is an appointment object, get its original_timezone
     if hasattr(value, 'original_timezone') and value.original_timezone:
         try:
-            # Convert Django format to Python format
-            python_format = django_format_to_python_format(format_string)
-            return format_time_in_timezone(value.start_time, value.original_timezone, python_format)
+            return _format_local(value, 'start_time', format_string)
         except:
             pass
     
@@ -44,9 +56,7 @@ def timezone_field_time(appointment, field_name):
         return ""
     
     try:
-        # Convert Django format to Python format
-        python_format = django_format_to_python_format("g:i A")
-        return format_time_in_timezone(field_value, appointment.original_timezone, python_format)
+        return _format_local(appointment, field_name, "g:i A")
     except:
         # Fallback to default time formatting
         try:
@@ -66,9 +76,7 @@ def timezone_datetime(value, format_string="M d, Y, g:i A"):
     # If this is an appointment object, get its original_timezone
     if hasattr(value, 'original_timezone') and value.original_timezone:
         try:
-            # Convert Django format to Python format
-            python_format = django_format_to_python_format(format_string)
-            return format_time_in_timezone(value.start_time, value.original_timezone, python_format)
+            return _format_local(value, 'start_time', format_string)
         except:
             pass
     
@@ -91,9 +99,7 @@ def timezone_date(value, format_string="M d, Y"):
     # If this is an appointment object, get its original_timezone
     if hasattr(value, 'original_timezone') and value.original_timezone:
         try:
-            # Convert Django format to Python format
-            python_format = django_format_to_python_format(format_string)
-            return format_time_in_timezone(value.start_time, value.original_timezone, python_format)
+            return _format_local(value, 'start_time', format_string)
         except:
             pass
     
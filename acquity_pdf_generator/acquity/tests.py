@@ -1,3 +1,1352 @@
-from django.test import TestCase
+import copy
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .models import Appointment, AppointmentType, Calendar, PricingSetting
+from .utils import filter_local_date_range, local_day_start
+
+
+class LocalDateRangeFilterTests(TestCase):
+    """Date filters of the dashboard and calendar pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.calendars = [
+            Calendar.objects.create(name=f"Calendar {i}", acuity_calendar_id=str(i), timezone='America/New_York')
+            for i in range(5)
+        ]
+        appointment_type = AppointmentType.objects.create(name="Hibachi", acuity_type_id='1', duration=120, price=0)
+        first = datetime(2025, 1, 1, 18, 0, tzinfo=dt_timezone.utc)
+        appointments = []
+        for i in range(2000):
+            local_start = first + timedelta(hours=5 * i)
+            appointments.append(Appointment(
+                acuity_appointment_id=str(i),
+                calendar=cls.calendars[i % len(cls.calendars)],
+                appointment_type=appointment_type,
+                client_name=f"Client {i}",
+                client_email=f"client{i}@example.com",
+                start_time=local_start + timedelta(hours=5),
+                end_time=local_start + timedelta(hours=7),
+                price=0,
+                original_timezone='America/New_York',
+                local_start_time=local_start,
+                local_end_time=local_start + timedelta(hours=2),
+                local_date=local_start.date(),
+            ))
+        Appointment.objects.bulk_create(appointments)
+
+    def date_filtered(self, calendar, first_day, last_day):
+        # The filter the dashboard and calendar pages apply
+        return filter_local_date_range(
+            Appointment.objects.filter(calendar=calendar).order_by('-start_time'), first_day, last_day
+        )
+
+    def test_range_includes_whole_last_day(self):
+        calendar = self.calendars[0]
+        appointments = self.date_filtered(calendar, date(2025, 2, 1), date(2025, 2, 10))
+        local_dates = {appointment.local_date for appointment in appointments}
+        self.assertTrue(local_dates)
+        self.assertGreaterEqual(min(local_dates), date(2025, 2, 1))
+        self.assertEqual(max(local_dates), date(2025, 2, 10))
+
+    def test_date_filtered_page_uses_index(self):
+        queryset = self.date_filtered(self.calendars[0], date(2025, 2, 1), date(2025, 2, 28))[:10]
+        plan = queryset.explain()
+        # SQLite: "SEARCH ... USING INDEX acquity_appt_cal_local_start", PostgreSQL: "Index Scan"
+        self.assertIn('INDEX', plan.upper(), plan)
+        self.assertIn('local_start', plan, plan)
+
+    def test_calendar_page_filters_by_local_dates(self):
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        from .services import AcuityService
+        calendar = self.calendars[0]
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        with mock.patch.object(AcuityService, 'sync_appointments'):
+            response = self.client.get(
+                f'/calendar/{calendar.id}/', {'start_date': '2025-02-01', 'end_date': '2025-02-10'}
+            )
+        self.assertEqual(response.status_code, 200)
+        shown = list(response.context['appointments'])
+        self.assertEqual(shown, list(self.date_filtered(calendar, date(2025, 2, 1), date(2025, 2, 10))))
+        self.assertEqual(max(appointment.local_date for appointment in shown), date(2025, 2, 10))
+
+
+class AppointmentLocalTimeTests(TestCase):
+    """Local time columns kept in step by Appointment.save()."""
+
+    def test_save_keeps_local_times_in_step(self):
+        calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1', timezone='America/New_York')
+        appointment_type = AppointmentType.objects.create(name="Hibachi", acuity_type_id='1', duration=120, price=0)
+        start = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        appointment = Appointment.objects.create(
+            acuity_appointment_id='1', calendar=calendar, appointment_type=appointment_type, client_name='John',
+            start_time=start, end_time=start + timedelta(hours=2), price=0, original_timezone='America/New_York',
+        )
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.local_start_time, datetime(2025, 6, 1, 18, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(appointment.local_end_time, datetime(2025, 6, 1, 20, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(appointment.local_date, date(2025, 6, 1))
+
+        # Early on 2 December in UTC is still 1 December in the evening in New York (EST)
+        appointment.start_time = datetime(2025, 12, 2, 3, 0, tzinfo=dt_timezone.utc)
+        appointment.end_time = appointment.start_time + timedelta(hours=2)
+        appointment.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.local_start_time, datetime(2025, 12, 1, 22, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(appointment.local_date, date(2025, 12, 1))
+
+        appointment.original_timezone = 'America/Los_Angeles'
+        appointment.save(update_fields=['original_timezone'])
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.local_start_time, datetime(2025, 12, 1, 19, 0, tzinfo=dt_timezone.utc))
+        self.assertTrue(Appointment.objects.filter(
+            local_start_time__gte=local_day_start(date(2025, 12, 1)),
+            local_start_time__lt=local_day_start(date(2025, 12, 2)),
+        ).exists())
+
+
+class TimezoneFilterTests(TestCase):
+    """Django date formats translated to strftime, and the timezone template filters."""
+
+    def test_format_translation(self):
+        from .utils import django_format_to_python_format
+        self.assertEqual(django_format_to_python_format('D, M d, Y'), '%a, %b %d, %Y')
+        self.assertEqual(django_format_to_python_format('g:i A'), '%I:%M %p')
+        # A literal % must not start a directive; escaped characters are kept as text
+        self.assertEqual(django_format_to_python_format('100% Y'), '100%% %Y')
+        self.assertEqual(django_format_to_python_format('\\Y\\e\\a\\r: Y'), 'Year: %Y')
+        self.assertEqual(django_format_to_python_format('\\%'), '%%')
+        self.assertEqual(datetime(2025, 6, 1).strftime(django_format_to_python_format('\\D\\a\\y j (100%)')),
+                         'Day 01 (100%)')
+
+    def test_filters_match_with_and_without_local_columns(self):
+        from .batch_datetimes import fill_local_times
+        from .templatetags import timezone_filters
+        start = datetime(2025, 12, 2, 3, 30, tzinfo=dt_timezone.utc)
+        precomputed = Appointment(start_time=start, end_time=start + timedelta(hours=2),
+                                  original_timezone='America/New_York')
+        fill_local_times([precomputed])
+        converted = Appointment(start_time=start, end_time=start + timedelta(hours=2),
+                                original_timezone='America/New_York')
+        self.assertIsNone(converted.local_start_time)
+
+        for render in (
+            lambda a: timezone_filters.timezone_time(a),
+            lambda a: timezone_filters.timezone_date(a, 'D, M d, Y'),
+            lambda a: timezone_filters.timezone_datetime(a),
+            lambda a: timezone_filters.timezone_field_time(a, 'end_time'),
+        ):
+            self.assertEqual(render(precomputed), render(converted))
+        self.assertEqual(timezone_filters.timezone_datetime(converted), 'Dec 01, 2025, 10:30 PM')
+        self.assertEqual(timezone_filters.timezone_field_time(converted, 'end_time'), '12:30 AM')
+
+
+class AppointmentSearchTests(TestCase):
+    """Dashboard search through the full-text index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1')
+        cls.hibachi = AppointmentType.objects.create(name="Hibachi Party", acuity_type_id='1', duration=120, price=0)
+        cls.cooking = AppointmentType.objects.create(name="Cooking Class", acuity_type_id='2', duration=60, price=0)
+        start = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        rows = [
+            ('John Smith', 'john@example.com', '19 Main St, Newark, NJ 07102', cls.hibachi),
+            ('Johnny Walker', 'walker@example.com', '5 Ocean Ave, Long Branch, NJ 07740', cls.hibachi),
+            ('Mary Jones', 'mary@example.com', '1 Smith Rd, Trenton, NJ 08608', cls.cooking),
+        ]
+        for i, (name, email, address, appointment_type) in enumerate(rows):
+            Appointment.objects.create(
+                acuity_appointment_id=str(i), calendar=cls.calendar, appointment_type=appointment_type,
+                client_name=name, client_email=email, event_address=address,
+                start_time=start + timedelta(days=i), end_time=start + timedelta(days=i, hours=2), price=0,
+            )
+
+    def search(self, query):
+        from .search import search_appointments
+        return [appointment.client_name for appointment in search_appointments(Appointment.objects.all(), query)]
+
+    def test_prefix_and_multi_word(self):
+        self.assertEqual(set(self.search('john')), {'John Smith', 'Johnny Walker'})
+        self.assertEqual(self.search('john smi'), ['John Smith'])
+
+    def test_searches_email_address_and_type(self):
+        self.assertEqual(self.search('walker@example'), ['Johnny Walker'])
+        self.assertEqual(self.search('Trenton'), ['Mary Jones'])
+        self.assertEqual(self.search('cooking'), ['Mary Jones'])
+
+    def test_uses_full_text_index(self):
+        from django.db import connection
+        from .search import search_backend
+        if connection.vendor == 'sqlite':
+            self.assertEqual(search_backend(), 'fts5')
+
+    def test_index_follows_updates(self):
+        Appointment.objects.filter(client_name='Mary Jones').update(client_name='Mary Brown')
+        self.assertEqual(self.search('brown'), ['Mary Brown'])
+        self.assertEqual(self.search('jones'), [])
+
+    def test_ranking_is_one_index_query_within_the_queryset(self):
+        from unittest import mock
+        from .search import search_appointments
+        mary = Appointment.objects.filter(client_name='Mary Jones')
+        self.assertEqual([a.client_name for a in search_appointments(mary, 'smith')], ['Mary Jones'])
+        # Hits past the ranked ones still match, after them
+        with mock.patch('acquity.search.SEARCH_RANKED_RESULTS', 1):
+            self.assertEqual(len(self.search('smith')), 2)
+        with self.assertNumQueries(3):  # type names, ranked ids, results
+            list(search_appointments(Appointment.objects.all(), 'john'))
+
+    def test_like_pattern_takes_wildcards_literally(self):
+        from .search import like_contains_pattern
+        self.assertEqual(like_contains_pattern('50%_Off\\'), '%50\\%\\_off\\\\%')
+
+
+class SearchIndexRebuildTests(TransactionTestCase):
+    """The SQLite search index after a migration rebuilds the appointment table."""
+
+    def setUp(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 triggers are SQLite only')
+        from . import search
+        self.addCleanup(search._index_available.clear)
+        search._index_available.clear()
+        self.calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1')
+        self.appointment_type = AppointmentType.objects.create(
+            name="Hibachi Party", acuity_type_id='1', duration=120, price=0,
+        )
+
+    def create_appointment(self, acuity_id, name):
+        start = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        return Appointment.objects.create(
+            acuity_appointment_id=acuity_id, calendar=self.calendar, appointment_type=self.appointment_type,
+            client_name=name,
+            start_time=start, end_time=start + timedelta(hours=2), price=0,
+        )
+
+    def rebuild_table(self):
+        from django.db import connection
+        old_field = Appointment._meta.get_field('client_phone')
+        new_field = copy.deepcopy(old_field)
+        new_field.max_length = old_field.max_length + 1
+        # SQLite cannot alter a column in place: this remakes acquity_appointment, dropping its triggers
+        with connection.schema_editor() as editor:
+            editor.alter_field(Appointment, old_field, new_field)
+
+        def restore():
+            from .search import rebuild_search_index
+            with connection.schema_editor() as editor:
+                editor.alter_field(Appointment, new_field, old_field)
+            rebuild_search_index()
+        self.addCleanup(restore)
+
+    def test_search_survives_a_table_rebuild(self):
+        from contextlib import redirect_stdout
+        from io import StringIO
+        from . import search
+        from .search import rebuild_search_index, search_appointments, search_backend
+        self.create_appointment('1', 'John Smith')
+        self.assertEqual(search_backend(), 'fts5')
+        self.rebuild_table()
+        search._index_available.clear()
+        self.create_appointment('2', 'Johnny Walker')
+
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertIsNone(search_backend())
+        self.assertIn('search index triggers missing', output.getvalue())
+        found = search_appointments(Appointment.objects.all(), 'johnny')
+        self.assertEqual([a.client_name for a in found], ['Johnny Walker'])
+
+        rebuild_search_index()
+        self.assertEqual(search_backend(), 'fts5')
+        self.create_appointment('3', 'Johnny Cash')
+        found = search_appointments(Appointment.objects.all(), 'johnny')
+        self.assertEqual({a.client_name for a in found}, {'Johnny Walker', 'Johnny Cash'})
+
+
+class ConfirmationPDFCacheTests(TestCase):
+    """Content-addressed cache behind download_pdf."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1', timezone='America/New_York')
+        appointment_type = AppointmentType.objects.create(name="Hibachi", acuity_type_id='1', duration=120, price=0)
+        start = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        cls.appointment = Appointment.objects.create(
+            acuity_appointment_id='1', calendar=cls.calendar, appointment_type=appointment_type,
+            client_name='John Smith', client_phone='555-0100', start_time=start,
+            end_time=start + timedelta(hours=2), price=0, original_timezone='America/New_York',
+            form_data=[{'values': [
+                {'name': 'Address of the event', 'value': '19 Main St, Newark, NJ 07102'},
+                {'name': 'How many adults?', 'value': '10'},
+            ]}],
+            adult_count=10, event_address='19 Main St, Newark, NJ 07102', event_state='NJ',
+            local_start_time=datetime(2025, 6, 1, 18, 0, tzinfo=dt_timezone.utc), local_date=date(2025, 6, 1),
+        )
+        PricingSetting.objects.create(category='adult', price=50, calendar=None)
+
+    def setUp(self):
+        self.cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_root, True)
+        # Rendered inline: pool workers cannot see the test database
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_root, PDF_RENDER_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_repeat_download_is_served_from_cache(self):
+        from unittest import mock
+        from .pdf_cache import get_confirmation_pdf
+        from .pdf_generator import PDFGenerator
+        first = get_confirmation_pdf(self.appointment)
+        self.assertTrue(first.startswith(b'%PDF'))
+        with mock.patch.object(PDFGenerator, 'generate_appointment_confirmation') as render:
+            self.assertEqual(get_confirmation_pdf(self.appointment), first)
+        render.assert_not_called()
+
+    def test_rendering_is_deterministic(self):
+        from .pdf_generator import PDFGenerator
+        self.assertEqual(
+            PDFGenerator().generate_appointment_confirmation(self.appointment),
+            PDFGenerator().generate_appointment_confirmation(self.appointment),
+        )
+
+    def test_changes_invalidate(self):
+        from .pdf_cache import confirmation_cache_key, confirmation_path, get_confirmation_pdf
+        get_confirmation_pdf(self.appointment)
+        key = confirmation_cache_key(self.appointment)
+        self.assertTrue(confirmation_path(self.appointment, key).exists())
+
+        PricingSetting.objects.create(category='kid', price=25, calendar=self.calendar)
+        self.assertFalse(confirmation_path(self.appointment, key).exists())
+        self.assertNotEqual(confirmation_cache_key(self.appointment), key)
+
+        get_confirmation_pdf(self.appointment)
+        key = confirmation_cache_key(self.appointment)
+        self.appointment.client_phone = '555-0199'
+        self.appointment.save()
+        self.assertFalse(confirmation_path(self.appointment, key).exists())
+        self.assertNotEqual(confirmation_cache_key(self.appointment), key)
+
+    def test_prerender_renders_upcoming_changes_once(self):
+        from django.utils import timezone
+        from .pdf_cache import confirmation_path
+        from .prerender import prerender_confirmations
+        soon, later = [
+            Appointment.objects.create(
+                acuity_appointment_id=acuity_id, calendar=self.calendar,
+                appointment_type=self.appointment.appointment_type, client_name=acuity_id,
+                start_time=timezone.now() + offset, end_time=timezone.now() + offset + timedelta(hours=2), price=0,
+                form_data=self.appointment.form_data,
+            )
+            for acuity_id, offset in (('soon', timedelta(hours=20)), ('later', timedelta(days=10)))
+        ]
+        self.assertEqual(prerender_confirmations(['soon', 'later', self.appointment.acuity_appointment_id], 72), 1)
+        self.assertTrue(confirmation_path(soon).exists())
+        self.assertFalse(confirmation_path(later).exists())
+        self.assertEqual(prerender_confirmations(['soon'], 72), 0)
+
+    def test_bulk_export_zip_and_merged_pdf(self):
+        import io
+        import zipfile
+        from PyPDF2 import PdfReader
+        from .export import export_appointments, merged_pdf, stream_zip
+        appointments = list(export_appointments(self.calendar, date(2025, 6, 1), date(2025, 6, 1)))
+        self.assertEqual(appointments, [self.appointment])
+        self.assertEqual(export_appointments(self.calendar, date(2025, 6, 2)).count(), 0)
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(appointments, workers=1))))
+        self.assertEqual(archive.namelist(), ['June-01-0600pm-JohnSmith-NJ.pdf'])
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(len(PdfReader(io.BytesIO(merged_pdf(appointments, workers=1))).pages), 1)
+
+    def test_export_workers_get_a_pool_of_their_own(self):
+        from concurrent.futures import Future
+        from unittest import mock
+        from . import render_pool
+        from .export import stream_zip
+
+        class InlineExecutor:
+            shut_down = False
+
+            def submit(self, job, *args):
+                future = Future()
+                future.set_result(job(*args))
+                return future
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                self.shut_down = True
+
+        executor = InlineExecutor()
+        with mock.patch.object(render_pool, '_start_executor', return_value=executor) as start:
+            self.assertTrue(b''.join(stream_zip([self.appointment], workers=3)))
+        start.assert_called_once_with(3)
+        self.assertTrue(executor.shut_down)
+        # The shared pool was neither started nor resized
+        self.assertIsNone(render_pool._executor)
+
+    def test_export_view_logs_every_confirmation(self):
+        from django.contrib.auth import get_user_model
+        from .models import PDFGenerationLog
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        response = self.client.get(
+            f'/calendar/{self.calendar.id}/export-confirmations/?start_date=2025-06-01&end_date=2025-06-01'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content))
+        self.assertEqual(list(PDFGenerationLog.objects.values_list('appointment_id', 'generated_by_id')),
+                         [(self.appointment.id, user.id)])
+
+    def test_download_streams_cached_file(self):
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        response = self.client.get(f'/appointment/{self.appointment.id}/pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertIn('June-01-0600pm-JohnSmith-NJ.pdf', response['Content-Disposition'])
+        response.close()
+
+    def test_confirmation_removed_before_open_is_rendered_again(self):
+        from unittest import mock
+        from . import pdf_cache
+        render = pdf_cache._render_into_cache
+
+        def render_then_clear(*args):
+            # A pricing change clears the cache right after the first render
+            render(*args)
+            if render_into_cache.call_count == 1:
+                pdf_cache.clear_confirmations()
+
+        with mock.patch.object(pdf_cache, '_render_into_cache', side_effect=render_then_clear) as render_into_cache:
+            with pdf_cache.open_confirmation_file(self.appointment) as pdf_file:
+                self.assertTrue(pdf_file.read().startswith(b'%PDF'))
+        self.assertEqual(render_into_cache.call_count, 2)
+
+    def test_download_survives_cache_clear_after_render(self):
+        from pathlib import Path
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        from . import render_pool
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        removed = Path(self.cache_root) / 'removed.pdf'
+        with mock.patch.object(render_pool, 'render_confirmation_file', return_value=removed):
+            response = self.client.get(f'/appointment/{self.appointment.id}/pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        response.close()
+
+    def test_calendar_report_reads_synced_appointments(self):
+        import io
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        from PyPDF2 import PdfReader
+        from .services import AcuityService
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        with mock.patch.object(AcuityService, 'get_appointments') as fetch:
+            response = self.client.get(f'/calendar/{self.calendar.id}/export-pdf/?start_date=2025-06-01&end_date=2025-06-01')
+        fetch.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        text = PdfReader(io.BytesIO(b''.join(response.streaming_content))).pages[0].extract_text()
+        self.assertIn('Total Appointments: 1', text)
+        self.assertIn('John Smith', text)
+        self.assertIn('06/01/2025 06:00 PM', text)
+
+    def test_calendar_report_refresh_syncs_the_report_range(self):
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        from .services import AcuityService
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        with mock.patch.object(AcuityService, 'sync_appointments_by_date_range') as sync:
+            response = self.client.get(
+                f'/calendar/{self.calendar.id}/export-pdf/?start_date=2025-03-01&end_date=2025-06-30&refresh=1'
+            )
+        self.assertEqual(response.status_code, 200)
+        sync.assert_called_once_with(date(2025, 3, 1), date(2025, 6, 30), calendar_id='1')
+        response.close()
+
+    def test_long_calendar_report_has_one_header_per_page(self):
+        import io
+        import re
+        from PyPDF2 import PdfReader
+        from .pdf_generator import PDFGenerator
+        appointments = [
+            Appointment(
+                acuity_appointment_id=str(number), calendar=self.calendar,
+                appointment_type=self.appointment.appointment_type, client_name=f'Client {number}',
+                start_time=self.appointment.start_time + timedelta(hours=number), price=0,
+                original_timezone='America/New_York', status='scheduled',
+            )
+            for number in range(200)
+        ]
+        pages = PdfReader(io.BytesIO(PDFGenerator().generate_appointment_pdf(appointments, 'NJ'))).pages
+        texts = [page.extract_text() for page in pages]
+        self.assertIn('Total Appointments: 200', texts[0])
+        self.assertGreater(len(texts), 2)
+        self.assertEqual(sum(len(re.findall(r'Client \d+', text)) for text in texts), 200)
+        for text in texts:
+            if re.search(r'Client \d+', text):
+                self.assertEqual(text.count('Date & Time'), 1)
+
+    def test_confirmation_does_not_depend_on_working_directory(self):
+        import os
+        from .pdf_generator import PDFGenerator
+        expected = PDFGenerator().generate_appointment_confirmation(self.appointment)
+        self.assertIn(b'/Subtype /Image', expected)
+        cwd = os.getcwd()
+        os.chdir(self.cache_root)
+        self.addCleanup(os.chdir, cwd)
+        self.assertEqual(PDFGenerator().generate_appointment_confirmation(self.appointment), expected)
+
+    def test_seating_image_is_embedded_downscaled(self):
+        import io
+        from PyPDF2 import PdfReader
+        from .pdf_generator import IMAGE_PIXELS_PER_POINT, SEATING_IMAGE_SIZE, PDFGenerator
+        pdf = PDFGenerator().generate_appointment_confirmation(self.appointment)
+        images = [
+            xobject.get_object() for xobject in PdfReader(io.BytesIO(pdf)).pages[0]['/Resources']['/XObject'].values()
+        ]
+        self.assertEqual([image['/Width'] for image in images], [SEATING_IMAGE_SIZE[0] * IMAGE_PIXELS_PER_POINT])
+        self.assertNotIn('/SMask', images[0])
+        self.assertLess(len(pdf), 300 * 1024)
+
+
+class PricingSnapshotTests(TestCase):
+    """Per-calendar pricing snapshot read by confirmations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1', timezone='America/New_York')
+        cls.other = Calendar.objects.create(name="CA", acuity_calendar_id='2', timezone='America/Los_Angeles')
+
+    def setUp(self):
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root, True)
+        # The pricing version stamp lives in the PDF cache directory
+        settings_override = override_settings(PDF_CACHE_DIR=cache_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        PricingSetting.objects.create(category='adult', price=50, calendar=None)
+        PricingSetting.objects.create(category='kid', price=25, calendar=None)
+        PricingSetting.objects.create(category='adult', price=60, currency='EUR', calendar=self.calendar)
+
+    def test_calendar_prices_override_global_ones(self):
+        from .pricing import pricing_snapshot
+        snapshot = pricing_snapshot(self.calendar.id)
+        self.assertEqual((snapshot.price('adult'), snapshot.price('kid'), snapshot.price('gyoza')), (60.0, 25.0, 0.0))
+        self.assertEqual(snapshot.currency, 'EUR')
+        other = pricing_snapshot(self.other.id)
+        self.assertEqual((other.price('adult'), other.currency), (50.0, 'USD'))
+        self.assertEqual(pricing_snapshot(None).price('adult'), 50.0)
+
+    def test_cached_until_a_price_is_saved(self):
+        from .pricing import pricing_snapshot
+        pricing_snapshot(self.calendar.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(pricing_snapshot(self.calendar.id).price('kid'), 25.0)
+        setting = PricingSetting.objects.get(category='kid')
+        setting.price = 30
+        setting.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(pricing_snapshot(self.calendar.id).price('kid'), 30.0)
+        setting.delete()
+        self.assertEqual(pricing_snapshot(self.calendar.id).price('kid'), 0.0)
+
+    def test_clearing_confirmations_keeps_the_version(self):
+        from .pdf_cache import cache_dir, clear_confirmations
+        from .pricing import bump_pricing_version, pricing_version
+        bump_pricing_version()
+        version = pricing_version()
+        (cache_dir() / '1').mkdir()
+        (cache_dir() / '1' / 'key.pdf').write_bytes(b'%PDF')
+        clear_confirmations()
+        self.assertFalse((cache_dir() / '1').exists())
+        self.assertEqual(pricing_version(), version)
+
+    def test_version_file_is_only_read_when_replaced(self):
+        from pathlib import Path
+        from unittest import mock
+        from .pricing import bump_pricing_version, pricing_version
+        bump_pricing_version()
+        with mock.patch.object(Path, 'read_text', autospec=True, side_effect=Path.read_text) as read_text:
+            first = pricing_version()
+            self.assertEqual(pricing_version(), first)
+            self.assertEqual(read_text.call_count, 1)
+            bump_pricing_version()
+            self.assertNotEqual(pricing_version(), first)
+            self.assertEqual(read_text.call_count, 2)
+
+
+class FakeAppointmentsAPI:
+    """Stands in for AcuityService._fetch_appointments_page over a list of appointments."""
+
+    def __init__(self, appointments, honours_page=True):
+        self.appointments = appointments
+        self.honours_page = honours_page
+        self.requests = []
+
+    def __call__(self, params):
+        import json
+        from unittest import mock
+        self.requests.append(params)
+        size = params['max']
+        first = (params['page'] - 1) * size if self.honours_page else 0
+        page = self.appointments[first:first + size]
+        response = mock.Mock(content=json.dumps(page).encode())
+        response.json.return_value = page
+        return response
+
+
+class AppointmentPagerTests(TestCase):
+    """Adaptive paging of Acuity /appointments queries."""
+
+    def fetch_all(self, api, sizer):
+        from .paging import AppointmentPager
+        pager = AppointmentPager(api, {'calendarID': '1'}, sizer)
+        ids = [appointment['id'] for _, appointments, _ in pager for appointment in appointments]
+        return ids, pager
+
+    def test_pages_stay_unpaged_size_until_page_param_is_supported(self):
+        from .paging import UNPAGED_PAGE_SIZE, AdaptivePageSizer
+        self.assertEqual(AdaptivePageSizer(initial=100).size, UNPAGED_PAGE_SIZE)
+        self.assertEqual(AdaptivePageSizer(initial=100, page_param_supported=True).size, 64)
+        # An API that ignores `page` still returns every row in the one request
+        api = FakeAppointmentsAPI([{'id': i} for i in range(600)], honours_page=False)
+        ids, pager = self.fetch_all(api, AdaptivePageSizer(initial=100))
+        self.assertEqual(ids, list(range(600)))
+        self.assertTrue(pager.complete)
+        self.assertEqual(len(api.requests), 1)
+
+    def test_unpaged_mode_reports_pages_over_the_memory_ceiling(self):
+        from contextlib import redirect_stdout
+        from io import StringIO
+        from .paging import UNPAGED_PAGE_SIZE, AdaptivePageSizer, print_page_mode
+        sizer = AdaptivePageSizer(memory_ceiling_mb=1)
+        output = StringIO()
+        with redirect_stdout(output):
+            print_page_mode(sizer)
+            sizer.record(UNPAGED_PAGE_SIZE, 2 * 1024 * 1024, 0.5)
+            sizer.record(UNPAGED_PAGE_SIZE, 2 * 1024 * 1024, 0.5)
+        # The size cannot shrink without `page`, so the overrun is reported once
+        self.assertEqual(sizer.size, UNPAGED_PAGE_SIZE)
+        self.assertIn('adaptive paging is off', output.getvalue())
+        self.assertEqual(output.getvalue().count('over the 1 MB sync memory ceiling'), 1)
+
+    def test_adaptive_pages_fetch_every_row(self):
+        from .paging import AdaptivePageSizer
+        api = FakeAppointmentsAPI([{'id': i} for i in range(1000)])
+        sizer = AdaptivePageSizer(initial=64, min_size=32, max_size=256, page_param_supported=True)
+        ids, pager = self.fetch_all(api, sizer)
+        self.assertEqual(ids, list(range(1000)))
+        self.assertTrue(pager.complete)
+        self.assertGreater(len({params['max'] for params in api.requests}), 1)
+
+    def test_ignored_page_param_is_incomplete(self):
+        from .paging import AdaptivePageSizer
+        api = FakeAppointmentsAPI([{'id': i} for i in range(600)], honours_page=False)
+        ids, pager = self.fetch_all(api, AdaptivePageSizer(initial=256, page_param_supported=True))
+        self.assertEqual(ids, list(range(256)))
+        self.assertFalse(pager.complete)
+
+    def test_empty_page_is_complete(self):
+        from .paging import AdaptivePageSizer
+        api = FakeAppointmentsAPI([{'id': i} for i in range(128)])
+        ids, pager = self.fetch_all(api, AdaptivePageSizer(initial=64, min_size=64, page_param_supported=True))
+        self.assertEqual(ids, list(range(128)))
+        self.assertTrue(pager.complete)
+        self.assertEqual(len(api.requests), 3)
+
+
+class MetadataSyncTests(TestCase):
+    """sync_calendars / sync_appointment_types: set-based upserts of Acuity metadata."""
+
+    calendars = [
+        {'id': 1, 'name': 'NJ', 'timezone': 'America/New_York'},
+        {'id': 2, 'name': 'California', 'timezone': 'America/Los_Angeles'},
+        {'id': 3, 'name': 'NY', 'timezone': 'America/New_York'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stamp = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        Calendar.objects.create(name="NJ", acuity_calendar_id='1', timezone='America/New_York')
+        Calendar.objects.create(name="CA", acuity_calendar_id='2', timezone='America/Los_Angeles')
+        Calendar.objects.update(updated_at=cls.stamp)
+        AppointmentType.objects.create(name="Hibachi", acuity_type_id='10', duration=120, price=0)
+        AppointmentType.objects.create(name="Cooking", acuity_type_id='11', duration=60, price=0)
+
+    def setUp(self):
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root, True)
+        settings_override = override_settings(PDF_CACHE_DIR=cache_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def writes(self, queries, table):
+        """(inserts, updates) issued against `table`."""
+        statements = [query['sql'] for query in queries if f'"{table}"' in query['sql']]
+        return (sum(sql.startswith('INSERT') for sql in statements),
+                sum(sql.startswith('UPDATE') for sql in statements))
+
+    def test_calendars_are_written_in_one_insert_and_one_update(self):
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .services import AcuityService
+        service = AcuityService()
+        with mock.patch.object(service, 'get_calendars', return_value=self.calendars), \
+                CaptureQueriesContext(connection) as queries:
+            service.sync_calendars()
+        self.assertEqual(self.writes(queries.captured_queries, 'acquity_calendar'), (1, 1))
+        calendars = {c.acuity_calendar_id: c for c in Calendar.objects.all()}
+        self.assertEqual(calendars['2'].name, 'California')
+        self.assertEqual(calendars['3'].name, 'NY')
+        # Only the changed row is stamped; the unchanged one was not written at all
+        self.assertEqual(calendars['1'].updated_at, self.stamp)
+        self.assertGreater(calendars['2'].updated_at, self.stamp)
+
+    def test_unchanged_calendars_are_not_written(self):
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .services import AcuityService
+        service = AcuityService()
+        unchanged = [calendar for calendar in self.calendars if calendar['id'] == 1]
+        with mock.patch.object(service, 'get_calendars', return_value=unchanged), \
+                CaptureQueriesContext(connection) as queries:
+            service.sync_calendars()
+        self.assertEqual(self.writes(queries.captured_queries, 'acquity_calendar'), (0, 0))
+
+    def test_appointment_types_are_diffed(self):
+        from decimal import Decimal
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .services import AcuityService
+        service = AcuityService()
+        types = [
+            {'id': 10, 'name': 'Hibachi', 'duration': 120, 'price': '0.00'},
+            {'id': 11, 'name': 'Cooking', 'duration': 90, 'price': '45.00'},
+            {'id': 12, 'name': 'Sushi', 'duration': 60},
+        ]
+        with mock.patch.object(service, 'get_appointment_types', return_value=types), \
+                CaptureQueriesContext(connection) as queries:
+            service.sync_appointment_types()
+        self.assertEqual(self.writes(queries.captured_queries, 'acquity_appointmenttype'), (1, 1))
+        cooking = AppointmentType.objects.get(acuity_type_id='11')
+        self.assertEqual((cooking.duration, cooking.price), (90, Decimal('45.00')))
+        self.assertEqual(AppointmentType.objects.get(acuity_type_id='12').name, 'Sushi')
+
+    def test_sync_appointments_reuses_the_synced_calendar_list(self):
+        from unittest import mock
+        from .services import AcuityService
+        service = AcuityService()
+        with mock.patch.object(service, 'get_calendars', return_value=self.calendars[:1]) as get_calendars, \
+                mock.patch.object(service, '_fetch_appointments_page', FakeAppointmentsAPI([])):
+            service.sync_calendars()
+            service.sync_appointments()
+        get_calendars.assert_called_once_with()
+
+
+class AppointmentSyncTests(TestCase):
+    """sync_appointments against a fake Acuity API: changesets and cancellation candidates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.utils import timezone
+        cls.calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1', timezone='America/New_York')
+        cls.appointment_type = AppointmentType.objects.create(
+            name="Hibachi", acuity_type_id='10', duration=120, price=0,
+        )
+        cls.start = (timezone.now() + timedelta(days=5)).replace(minute=0, second=0, microsecond=0)
+        for acuity_id, name in (('1', 'John Smith'), ('3', 'Gone Guest')):
+            Appointment.objects.create(
+                acuity_appointment_id=acuity_id, calendar=cls.calendar, appointment_type=cls.appointment_type,
+                client_name=name, start_time=cls.start, end_time=cls.start + timedelta(hours=2), price=0,
+            )
+
+    def setUp(self):
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root, True)
+        settings_override = override_settings(PDF_CACHE_DIR=cache_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def api_appointment(self, acuity_id, first_name, last_name='Smith'):
+        from zoneinfo import ZoneInfo
+        local_start = self.start.astimezone(ZoneInfo('America/New_York'))
+        return {
+            'id': acuity_id, 'calendarID': 1, 'appointmentTypeID': 10,
+            'firstName': first_name, 'lastName': last_name, 'email': '', 'phone': '',
+            'datetime': local_start.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'endTime': (local_start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'timezone': 'America/New_York', 'price': '0.00', 'forms': [],
+        }
+
+    def sync(self, api, dry_run, calendars=({'id': 1, 'name': 'NJ'},), **kwargs):
+        from unittest import mock
+        from .services import AcuityService
+        service = AcuityService()
+        with mock.patch.object(service, '_fetch_appointments_page', api):
+            return service.sync_appointments(calendars=list(calendars), dry_run=dry_run, **kwargs)
+
+    def test_dry_run_reports_changes_and_writes_nothing(self):
+        api = FakeAppointmentsAPI([self.api_appointment(1, 'Johnny'), self.api_appointment(2, 'Mary', 'Jones')])
+        changeset = self.sync(api, dry_run=True)
+        self.assertEqual([insert['acuity_id'] for insert in changeset.inserts], ['2'])
+        self.assertEqual(changeset.updates['1']['client_name'], ('John Smith', 'Johnny Smith'))
+        self.assertEqual(changeset.cancellations, [('3', 'no longer returned by Acuity')])
+        self.assertFalse(Appointment.objects.filter(acuity_appointment_id='2').exists())
+        self.assertEqual(Appointment.objects.get(acuity_appointment_id='1').client_name, 'John Smith')
+
+    def test_sync_writes_changes_and_only_reports_cancellations(self):
+        api = FakeAppointmentsAPI([self.api_appointment(1, 'Johnny'), self.api_appointment(2, 'Mary', 'Jones')])
+        changeset = self.sync(api, dry_run=False)
+        self.assertEqual(changeset.cancellations, [('3', 'no longer returned by Acuity')])
+        self.assertEqual(Appointment.objects.get(acuity_appointment_id='1').client_name, 'Johnny Smith')
+        self.assertEqual(Appointment.objects.get(acuity_appointment_id='2').client_name, 'Mary Jones')
+        self.assertEqual(Appointment.objects.get(acuity_appointment_id='3').status, 'scheduled')
+
+    @override_settings(ACUITY_PAGE_PARAM_SUPPORTED=True, ACUITY_PAGE_SIZE_INITIAL=32, ACUITY_PAGE_SIZE_MIN=32)
+    def test_truncated_fetch_has_no_missing_row_candidates(self):
+        # Acuity ignoring `page` repeats the first page: rows past it were never seen
+        rows = [self.api_appointment(1, 'John')] + [self.api_appointment(100 + i, f'Guest {i}') for i in range(40)]
+        changeset = self.sync(FakeAppointmentsAPI(rows, honours_page=False), dry_run=True)
+        self.assertEqual(len(changeset.inserts), 31)
+        self.assertEqual(changeset.cancellations, [])
+
+    def test_failed_fetch_has_no_missing_row_candidates(self):
+        def failing_api(params):
+            raise ConnectionError('Acuity is down')
+        self.assertEqual(self.sync(failing_api, dry_run=True).cancellations, [])
+
+    def test_unsynced_calendar_chunk_is_reported(self):
+        changeset = self.sync(FakeAppointmentsAPI([]), dry_run=True, calendars=[{'id': 99, 'name': 'CA'}])
+        self.assertEqual(changeset.skipped_chunks, [('cal:99', 'calendar 99 is not synced locally')])
+        self.assertIn('1 chunk(s) skipped', changeset.summary_lines())
+
+    @override_settings(ACUITY_PAGE_PARAM_SUPPORTED=True, ACUITY_PAGE_SIZE_INITIAL=32, ACUITY_PAGE_SIZE_MIN=32)
+    def test_sharded_sync_renews_the_lease_after_every_page(self):
+        from unittest import mock
+        from .models import SyncLease
+        from . import sharding
+        rows = [self.api_appointment(100 + i, f'Guest {i}') for i in range(40)]
+        with mock.patch('acquity.services.renew_chunk', wraps=sharding.renew_chunk) as renew:
+            changeset = self.sync(FakeAppointmentsAPI(rows), dry_run=False, shard=(1, 1))
+        self.assertEqual(renew.call_count, 2)
+        self.assertEqual(len(changeset.inserts), 40)
+        self.assertEqual(changeset.skipped_chunks, [])
+        lease = SyncLease.objects.get(chunk_key='cal:1')
+        self.assertEqual((lease.owner, lease.last_status), ('', 'done'))
+
+    @override_settings(ACUITY_PAGE_PARAM_SUPPORTED=True, ACUITY_PAGE_SIZE_INITIAL=32, ACUITY_PAGE_SIZE_MIN=32)
+    def test_lost_lease_stops_the_chunk(self):
+        from unittest import mock
+        rows = [self.api_appointment(100 + i, f'Guest {i}') for i in range(40)]
+        with mock.patch('acquity.services.renew_chunk', return_value=False):
+            changeset = self.sync(FakeAppointmentsAPI(rows), dry_run=False, shard=(1, 1))
+        self.assertEqual(len(changeset.inserts), 32)
+        self.assertEqual(changeset.skipped_chunks, [('cal:1', 'lease lost after page 1')])
+        self.assertEqual(changeset.cancellations, [])
+
+
+class SyncLeaseTests(TestCase):
+    """Chunk leases that let sharded sync processes split an account."""
+
+    def chunk(self, key='cal:1'):
+        from .sharding import SyncChunk
+        return SyncChunk(key, '1', 'NJ', date(2025, 6, 1), date(2025, 6, 30))
+
+    def test_claim_is_exclusive_until_released(self):
+        from .sharding import claim_chunk, release_chunk
+        chunk = self.chunk()
+        self.assertTrue(claim_chunk(chunk, 'host-a:1', '1/2'))
+        self.assertFalse(claim_chunk(chunk, 'host-b:2', '2/2'))
+        self.assertTrue(claim_chunk(chunk, 'host-a:1', '1/2'))
+        release_chunk(chunk, 'host-a:1')
+        self.assertTrue(claim_chunk(chunk, 'host-b:2', '2/2'))
+
+    def test_expired_lease_can_be_taken_over(self):
+        from django.utils import timezone
+        from .models import SyncLease
+        from .sharding import claim_chunk, renew_chunk
+        chunk = self.chunk()
+        self.assertTrue(claim_chunk(chunk, 'host-a:1'))
+        self.assertTrue(renew_chunk(chunk, 'host-a:1'))
+        SyncLease.objects.filter(chunk_key=chunk.key).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(claim_chunk(chunk, 'host-b:2'))
+        # The previous holder finds out at its next renewal
+        self.assertFalse(renew_chunk(chunk, 'host-a:1'))
+
+    def test_chunks_are_assigned_by_crc32(self):
+        import zlib
+        from .sharding import build_sync_chunks, chunks_for_shard, shard_for_key
+        self.assertEqual(shard_for_key('cal:1', 4), zlib.crc32(b'cal:1') % 4 + 1)
+        calendars = [{'id': i, 'name': f'Calendar {i}'} for i in range(20)]
+        chunks = build_sync_chunks(calendars, date(2025, 6, 1), date(2025, 6, 30), window_days=7)
+        shards = [chunks_for_shard(chunks, index, 4) for index in range(1, 5)]
+        self.assertEqual(sorted(chunk.key for shard in shards for chunk in shard), sorted(c.key for c in chunks))
+        self.assertTrue(all(shards))
+        # The assignment is the same in every process
+        self.assertEqual(shards, [chunks_for_shard(chunks, index, 4) for index in range(1, 5)])
+
+
+class FormFieldLookupTests(TestCase):
+    """Form field lookups on Acuity form data and the flattened Appointment.form_fields."""
+
+    FORMS = [
+        {'values': [
+            {'name': 'Full Address', 'value': '19 Main St, Newark, NJ 07102'},
+            {'name': 'How many adults?', 'value': '14'},
+        ]},
+        {'values': [
+            {'name': 'Address', 'value': 'second address'},
+            {'name': 'Order', 'value': '10 chicken'},
+        ]},
+    ]
+
+    def test_dict_and_list_lookups_agree_on_the_first_match(self):
+        from .utils import flatten_form_data, get_form_field
+        flattened = flatten_form_data(self.FORMS)
+        for names in (['address', 'event address'], ['event address', 'address'], ['HOW MANY ADULT'], ['gyoza']):
+            self.assertEqual(get_form_field(flattened, names), get_form_field(self.FORMS, names), names)
+        self.assertEqual(get_form_field(flattened, ['address']), '19 Main St, Newark, NJ 07102')
+        self.assertIsNone(get_form_field(flattened, ['gyoza']))
+
+    def test_out_of_range_answers_do_not_break_the_order_columns(self):
+        from .form_fields import order_columns
+        columns = order_columns({
+            'adults': '99999999999', 'kids': '3', 'travel_fee': 'nan', 'deposit': '1e12',
+        })
+        self.assertEqual((columns['adult_count'], columns['kid_count']), (0, 3))
+        self.assertEqual((columns['travel_fee'], columns['deposit']), (0.0, 0.0))
+        self.assertEqual(order_columns({'travel_fee': 'inf', 'deposit': '-120.5'})['deposit'], -120.5)
+        calendar = Calendar.objects.create(name="NJ", acuity_calendar_id='1')
+        appointment_type = AppointmentType.objects.create(name="Hibachi", acuity_type_id='1', duration=120, price=0)
+        start = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        Appointment.objects.bulk_create([Appointment(
+            acuity_appointment_id='1', calendar=calendar, appointment_type=appointment_type, client_name='John',
+            start_time=start, end_time=start, price=0, **columns,
+        )])
+
+    def test_extraction_is_cached_per_form_layout(self):
+        from .form_fields import extract_form_fields, logical_field_keys
+        from .utils import flatten_form_data
+        logical_field_keys.cache_clear()
+        values = extract_form_fields(self.FORMS)
+        self.assertEqual((values['address'], values['adults'], values['order']),
+                         ('19 Main St, Newark, NJ 07102', '14', '10 chicken'))
+        self.assertIsNone(values['gyoza'])
+        other = flatten_form_data(self.FORMS)
+        other['how many adults?'] = '20'
+        self.assertEqual(extract_form_fields(other)['adults'], '20')
+        self.assertEqual(logical_field_keys.cache_info().misses, 1)
+
+    def assertExtractsLikeGetFormField(self, forms):
+        from .form_fields import FORM_FIELD_PATTERNS, extract_form_fields
+        from .utils import flatten_form_data, get_form_field
+        expected = {field: get_form_field(forms, fragments) for field, fragments in FORM_FIELD_PATTERNS.items()}
+        self.assertEqual(extract_form_fields(forms), expected)
+        self.assertEqual(extract_form_fields(flatten_form_data(forms)), expected)
+        return expected
+
+    def test_alias_regex_matches_like_get_form_field(self):
+        values = self.assertExtractsLikeGetFormField([{'values': [
+            {'name': 'Location', 'value': 'first'},
+            {'name': 'Event Address', 'value': 'second'},
+            {'name': '  NOTE / ALLERGY / RESTRICTIONS  ', 'value': 'peanuts'},
+            {'name': 'Additional Premium Protein ($15)', 'value': '2'},
+            {'name': 'Additional Protein ($10)', 'value': '1'},
+            {'name': 'Processing fee (if any)', 'value': '4'},
+            {'name': 'Travel_Fee', 'value': '50'},
+            {'name': 'Anything else?\nOrder notes', 'value': 'extra sauce'},
+        ]}])
+        # The first matching form field wins; one form field can serve several logical fields
+        self.assertEqual(values['address'], 'first')
+        self.assertEqual((values['processing_fee'], values['processing_fee_any']), ('4', '4'))
+        self.assertEqual((values['additional_premium_protein'], values['additional_protein']), ('2', '1'))
+        self.assertEqual((values['notes'], values['order']), ('peanuts', 'extra sauce'))
+        self.assertIsNone(values['gyoza'])
+
+    def test_alias_regex_on_generated_names(self):
+        import random
+        from .form_fields import FORM_FIELD_PATTERNS
+        fragments = [fragment for names in FORM_FIELD_PATTERNS.values() for fragment in names]
+        noise = ['', ' ', '?', 'your ', ' (required)', 'FEE', '$', '.*', '(', 'ad', 'dress']
+        rng = random.Random(37)
+        for _ in range(200):
+            names = []
+            for _ in range(rng.randint(1, 8)):
+                fragment = rng.choice(fragments)
+                if rng.random() < 0.3:
+                    fragment = fragment[:rng.randint(1, len(fragment))]
+                name = rng.choice(noise) + fragment + rng.choice(noise)
+                names.append(name.upper() if rng.random() < 0.3 else name)
+            self.assertExtractsLikeGetFormField([{'values': [
+                {'name': name, 'value': str(position)} for position, name in enumerate(names)
+            ]}])
+
+    def test_bench_form_has_no_mismatches(self):
+        # The form of bench_form_fields.py
+        values = self.assertExtractsLikeGetFormField([
+            {'name': 'Contact', 'values': [
+                {'name': 'Full Address', 'value': '19 Main St, Newark, NJ 07102'},
+                {'name': 'Phone (alternate)', 'value': ''},
+                {'name': 'How did you hear about us?', 'value': 'Instagram'},
+            ]},
+            {'name': 'Party details', 'values': [
+                {'name': 'How many adults?', 'value': '14'},
+                {'name': 'How many kids?', 'value': '2'},
+                {'name': 'Lobster Tail (Upgraded Protein)', 'value': '1'},
+                {'name': 'Filet Mignon (Upgraded Protein)', 'value': '1'},
+                {'name': 'Noodle / Rice', 'value': '3'},
+                {'name': 'Appetizer: Pork Gyoza', 'value': '2'},
+                {'name': 'Appetizer: Edamame', 'value': '1'},
+                {'name': 'Additional Premium Protein ($15)', 'value': '0'},
+                {'name': 'Additional Protein ($10)', 'value': '2'},
+                {'name': 'Do you need tables and chairs?', 'value': 'No'},
+                {'name': 'Travel Fee', 'value': '50'},
+                {'name': 'Deposit (Deducted from Total)', 'value': '100'},
+                {'name': 'Processing fee (if any)', 'value': '4'},
+                {'name': 'Order', 'value': '10 adults chicken steak, 4 adults shrimp'},
+                {'name': 'Note / Allergy / Restrictions', 'value': 'peanuts'},
+            ]},
+        ])
+        self.assertTrue(all(value is not None for value in values.values()))
+
+
+class AppointmentAdminTests(TestCase):
+    """The appointment admin form leaves columns derived from form_data alone."""
+
+    def test_derived_columns_are_read_only(self):
+        from django.contrib import admin
+        from django.contrib.auth.models import User
+        from django.test import RequestFactory
+        from .form_fields import ORDER_COLUMNS
+        request = RequestFactory().get('/admin/')
+        request.user = User(is_active=True, is_staff=True, is_superuser=True)
+        model_admin = admin.site._registry[Appointment]
+        form_fields = model_admin.get_form(request)().fields
+        for derived in ['form_data', 'form_fields'] + ORDER_COLUMNS:
+            self.assertIn(derived, model_admin.get_readonly_fields(request))
+            self.assertNotIn(derived, form_fields)
+
+
+class RenderPoolTests(TestCase):
+    """Recovery of the PDF render pool from dead workers."""
+
+    def test_broken_pool_is_replaced_then_job_runs_inline(self):
+        from concurrent.futures.process import BrokenProcessPool
+        from unittest import mock
+        from . import render_pool
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool('A worker died')
+        with mock.patch.object(render_pool, 'get_executor', return_value=broken):
+            self.assertEqual(render_pool._run(len, 'abc'), 3)
+        self.assertEqual(broken.submit.call_count, 2)
+        broken.shutdown.assert_called_with(wait=False, cancel_futures=True)
+
+        with mock.patch.object(render_pool, '_executor', broken):
+            render_pool._discard_executor(broken)
+            self.assertIsNone(render_pool._executor)
+            # A pool another thread already replaced is kept
+            render_pool._executor = healthy = mock.Mock()
+            render_pool._discard_executor(broken)
+            self.assertIs(render_pool._executor, healthy)
+
+    @override_settings()
+    def test_default_pool_is_small(self):
+        from django.conf import settings
+        from . import render_pool
+        del settings.PDF_RENDER_WORKERS
+        self.assertEqual(render_pool.pool_size(), render_pool.DEFAULT_WORKERS)
+
+
+class AcuityDatetimeParseTests(TestCase):
+    """fast_parse_acuity_datetime agrees with the full parser it short-cuts."""
+
+    def parse_both(self, apt_data, time_key='datetime'):
+        from .services import AcuityService
+        service = AcuityService()
+        return service._parse_acuity_datetime(apt_data, time_key), service._parse_acuity_datetime_slow(apt_data, time_key)
+
+    def assertSameParse(self, apt_data, time_key='datetime'):
+        (fast, fast_error), (slow, slow_error) = self.parse_both(apt_data, time_key)
+        self.assertEqual((fast_error, slow_error), (None, None), apt_data)
+        self.assertEqual(fast, slow, apt_data)
+        self.assertEqual(fast.utcoffset(), slow.utcoffset(), apt_data)
+
+    def test_iso_offsets_and_z(self):
+        for value in (
+            '2025-09-13T18:00:00-0400', '2025-09-13T18:00:00-04:00', '2025-01-05T09:30:00+0530',
+            '2025-03-09T01:59:59-0500', '2025-12-31T23:45:00Z', '2025-06-01T00:00:00+00:00',
+        ):
+            self.assertSameParse({'datetime': value})
+
+    def test_fractional_seconds_fall_back_to_the_full_parser(self):
+        from .utils import fast_parse_acuity_datetime
+        for value, microsecond in (('2025-09-13T18:00:00.250-0400', 250000), ('2025-09-13T18:00:00.123456Z', 123456)):
+            self.assertIsNone(fast_parse_acuity_datetime(value))
+            self.assertSameParse({'datetime': value})
+            self.assertEqual(self.parse_both({'datetime': value})[0][0].microsecond, microsecond)
+
+    def test_time_only_values(self):
+        for end_time in ('7:30pm', '12:00am', '12:15pm', '9:05AM'):
+            self.assertSameParse({'endTime': end_time, 'date': '2025-11-02', 'timezone': 'America/New_York'}, 'endTime')
+        # Without a timezone both return the naive local time
+        self.assertSameParse({'endTime': '7:30pm', 'date': '2025-11-02'}, 'endTime')
+        # A 'Month Day, YYYY' date is left to the full parser
+        self.assertSameParse({'endTime': '7:30pm', 'date': 'November 2, 2025', 'timezone': 'America/Chicago'}, 'endTime')
+
+    def test_mixed_payloads_have_no_mismatches(self):
+        # The sample mix of bench_datetime_parse.py
+        zones = [('America/New_York', '-0400'), ('America/Chicago', '-0500'),
+                 ('America/Denver', '-0600'), ('America/Los_Angeles', '-0700')]
+        for i in range(400):
+            tz_name, offset = zones[i % len(zones)]
+            day, hour, minute = 1 + i % 28, 10 + i % 10, (i * 5) % 60
+            apt_data = {
+                'date': f"2025-09-{day:02d}", 'timezone': tz_name,
+                'datetime': f"2025-09-{day:02d}T{hour:02d}:{minute:02d}:00{offset}",
+                'endTime': f"{(hour + 2) % 12 or 12}:{minute:02d}{'pm' if hour + 2 >= 12 else 'am'}",
+            }
+            self.assertSameParse(apt_data, 'datetime')
+            self.assertSameParse(apt_data, 'endTime')
+
+
+class ResolveTimezoneTests(TestCase):
+    """Appointment timezones resolved from the calendar timezone and the UTC offset."""
+
+    def setUp(self):
+        from .timezones import resolve_timezone
+        resolve_timezone.cache_clear()
+
+    def test_calendar_timezone_wins_when_it_fits(self):
+        from .timezones import resolve_timezone
+        # -0700 in July is both Pacific daylight time and Arizona's MST
+        self.assertEqual(resolve_timezone('America/Phoenix', '-0700', date(2025, 7, 1)), 'America/Phoenix')
+        self.assertEqual(resolve_timezone('', '-0700', date(2025, 7, 1)), 'America/Los_Angeles')
+        # A calendar zone that does not fit the offset is not used
+        self.assertEqual(resolve_timezone('America/New_York', '-0500', '2025-07-01'), 'America/Chicago')
+        self.assertEqual(resolve_timezone('America/New_York', '-0500', '2025-01-15'), 'America/New_York')
+
+    def test_fallback_labels(self):
+        from .timezones import resolve_timezone
+        self.assertEqual(resolve_timezone('America/Denver', '', '2025-07-01'), 'America/Denver')
+        self.assertEqual(resolve_timezone('', '', '2025-07-01'), 'UTC')
+        self.assertEqual(resolve_timezone('America/Denver', 'Z', '2025-07-01'), 'UTC')
+        # No candidate zone uses the offset: a fixed label, as the previous resolver returned
+        self.assertEqual(resolve_timezone('America/New_York', '+0530', '2025-07-01'), 'UTC+05:30')
+        self.assertEqual(resolve_timezone('', '-0330', '2025-07-01'), 'UTC-03:30')
+        # An unknown calendar zone or a malformed date does not raise
+        self.assertEqual(resolve_timezone('Mars/Olympus', '-0400', '2025-07-01'), 'America/New_York')
+        self.assertEqual(resolve_timezone('America/Denver', '-0600', 'not a date'), 'America/Denver')
+        self.assertEqual(resolve_timezone('', '-0600', None), 'UTC')
+
+    def test_resolver_reads_acuity_datetimes(self):
+        from .timezones import CalendarTimezoneResolver, split_offset
+        self.assertEqual(split_offset('2025-09-13T18:00:00-0400'), ('2025-09-13', '-0400'))
+        self.assertEqual(split_offset('2025-09-13T18:00:00-04:00'), ('2025-09-13', '-0400'))
+        self.assertEqual(split_offset('2025-09-13T22:00:00Z'), ('2025-09-13', 'Z'))
+        self.assertEqual(split_offset('7:30pm'), ('', ''))
+        resolver = CalendarTimezoneResolver.from_acuity_calendars([
+            {'id': 1, 'timezone': 'America/Phoenix'}, {'id': 2, 'timezone': ''},
+        ])
+        self.assertEqual(resolver.resolve(1, '2025-07-01T18:00:00-07:00'), 'America/Phoenix')
+        self.assertEqual(resolver.resolve(2, '2025-07-01T18:00:00-0700'), 'America/Los_Angeles')
+        self.assertEqual(resolver.resolve(None, '7:30pm'), 'UTC')
+
+
+class BatchDatetimeTests(TestCase):
+    """Vectorized UTC -> local conversion across DST transitions."""
+
+    # (zone, a UTC instant where its offset changes)
+    TRANSITIONS = [
+        ('America/New_York', datetime(2025, 3, 9, 7, 0)),
+        ('America/New_York', datetime(2025, 11, 2, 6, 0)),
+        ('America/Los_Angeles', datetime(2025, 11, 2, 9, 0)),
+        ('Europe/London', datetime(2025, 3, 30, 1, 0)),
+        ('Australia/Lord_Howe', datetime(2025, 4, 5, 15, 0)),  # 30-minute DST shift
+        ('America/Phoenix', datetime(2025, 3, 9, 9, 0)),  # no DST at all
+        ('Pacific/Auckland', datetime(2024, 12, 31, 23, 30)),  # local new year
+    ]
+
+    def expected_local(self, utc_values, zone_name):
+        from zoneinfo import ZoneInfo
+        return [value.replace(tzinfo=dt_timezone.utc).astimezone(ZoneInfo(zone_name)).replace(tzinfo=None)
+                for value in utc_values]
+
+    def test_every_minute_around_transitions(self):
+        from .batch_datetimes import datetimes_to_local
+        for zone_name, transition in self.TRANSITIONS:
+            utc_values = [transition + timedelta(minutes=minute) for minute in range(-180, 181)]
+            utc_values += [transition - timedelta(seconds=1), transition]
+            local = datetimes_to_local(utc_values, [zone_name] * len(utc_values))
+            self.assertEqual(local, self.expected_local(utc_values, zone_name), zone_name)
+
+    def test_new_york_edges(self):
+        from .batch_datetimes import datetimes_to_local
+        local = datetimes_to_local(
+            [datetime(2025, 3, 9, 6, 59, 59), datetime(2025, 3, 9, 7, 0),
+             datetime(2025, 11, 2, 5, 59, 59), datetime(2025, 11, 2, 6, 0, tzinfo=dt_timezone.utc), None],
+            ['America/New_York'] * 5,
+        )
+        # 01:59:59 EDT and the repeated 01:00 EST are one second apart in UTC
+        self.assertEqual(local, [
+            datetime(2025, 3, 9, 1, 59, 59), datetime(2025, 3, 9, 3, 0),
+            datetime(2025, 11, 2, 1, 59, 59), datetime(2025, 11, 2, 1, 0), None,
+        ])
+
+    def test_without_numpy_gives_the_same_result(self):
+        from unittest import mock
+        from . import batch_datetimes
+        utc_values = [transition + timedelta(minutes=minute)
+                      for _, transition in self.TRANSITIONS for minute in (-61, -1, 0, 1, 61)]
+        zones = [zone_name for zone_name, _ in self.TRANSITIONS for _ in range(5)] + ['Not/A_Zone', '']
+        utc_values += [datetime(2025, 6, 1, 12, 0)] * 2
+        vectorized = batch_datetimes.datetimes_to_local(utc_values, zones)
+        with mock.patch.object(batch_datetimes, 'np', None):
+            self.assertEqual(batch_datetimes.datetimes_to_local(utc_values, zones), vectorized)
+        # Unknown zones stay in UTC
+        self.assertEqual(vectorized[-2:], [datetime(2025, 6, 1, 12, 0)] * 2)
+
+
+class ConfirmationFitTests(TestCase):
+    """One-page fitting of confirmations: binary search over font sizes and its cache."""
+
+    def setUp(self):
+        from . import pdf_generator
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root, True)
+        # The pricing version stamp (part of the layout signature) lives in the PDF cache directory
+        settings_override = override_settings(PDF_CACHE_DIR=cache_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        pdf_generator._FONT_SIZE_CACHE.clear()
+        self.addCleanup(pdf_generator._FONT_SIZE_CACHE.clear)
+
+    def appointment(self, notes='', guests=10):
+        start = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        return Appointment(
+            acuity_appointment_id='1', client_name='John Smith', client_phone='555-0100',
+            start_time=start, end_time=start + timedelta(hours=2), original_timezone='America/New_York',
+            form_data=[{'values': [
+                {'name': 'Address of the event', 'value': '19 Main St, Newark, NJ 07102'},
+                {'name': 'How many adults?', 'value': str(guests)},
+                {'name': 'Order', 'value': '10 adults chicken steak, 4 adults shrimp'},
+                {'name': 'Note / Allergy / Restrictions', 'value': notes},
+            ]}],
+        )
+
+    def chosen_size(self, generator, appointment):
+        from .pdf_generator import _FONT_SIZE_CACHE
+        generator._fit_confirmation_elements(appointment)
+        return _FONT_SIZE_CACHE[generator._layout_signature(appointment)]
+
+    def test_binary_search_picks_the_largest_size_that_fits(self):
+        from .pdf_generator import CONFIRMATION_FONT_SIZES, PDFGenerator, fits_on_one_page
+        generator = PDFGenerator()
+        chosen = set()
+        for notes in ('', 'peanuts', 'No shellfish, one guest is allergic to sesame. ' * 12, 'Long note. ' * 120):
+            appointment = self.appointment(notes)
+            fitting = [
+                font_size for font_size in CONFIRMATION_FONT_SIZES
+                if fits_on_one_page(generator._build_elements_dynamic(
+                    appointment, font_size=font_size, spacing=max(font_size - 2, 2)))
+            ]
+            expected = (max(fitting), max(max(fitting) - 2, 2)) if fitting else (8, 2)
+            self.assertEqual(self.chosen_size(generator, appointment), expected, notes[:30])
+            chosen.add(expected)
+        # The samples exercise a larger size, the smallest one and the fallback
+        self.assertEqual(chosen, {(10, 8), (8, 6), (8, 2)})
+
+    def test_fitting_confirmation_is_one_page(self):
+        import io
+        from PyPDF2 import PdfReader
+        from .pdf_generator import PDFGenerator
+        for notes in ('', 'peanuts'):
+            pdf = PDFGenerator().generate_appointment_confirmation(self.appointment(notes))
+            self.assertEqual(len(PdfReader(io.BytesIO(pdf)).pages), 1, notes)
+
+    def test_chosen_size_is_cached_per_content_and_prices(self):
+        from unittest import mock
+        from .pdf_generator import PDFGenerator, _FONT_SIZE_CACHE
+        from .pricing import bump_pricing_version
+        generator = PDFGenerator()
+        appointment = self.appointment('peanuts')
+        generator._fit_confirmation_elements(appointment)
+        with mock.patch.object(generator, '_build_elements_dynamic', wraps=generator._build_elements_dynamic) as build:
+            generator._fit_confirmation_elements(appointment)
+            self.assertEqual(build.call_count, 1)
+            # Other content is measured again
+            generator._fit_confirmation_elements(self.appointment('shellfish'))
+            self.assertGreater(build.call_count, 2)
+            # So is the same content once prices changed
+            signature = generator._layout_signature(appointment)
+            bump_pricing_version()
+            self.assertNotEqual(generator._layout_signature(appointment), signature)
+            calls = build.call_count
+            generator._fit_confirmation_elements(appointment)
+            self.assertGreater(build.call_count, calls + 1)
+        self.assertEqual(len(_FONT_SIZE_CACHE), 3)
+
+    def test_cache_is_bounded(self):
+        from unittest import mock
+        from . import pdf_generator
+        generator = pdf_generator.PDFGenerator()
+        with mock.patch.object(pdf_generator, 'FONT_SIZE_CACHE_LIMIT', 2):
+            for guests in (10, 11, 12):
+                generator._fit_confirmation_elements(self.appointment(guests=guests))
+        self.assertEqual(len(pdf_generator._FONT_SIZE_CACHE), 1)
+
+
+class StaticImageTests(TestCase):
+    """The seating image: encoded once per process, embedded once per document."""
+
+    def render(self, pages=2):
+        import io
+        import re
+        from reportlab.platypus import PageBreak, SimpleDocTemplate
+        from .pdf_generator import SEATING_IMAGE_PATH, SEATING_IMAGE_SIZE, StaticImage, encoded_image
+        encoded = encoded_image(SEATING_IMAGE_PATH, SEATING_IMAGE_SIZE[0])
+        elements = []
+        for page in range(pages):
+            if page:
+                elements.append(PageBreak())
+            elements.append(StaticImage(encoded, SEATING_IMAGE_PATH, *SEATING_IMAGE_SIZE))
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer).build(elements)
+        pdf = buffer.getvalue()
+        return pdf.count(b'/Subtype /Image'), [int(width) for width in re.findall(rb'/Width (\d+)', pdf)]
+
+    def test_encoded_stream_is_embedded_once(self):
+        from .pdf_generator import IMAGE_PIXELS_PER_POINT, SEATING_IMAGE_SIZE
+        images, widths = self.render()
+        self.assertEqual(images, 1)
+        self.assertEqual(widths, [SEATING_IMAGE_SIZE[0] * IMAGE_PIXELS_PER_POINT])
+
+    def test_falls_back_to_plain_draw_image(self):
+        from unittest import mock
+        from . import pdf_generator
+        for patch in (mock.patch.object(pdf_generator, '_digester', None),
+                      mock.patch.object(pdf_generator, 'STATIC_IMAGE_REPORTLAB_VERSIONS', ())):
+            with patch:
+                self.assertFalse(pdf_generator.static_images_supported())
+                images, widths = self.render()
+            # drawImage encodes the file itself, at full size, still once per document
+            self.assertEqual(images, 1)
+            self.assertGreater(widths[0], pdf_generator.SEATING_IMAGE_SIZE[0] * pdf_generator.IMAGE_PIXELS_PER_POINT)
@@ -0,0 +1,123 @@
+# scheduling/timezones.py
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from .utils import get_zoneinfo
+
+# Zones tried, in order, when an appointment carries only a UTC offset and its
+# calendar's own zone does not match. Zones sharing an offset on a given date
+# are ambiguous, so the calendar timezone always wins when it fits.
+CANDIDATE_ZONES = [
+    'America/New_York',
+    'America/Chicago',
+    'America/Denver',
+    'America/Los_Angeles',
+    'America/Phoenix',
+    'America/Anchorage',
+    'Pacific/Honolulu',
+]
+
+
+def split_offset(datetime_str):
+    """
+    Split an Acuity datetime like '2025-09-13T18:00:00-0400' into its date
+    and offset ('-0400', or 'Z').
+
+    Returns:
+        tuple: (date string, offset string), either may be '' if absent
+    """
+    if not datetime_str or 'T' not in datetime_str:
+        return '', ''
+    if datetime_str.endswith('Z'):
+        return datetime_str[:10], 'Z'
+    tail = datetime_str[-6:].replace(':', '') if datetime_str[-3:-2] == ':' else datetime_str[-5:]
+    if len(tail) == 5 and tail[0] in ('+', '-') and tail[1:].isdigit():
+        return datetime_str[:10], tail
+    return datetime_str[:10], ''
+
+
+def _offset_minutes(offset):
+    minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+    return -minutes if offset[0] == '-' else minutes
+
+
+def _zone_matches(zone_name, on_date, minutes):
+    try:
+        zone = get_zoneinfo(zone_name)
+    except Exception:
+        return False
+    # Midday avoids the DST transition hour itself
+    offset = zone.utcoffset(datetime(on_date.year, on_date.month, on_date.day, 12))
+    return offset == timedelta(minutes=minutes)
+
+
+@lru_cache(maxsize=4096)
+def resolve_timezone(calendar_timezone, offset, on_date):
+    """
+    Resolve the IANA zone for an offset observed on a date.
+
+    The (calendar timezone, offset, date) triple is cached, so after the first
+    appointment of a calendar/day every lookup is a dict hit.
+
+    Args:
+        calendar_timezone: the calendar's IANA timezone, or '' if unknown
+        offset: '-0400' style offset, 'Z', or ''
+        on_date: datetime.date or 'YYYY-MM-DD' string the offset applies to
+
+    Returns:
+        string: an IANA zone name, 'UTC', or a fixed 'UTC-HH:MM' label when no
+        known zone uses that offset on that date
+    """
+    if not offset:
+        return calendar_timezone or 'UTC'
+    if offset == 'Z':
+        return 'UTC'
+    try:
+        if isinstance(on_date, str):
+            on_date = date.fromisoformat(on_date[:10])
+        elif not isinstance(on_date, date):
+            raise TypeError(f"Expected a date, got {on_date!r}")
+        minutes = _offset_minutes(offset)
+    except (TypeError, ValueError):
+        return calendar_timezone or 'UTC'
+
+    if calendar_timezone and _zone_matches(calendar_timezone, on_date, minutes):
+        return calendar_timezone
+    for zone_name in CANDIDATE_ZONES:
+        if _zone_matches(zone_name, on_date, minutes):
+            return zone_name
+    sign = '-' if minutes < 0 else '+'
+    return f"UTC{sign}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
+
+
+class CalendarTimezoneResolver:
+    """
+    Resolves appointment timezones from their calendar's timezone.
+
+    Calendar timezones come from `Calendar.timezone` (filled by
+    `sync_calendars`) or from the Acuity calendar list directly.
+    """
+
+    def __init__(self, calendar_timezones=None):
+        self.calendar_timezones = dict(calendar_timezones or {})
+
+    @classmethod
+    def from_database(cls):
+        from .models import Calendar
+        return cls(Calendar.objects.exclude(timezone='').values_list('acuity_calendar_id', 'timezone'))
+
+    @classmethod
+    def from_acuity_calendars(cls, calendars_data):
+        return cls({
+            str(cal['id']): cal.get('timezone', '')
+            for cal in calendars_data
+            if cal.get('timezone')
+        })
+
+    def calendar_timezone(self, calendar_id):
+        return self.calendar_timezones.get(str(calendar_id), '') if calendar_id is not None else ''
+
+    def resolve(self, calendar_id, datetime_str):
+        """Timezone for an appointment of `calendar_id` starting at the Acuity `datetime_str`."""
+        on_date, offset = split_offset(datetime_str)
+        return resolve_timezone(self.calendar_timezone(calendar_id), offset, on_date)
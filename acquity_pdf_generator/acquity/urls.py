@@ -9,6 +9,7 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
     path('calendar/<int:calendar_id>/', views.calendar_appointments, name='calendar_appointments'),
     path('calendar/<int:calendar_id>/export-pdf/', views.generate_pdf, name='generate_pdf'),
+    path('calendar/<int:calendar_id>/export-confirmations/', views.export_confirmations, name='export_confirmations'),
     path('appointment/<int:appointment_id>/', views.appointment_detail, name='appointment_detail'),
     path('appointment/<int:appointment_id>/pdf/', views.download_pdf, name='download_pdf'),
     path('sync/', views.sync_data, name='sync_data'),
@@ -1,18 +1,165 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def normalize_field_name(name):
+    """Key used for a form field name in Appointment.form_fields."""
+    return (name or '').strip().lower()
+
+
+def flatten_form_data(forms):
+    """
+    Flatten Acuity form data into {normalized field name: value}.
+
+    The first field wins when several forms repeat a name, as it does for
+    get_form_field on the raw form list.
+    """
+    fields = {}
+    for form in forms or []:
+        for field in form.get('values', []):
+            fields.setdefault(normalize_field_name(field.get('name', '')), field.get('value'))
+    return fields
+
+
 def get_form_field(forms, possible_names):
     """
     Extracts the value for any of the possible field names from Acuity form data.
-    - forms: list of form dicts (from Acuity API or DB)
+    - forms: list of form dicts (from Acuity API or DB), or the flattened dict
+      stored in Appointment.form_fields (see flatten_form_data)
     - possible_names: list of str, possible field names (case-insensitive, partial match allowed)
     """
+    names = tuple(name.lower() for name in possible_names)
+    if isinstance(forms, dict):
+        key = form_field_key(tuple(forms), names)
+        return forms.get(key) if key is not None else None
     for form in forms or []:
         for field in form.get('values', []):
             field_name = field.get('name', '').strip().lower()
-            for name in possible_names:
-                if name.lower() in field_name:
+            for name in names:
+                if name in field_name:
                     return field.get('value')
     return None
 
 
+@lru_cache(maxsize=4096)
+def form_field_key(field_names, possible_names):
+    """
+    The first of `field_names` (normalized form field names) that contains
+    any of `possible_names`, or None.
+
+    Cached per form layout: appointments of the same intake form share their
+    field names, so get_form_field resolves an alias once and then reads the
+    value with a dict lookup.
+    """
+    for field_name in field_names:
+        for name in possible_names:
+            if name in field_name:
+                return field_name
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_zoneinfo(timezone_str):
+    """
+    Return the ZoneInfo for an IANA name, built once per process.
+
+    Raises ZoneInfoNotFoundError (or ValueError for malformed keys) like ZoneInfo itself.
+    """
+    return ZoneInfo(timezone_str)
+
+
+@lru_cache(maxsize=256)
+def _parse_utc_offset(offset_str):
+    """'-0400', '-04:00' or 'Z' -> timedelta, or None if it is not an offset."""
+    if offset_str == 'Z':
+        return timedelta(0)
+    if len(offset_str) == 6 and offset_str[3] == ':':
+        offset_str = offset_str[:3] + offset_str[4:]
+    if len(offset_str) != 5 or offset_str[0] not in '+-' or not offset_str[1:].isdigit():
+        return None
+    offset = timedelta(hours=int(offset_str[1:3]), minutes=int(offset_str[3:5]))
+    return -offset if offset_str[0] == '-' else offset
+
+
+def fast_parse_acuity_datetime(time_str, date_str=None, timezone_str=None):
+    """
+    Fast path for the two datetime shapes the Acuity API actually sends.
+
+    1. '2025-09-13T18:00:00-0400' (also '-04:00' or 'Z'): parsed by slicing,
+       with the offset resolved once per distinct offset string.
+    2. '7:30pm' plus a 'YYYY-MM-DD' date and an IANA timezone name, using a
+       cached ZoneInfo.
+
+    Returns:
+        datetime in UTC (naive for case 2 without a timezone, as the slow path
+        does), or None when the input is anything else; callers then fall back
+        to the full parser.
+    """
+    if not time_str:
+        return None
+    try:
+        if len(time_str) >= 20 and time_str[10] == 'T':
+            if time_str[4] != '-' or time_str[7] != '-' or time_str[13] != ':' or time_str[16] != ':':
+                return None
+            offset = _parse_utc_offset(time_str[19:])
+            if offset is None:
+                return None
+            local = datetime(
+                int(time_str[0:4]), int(time_str[5:7]), int(time_str[8:10]),
+                int(time_str[11:13]), int(time_str[14:16]), int(time_str[17:19]),
+                tzinfo=dt_timezone.utc,
+            )
+            return local - offset
+
+        meridiem = time_str[-2:].lower()
+        if meridiem not in ('am', 'pm') or not date_str or len(date_str) != 10:
+            return None
+        hour_str, _, minute_str = time_str[:-2].partition(':')
+        hour, minute = int(hour_str), int(minute_str)
+        if len(minute_str) != 2 or not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+        if date_str[4] != '-' or date_str[7] != '-':
+            return None
+        naive = datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]), hour, minute)
+        if not timezone_str:
+            return naive
+        return naive.replace(tzinfo=get_zoneinfo(timezone_str)).astimezone(dt_timezone.utc)
+    except (ValueError, ZoneInfoNotFoundError):
+        return None
+
+
+def local_day_start(day):
+    """
+    Midnight of a calendar day in the event's own timezone, in the form stored
+    in Appointment.local_start_time (wall clock with a UTC label).
+
+    Filter a local date range [first, last] as the half-open range
+    local_start_time >= local_day_start(first) and
+    local_start_time < local_day_start(last + 1 day), which can use the
+    (calendar, local_start_time) index.
+    """
+    return datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+
+
+def filter_local_date_range(queryset, first_day=None, last_day=None):
+    """
+    Appointments of the queryset whose event starts on a local day in
+    [first_day, last_day]; either bound may be None. Shared by the dashboard
+    and calendar pages, so both filter the way local_day_start describes.
+    """
+    if first_day:
+        queryset = queryset.filter(local_start_time__gte=local_day_start(first_day))
+    if last_day:
+        queryset = queryset.filter(local_start_time__lt=local_day_start(last_day + timedelta(days=1)))
+    return queryset
+
+
 def convert_to_local_time(utc_time, timezone_str):
     """
     Convert a UTC datetime to the specified local timezone.
@@ -25,13 +172,8 @@ def convert_to_local_time(utc_time, timezone_str):
         datetime object in the specified timezone, or original time if conversion fails
     """
     try:
-        try:
-            from zoneinfo import ZoneInfo
-        except ImportError:
-            from backports.zoneinfo import ZoneInfo
-            
         if timezone_str and utc_time:
-            target_tz = ZoneInfo(timezone_str)
+            target_tz = get_zoneinfo(timezone_str)
             return utc_time.astimezone(target_tz)
     except Exception:
         pass
@@ -59,9 +201,37 @@ def format_time_in_timezone(dt, timezone_str, format_str='%A, %B %d, %Y at %I:%M
     return 'N/A'
 
 
+# Django template format characters and their strftime equivalents
+DJANGO_TO_PYTHON_FORMAT = {
+    'Y': '%Y',  # Year, 4 digits
+    'y': '%y',  # Year, 2 digits
+    'n': '%m',  # Month, no leading zero
+    'm': '%m',  # Month, leading zero
+    'F': '%B',  # Full month name
+    'M': '%b',  # Abbreviated month name
+    'j': '%d',  # Day, no leading zero
+    'd': '%d',  # Day, leading zero
+    'D': '%a',  # Abbreviated day name
+    'l': '%A',  # Full day name
+    'g': '%I',  # Hour, 12-hour format, no leading zero
+    'h': '%I',  # Hour, 12-hour format, leading zero
+    'H': '%H',  # Hour, 24-hour format, leading zero
+    'G': '%H',  # Hour, 24-hour format, no leading zero
+    'i': '%M',  # Minutes, leading zero
+    's': '%S',  # Seconds, leading zero
+    'A': '%p',  # AM/PM
+    'a': '%p',  # am/pm
+}
+
+
+@lru_cache(maxsize=256)
 def django_format_to_python_format(django_format):
     """
     Convert Django template format strings to Python strftime format strings.
+
+    Translated in a single pass, so an inserted '%a' is never translated
+    again; backslash-escaped characters and other text are kept literally.
+    Results are memoized per format string.
     
     Args:
         django_format: Django template format string (e.g., "M d, Y, g:i A")
@@ -69,30 +239,36 @@ def django_format_to_python_format(django_format):
     Returns:
         Python strftime format string
     """
-    # Common Django to Python format mappings
-    format_mapping = {
-        'Y': '%Y',  # Year, 4 digits
-        'y': '%y',  # Year, 2 digits
-        'n': '%m',  # Month, no leading zero
-        'm': '%m',  # Month, leading zero
-        'F': '%B',  # Full month name
-        'M': '%b',  # Abbreviated month name
-        'j': '%d',  # Day, no leading zero
-        'd': '%d',  # Day, leading zero
-        'D': '%a',  # Abbreviated day name
-        'l': '%A',  # Full day name
-        'g': '%I',  # Hour, 12-hour format, no leading zero
-        'h': '%I',  # Hour, 12-hour format, leading zero
-        'H': '%H',  # Hour, 24-hour format, leading zero
-        'G': '%H',  # Hour, 24-hour format, no leading zero
-        'i': '%M',  # Minutes, leading zero
-        's': '%S',  # Seconds, leading zero
-        'A': '%p',  # AM/PM
-        'a': '%p',  # am/pm
-    }
-    
-    python_format = django_format
-    for django_char, python_char in format_mapping.items():
-        python_format = python_format.replace(django_char, python_char)
-    
-    return python_format 
\ No newline at end of file
+    parts = []
+    escaped = False
+    for char in django_format:
+        if escaped:
+            parts.append('%%' if char == '%' else char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in DJANGO_TO_PYTHON_FORMAT:
+            parts.append(DJANGO_TO_PYTHON_FORMAT[char])
+        else:
+            parts.append('%%' if char == '%' else char)
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=512)
+def timezone_formatter(timezone_str, django_format):
+    """
+    Return a function formatting a UTC datetime in `timezone_str` with a
+    Django format string, built once per (zone, format) pair.
+
+    With an empty `timezone_str` the datetime is formatted as is, e.g. for the
+    precomputed local columns of Appointment.
+    """
+    python_format = django_format_to_python_format(django_format)
+    if not timezone_str:
+        return lambda dt: dt.strftime(python_format)
+    try:
+        zone = get_zoneinfo(timezone_str)
+    except Exception:
+        # Unknown zone: format the UTC value, as convert_to_local_time does
+        return lambda dt: dt.strftime(python_format)
+    return lambda dt: dt.astimezone(zone).strftime(python_format)
@@ -3,14 +3,22 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
 from .models import User, Calendar, UserCalendar, AppointmentType, Appointment, PDFGenerationLog
 from .services import AcuityService
 from .pdf_generator import PDFGenerator
+from .utils import filter_local_date_range
+from .export import EXPORT_FORMATS, confirmation_filename, export_appointments, merged_pdf, stream_zip
+from .search import search_appointments
+from . import render_pool
+from .prerender import prerender_in_background
 from datetime import datetime, timedelta
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import json
+import os
+import tempfile
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
 from django.utils import timezone
@@ -55,33 +63,30 @@ def dashboard(request):
     start_date = request.GET.get('start_date', '')
     end_date = request.GET.get('end_date', '')
     
+    start_day = end_day = None
     if start_date:
         try:
-            start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-            all_appointments = all_appointments.filter(start_time__date__gte=start_datetime.date())
+            start_day = datetime.strptime(start_date, '%Y-%m-%d').date()
         except ValueError:
             start_date = ''
     
     if end_date:
         try:
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
-            all_appointments = all_appointments.filter(start_time__date__lte=end_datetime.date())
+            end_day = datetime.strptime(end_date, '%Y-%m-%d').date()
         except ValueError:
             end_date = ''
+    all_appointments = filter_local_date_range(all_appointments, start_day, end_day)
 
     # Apply search filter if present
     search_query = request.GET.get('q', '')
     if search_query:
-        appointments_to_display = all_appointments.filter(
-            Q(client_name__icontains=search_query) |
-            Q(client_email__icontains=search_query) |
-            Q(appointment_type__name__icontains=search_query)
-        )
+        # Full-text index, best matches first
+        appointments_to_display = search_appointments(all_appointments, search_query)
     else:
-        appointments_to_display = all_appointments
+        appointments_to_display = all_appointments.order_by('start_time')
 
     # Pagination for appointments
-    paginator = Paginator(appointments_to_display.order_by('start_time'), 10)
+    paginator = Paginator(appointments_to_display, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
@@ -194,41 +199,32 @@ def generate_pdf(request, calendar_id):
     end_date = None
     if start_date_str:
         try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
         except (ValueError, TypeError):
             messages.error(request, 'Invalid start date format. Please use YYYY-MM-DD.')
             return redirect('calendar_appointments', calendar_id=calendar_id)
     if end_date_str:
         try:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
         except (ValueError, TypeError):
             messages.error(request, 'Invalid end date format. Please use YYYY-MM-DD.')
             return redirect('calendar_appointments', calendar_id=calendar_id)
     
-    # Get appointments
-    acuity_service = AcuityService()
-    try:
-        appointments_data = acuity_service.get_appointments(
-        calendar_id=calendar.acuity_calendar_id,
-        start_date=start_date,
-        end_date=end_date
-    )
-        print(f"Fetched {len(appointments_data)} appointments for calendar {calendar.name}")
-    except Exception as e:
-        import logging
-        logging.exception('Unexpected error fetching appointments for PDF')
-        messages.error(request, f'An error occurred while fetching appointments: {str(e)}')
-        return redirect('calendar_appointments', calendar_id=calendar_id)
+    # The report reads the synced appointments; ?refresh=1 syncs the calendar's report range from Acuity first
+    if request.GET.get('refresh'):
+        try:
+            AcuityService().sync_appointments_by_date_range(
+                start_date, end_date, calendar_id=calendar.acuity_calendar_id,
+            )
+        except Exception as e:
+            import logging
+            logging.exception('Unexpected error syncing appointments for PDF')
+            messages.error(request, f'An error occurred while syncing appointments: {str(e)}')
+            return redirect('calendar_appointments', calendar_id=calendar_id)
     
-    # Generate PDF
-    pdf_generator = PDFGenerator()
+    # Generate PDF in the render pool, into a temporary file that is streamed back
     try:
-        # Title
-        title = Paragraph(f"Appointments Report - {calendar.name}", pdf_generator.title_style)
-        elements = [title]
-        elements.append(Spacer(1, 20))
-        
-        pdf_content = pdf_generator.generate_appointment_pdf(appointments_data, calendar.name)
+        report_path = render_pool.render_calendar_report_file(calendar, start_date, end_date)
         print(f"PDF generated successfully for calendar {calendar.name}")
     except Exception as e:
         import logging
@@ -236,12 +232,11 @@ def generate_pdf(request, calendar_id):
         messages.error(request, f'An error occurred while generating the PDF: {str(e)}')
         return redirect('calendar_appointments', calendar_id=calendar_id)
     
-    # Return PDF response
-    response = HttpResponse(pdf_content, content_type='application/pdf')
+    # Return PDF response; the open file outlives its (already removed) directory entry
+    report_file = open(report_path, 'rb')
+    os.unlink(report_path)
     filename = f"appointments_{calendar.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename=\"{filename}\"'
-    
-    return response
+    return FileResponse(report_file, as_attachment=True, filename=filename, content_type='application/pdf')
 
 # Admin Views
 # @login_required
@@ -420,33 +415,30 @@ def dashboard(request):
     start_date = request.GET.get('start_date', '')
     end_date = request.GET.get('end_date', '')
     
+    start_day = end_day = None
     if start_date:
         try:
-            start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-            all_appointments = all_appointments.filter(start_time__date__gte=start_datetime.date())
+            start_day = datetime.strptime(start_date, '%Y-%m-%d').date()
         except ValueError:
             start_date = ''
     
     if end_date:
         try:
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
-            all_appointments = all_appointments.filter(start_time__date__lte=end_datetime.date())
+            end_day = datetime.strptime(end_date, '%Y-%m-%d').date()
         except ValueError:
             end_date = ''
+    all_appointments = filter_local_date_range(all_appointments, start_day, end_day)
 
     # Apply search filter if present
     search_query = request.GET.get('q', '')
     if search_query:
-        appointments_to_display = all_appointments.filter(
-            Q(client_name__icontains=search_query) |
-            Q(client_email__icontains=search_query) |
-            Q(appointment_type__name__icontains=search_query)
-        )
+        # Full-text index, best matches first
+        appointments_to_display = search_appointments(all_appointments, search_query)
     else:
-        appointments_to_display = all_appointments
+        appointments_to_display = all_appointments.order_by('start_time')
 
     # Pagination for appointments
-    paginator = Paginator(appointments_to_display.order_by('start_time'), 10)
+    paginator = Paginator(appointments_to_display, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
@@ -500,7 +492,7 @@ def calendar_appointments(request, calendar_id):
         try:
             start_date_parsed = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             print(f"DEBUG: Parsed start_date: {start_date_parsed}")
-            appointments = appointments.filter(start_time__date__gte=start_date_parsed).order_by('-start_time')
+            appointments = filter_local_date_range(appointments, first_day=start_date_parsed)
             print(f"DEBUG: Appointments after start_date filter: {appointments.count()}")
         except ValueError as e:
             print(f"DEBUG: Error parsing start_date: {e}")
@@ -510,7 +502,7 @@ def calendar_appointments(request, calendar_id):
         try:
             end_date_parsed = datetime.strptime(end_date_str, '%Y-%m-%d').date()
             print(f"DEBUG: Parsed end_date: {end_date_parsed}")
-            appointments = appointments.filter(start_time__date__lte=end_date_parsed).order_by('-start_time')
+            appointments = filter_local_date_range(appointments, last_day=end_date_parsed)
             print(f"DEBUG: Appointments after end_date filter: {appointments.count()}")
         except ValueError as e:
             print(f"DEBUG: Error parsing end_date: {e}")
@@ -566,40 +558,61 @@ def download_pdf(request, appointment_id):
             messages.error(request, "You don't have permission to access this appointment.")
             return redirect('dashboard')
     
-    # Generate PDF
-    pdf_generator = PDFGenerator()
-    pdf_content = pdf_generator.generate_appointment_confirmation(appointment)
+    # Served from the PDF cache unless the appointment or its pricing changed,
+    # otherwise rendered in the render pool
+    try:
+        # Opened by the cache lookup, so a concurrent cache clear cannot remove it first;
+        # streamed from the cache file, with Content-Length
+        pdf_file = render_pool.open_confirmation_file(appointment)
+    except FuturesTimeoutError:
+        messages.error(request, "The PDF is taking too long to generate. Please try again in a moment.")
+        return redirect('appointment_detail', appointment_id=appointment.id)
     
     # Log the PDF generation event
     PDFGenerationLog.objects.create(appointment=appointment, generated_by=request.user)
     
-    # Create response
-    response = HttpResponse(pdf_content, content_type='application/pdf')
-    # --- Custom filename logic ---
-    dt = appointment.start_time
-    month = dt.strftime('%B')  # Full month name
-    day = dt.strftime('%d')    # Day of month
-    time = dt.strftime('%I%M%p').lower()  # 12-hour format, e.g., 0730pm
-    name = appointment.client_name.replace(' ', '').replace('.', '')
-    # Try to extract state from address in form_data or notes
-    state = ''
-    address = ''
-    if hasattr(appointment, 'form_data') and appointment.form_data:
-        for form in appointment.form_data:
-            for field in form.get('values', []):
-                if 'address' in field.get('name', '').lower():
-                    address = field.get('value', '')
-    if not address:
-        address = getattr(appointment, 'notes', '')
-    import re
-    match = re.search(r',\s*([A-Z]{2})\s*\d{5}', address)
-    if match:
-        state = match.group(1)
-    filename = f"{month}-{day}-{time}-{name}"
-    if state:
-        filename += f"-{state}"
-    filename += ".pdf"
+    filename = confirmation_filename(appointment)
+    return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+
+@login_required
+def export_confirmations(request, calendar_id):
+    """Download every confirmation of a calendar in a date range, as a ZIP or one merged PDF"""
+    if request.user.is_superuser:
+        calendar = get_object_or_404(Calendar, id=calendar_id)
+    else:
+        user_calendar = get_object_or_404(UserCalendar, user=request.user, calendar_id=calendar_id, can_view=True)
+        calendar = user_calendar.calendar
+    
+    export_format = request.GET.get('format', 'zip')
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, f"Unknown export format '{export_format}'.")
+        return redirect('calendar_appointments', calendar_id=calendar_id)
+    try:
+        start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date() if request.GET.get('start_date') else None
+        end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date() if request.GET.get('end_date') else None
+    except ValueError:
+        messages.error(request, 'Invalid date format. Please use YYYY-MM-DD.')
+        return redirect('calendar_appointments', calendar_id=calendar_id)
+    
+    appointments = list(export_appointments(calendar, start_date, end_date))
+    if not appointments:
+        messages.error(request, 'No appointments to export in this date range.')
+        return redirect('calendar_appointments', calendar_id=calendar_id)
+    
+    period = '_'.join(d.strftime('%Y%m%d') for d in (start_date, end_date) if d) or 'all'
+    filename = f"confirmations_{calendar.name.replace(' ', '')}_{period}.{export_format}"
+    if export_format == 'zip':
+        # Entries are sent as each confirmation finishes rendering
+        response = StreamingHttpResponse(stream_zip(appointments), content_type='application/zip')
+    else:
+        pdf_file = tempfile.TemporaryFile()
+        merged_pdf(appointments, output=pdf_file)
+        pdf_file.seek(0)
+        response = FileResponse(pdf_file, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename=\"{filename}\"'
+    PDFGenerationLog.objects.bulk_create([
+        PDFGenerationLog(appointment=appointment, generated_by=request.user) for appointment in appointments
+    ])
     
     return response
 
@@ -619,7 +632,9 @@ def sync_data(request):
         acuity_service = AcuityService()
         acuity_service.sync_calendars()
         acuity_service.sync_appointment_types()
-        acuity_service.sync_appointments()
+        changeset = acuity_service.sync_appointments()
+        # Render upcoming confirmations that changed while the response goes out
+        prerender_in_background(changeset.changed_acuity_ids)
         
         # If the request is from our auto-sync script, return a JSON response
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -145,6 +145,30 @@ LOGIN_REDIRECT_URL = '/'
 ACUITY_USER_ID="30621503"
 ACUITY_API_KEY="e242108a459377126a4967738b3e3cf2"
 
+# Acuity /appointments page sizing. Page sizes are powers of two between MIN and MAX and
+# adapt to the observed response size and latency; a decoded page stays under the ceiling.
+# Adaptive sizing needs Acuity to honour the `page` offset; until that is confirmed against
+# the API, pages stay at the 2000 rows of the original single request (acquity/paging.py).
+ACUITY_PAGE_PARAM_SUPPORTED = False
+ACUITY_PAGE_SIZE_INITIAL = 256
+ACUITY_PAGE_SIZE_MIN = 32
+ACUITY_PAGE_SIZE_MAX = 2048
+ACUITY_PAGE_TARGET_SECONDS = 2.0
+ACUITY_SYNC_MEMORY_CEILING_MB = 256
+
+# Rendered appointment confirmations, keyed by a hash of their inputs (acquity/pdf_cache.py)
+PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+# Confirmations of new or changed appointments starting within this many hours are
+# rendered right after a sync (acquity/prerender.py); 0 turns pre-rendering off
+PDF_PRERENDER_HORIZON_HOURS = 72
+# PDF rendering process pool (acquity/render_pool.py): processes per web worker process,
+# None = one per CPU, 0 = render in the web worker. Each gunicorn worker starts its own
+# pool, so keep this small (workers x this many processes). Jobs that take longer than
+# the timeout (seconds) fail.
+PDF_RENDER_WORKERS = 2
+PDF_RENDER_TIMEOUT = 60
+PDF_RENDER_START_METHOD = 'spawn'
+
 import os
 
 STATIC_URL = '/static/'
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Benchmark for rendering appointment confirmation PDFs.
+
+Renders the same confirmations four ways, to separate the two changes:
+
+- as before: the seating image compressed and encoded from the full-size PNG
+  in every document, and every constant region (header, contact bar, notes,
+  footer) laid out from scratch;
+- StaticRegion layouts only (the image still encoded per document);
+- the pre-encoded, downscaled image only (regions laid out per render);
+- both, as the generator now renders.
+
+Checks all four print the same text, and compares time and size per PDF.
+Runs against a throwaway in-memory database with migrations applied.
+
+Measured on 20 confirmations, three runs:
+
+    as before                          514-613 ms/PDF   703 KB
+    static regions only                469-570 ms/PDF   703 KB
+    pre-encoded image only              33-37 ms/PDF    144 KB
+    both                                22-27 ms/PDF    144 KB
+
+Nearly all of the gain is the image: encoding a downscaled copy once instead
+of the full-size PNG per document. The region cache takes another ~10 ms
+(about 1.4x) off a render once the image no longer dominates.
+"""
+import io
+import os
+import sys
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta, timezone as dt_timezone
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'acquity_pdf_generator.settings')
+django.setup()
+
+from django.db import connection
+from PyPDF2 import PdfReader
+from reportlab.platypus import Image
+from acquity import pdf_generator
+from acquity.models import Appointment
+from acquity.pdf_generator import PDFGenerator, warm_caches
+
+NOTES = ['', 'peanuts', 'No shellfish, one guest is allergic to sesame. ' * 4]
+
+
+def build_appointments(count):
+    appointments = []
+    first = datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+    for i in range(count):
+        start = first + timedelta(days=i)
+        appointments.append(Appointment(
+            acuity_appointment_id=str(i), client_name=f'Client {i}', client_phone='555-0100',
+            start_time=start, end_time=start + timedelta(hours=2), original_timezone='America/New_York',
+            form_data=[{'values': [
+                {'name': 'Address of the event', 'value': f'{i} Main St, Newark, NJ 07102'},
+                {'name': 'How many adults?', 'value': str(10 + i % 5)},
+                {'name': 'How many kids?', 'value': str(i % 3)},
+                {'name': 'Travel Fee', 'value': '50'},
+                {'name': 'Deposit (Deducted from Total)', 'value': '100'},
+                {'name': 'Order', 'value': '10 adults chicken steak, 4 adults shrimp'},
+                {'name': 'Note / Allergy / Restrictions', 'value': NOTES[i % len(NOTES)]},
+            ]}],
+        ))
+    return appointments
+
+
+@contextmanager
+def layout(static_image=True, static_regions=True):
+    """Render with either optimisation switched off: the image drawn from its file, or regions laid out per render."""
+    saved = pdf_generator.StaticImage, pdf_generator.StaticRegion
+    if not static_image:
+        pdf_generator.StaticImage = lambda encoded, path, width, height, hAlign: Image(str(path), width, height, hAlign=hAlign)
+    if not static_regions:
+        pdf_generator.StaticRegion = lambda key, build: build()
+    # Cached regions hold the image flowable they were built with
+    pdf_generator._STATIC_REGIONS.regions = {}
+    try:
+        yield
+    finally:
+        pdf_generator.StaticImage, pdf_generator.StaticRegion = saved
+        pdf_generator._STATIC_REGIONS.regions = {}
+
+
+def render_all(generator, appointments):
+    started = time.perf_counter()
+    pdfs = [generator.generate_appointment_confirmation(appointment) for appointment in appointments]
+    return time.perf_counter() - started, pdfs
+
+
+def text(pdf):
+    return [page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages]
+
+
+def report(label, elapsed, pdfs):
+    size = sum(len(pdf) for pdf in pdfs) / len(pdfs)
+    print(f"{label:<38} {elapsed / len(pdfs) * 1000:>8.1f} ms/PDF {size / 1024:>8.0f} KB/PDF")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # Pricing is read from the database: use a throwaway one rather than the settings DB
+    with redirect_stdout(io.StringIO()):
+        settings_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        return run(count)
+    finally:
+        connection.creation.destroy_test_db(settings_db, verbosity=0)
+
+
+def run(count):
+    appointments = build_appointments(count)
+    warm_caches()
+    generator = PDFGenerator()
+    # First pass fills the font size cache, so every run times rendering only
+    render_all(generator, appointments)
+
+    print(f"Rendering {count} confirmations:")
+    runs = {}
+    for label, options in (
+        ("per-render layout and image", dict(static_image=False, static_regions=False)),
+        ("static regions, per-render image", dict(static_image=False, static_regions=True)),
+        ("pre-encoded image, per-render layout", dict(static_image=True, static_regions=False)),
+        ("static regions and pre-encoded image", dict(static_image=True, static_regions=True)),
+    ):
+        with layout(**options):
+            runs[label] = render_all(generator, appointments)
+    texts = [[text(pdf) for pdf in pdfs] for _, pdfs in runs.values()]
+    if any(other != texts[0] for other in texts[1:]):
+        print("Mismatch between the layouts")
+        return 1
+    for label, (elapsed, pdfs) in runs.items():
+        report(label, elapsed, pdfs)
+    baseline = runs["per-render layout and image"][0]
+    for label, (elapsed, _) in list(runs.items())[1:]:
+        print(f"Speedup, {label}: {baseline / elapsed:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for parsing Acuity appointment datetimes.
+
+Compares the fast path (fast_parse_acuity_datetime) against a verbatim copy
+of the parser the syncs ran before it, and against that parser as it is kept
+today as the fallback, on a realistic mix of Acuity payloads; checks all three
+give the same result and prints parses/sec for each.
+
+Measured on 20,000 rows (40,000 parses), best of 5, three runs:
+
+    before    73,000-93,000 parses/sec
+    fast     171,000-179,000 parses/sec    1.8x-2.4x, about 2x
+
+The fallback runs at the same speed as the original: the gain is all in the
+fast path, not in the cached ZoneInfo lookups.
+"""
+import os
+import sys
+import time
+import django
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'acquity_pdf_generator.settings')
+django.setup()
+
+from acquity.services import AcuityService
+
+
+# Verbatim copies of the parser and its UTC helper as they were before the fast
+# path (AcuityService._parse_acuity_datetime and services.safe_convert_to_utc),
+# so the speedup is measured against what the syncs actually ran.
+
+def baseline_safe_convert_to_utc(dt_with_tz, original_tz):
+    """
+    Safely convert a datetime to UTC, with fallback handling for various edge cases.
+    
+    Args:
+        dt_with_tz: datetime object with timezone info
+        original_tz: the original timezone object
+    
+    Returns:
+        tuple: (utc_datetime, success_flag)
+    """
+    try:
+        # Try to convert to UTC
+        utc_dt = dt_with_tz.astimezone(ZoneInfo('UTC'))
+        return utc_dt, True
+    except Exception as e:
+        print(f"Warning: Could not convert to UTC: {e}")
+        try:
+            # Fallback: try to manually adjust the time
+            if hasattr(original_tz, 'utcoffset'):
+                offset = original_tz.utcoffset(dt_with_tz)
+                if offset:
+                    utc_dt = dt_with_tz - offset
+                    utc_dt = utc_dt.replace(tzinfo=ZoneInfo('UTC'))
+                    return utc_dt, True
+        except Exception as fallback_e:
+            print(f"Fallback UTC conversion also failed: {fallback_e}")
+        
+        # Ultimate fallback: return original time with warning
+        print(f"Using original time for appointment due to timezone conversion failure")
+        return dt_with_tz, False
+
+
+def baseline_parse_acuity_datetime(apt_data, time_key):
+    """
+    Parses the many datetime formats returned by the Acuity API.
+    
+    Handles:
+    1. Full ISO-like strings (e.g., '2025-09-13T18:00:00-0400').
+    2. Time-only strings (e.g., '7:30pm') which require a separate 'date' field.
+    3. Multiple date formats for the 'date' field ('YYYY-MM-DD' or 'Month Day, YYYY').
+    
+    IMPORTANT: All times are converted to UTC for storage but preserve original timezone info.
+    """
+    time_str = apt_data.get(time_key)
+    if not time_str:
+        return None, f"Missing '{time_key}' field"
+
+    # Strategy 1: It's an ISO-like string (contains 'T').
+    if 'T' in time_str:
+        try:
+            # Normalize timezone for fromisoformat (for Python < 3.11).
+            if time_str.endswith('Z'):
+                time_str = time_str.replace('Z', '+00:00')
+            elif len(time_str) > 4 and time_str[-5] in ('+', '-') and time_str[-3] != ':':
+                time_str = time_str[:-2] + ':' + time_str[-2:]
+            
+            # Parse the datetime with timezone info
+            dt_with_tz = datetime.fromisoformat(time_str)
+            
+            # Convert to UTC for storage while preserving original timezone
+            if dt_with_tz.tzinfo is not None:
+                # Store the original timezone info for display purposes
+                original_tz = dt_with_tz.tzinfo
+                # Convert to UTC for database storage using safe conversion
+                utc_dt, success = baseline_safe_convert_to_utc(dt_with_tz, original_tz)
+                # Return the UTC time - the timezone info will be stored separately in the database
+                return utc_dt, None
+            else:
+                # No timezone info, assume it's in the client's timezone
+                # We'll need to get this from the appointment data
+                return dt_with_tz, None
+                
+        except (ValueError, TypeError) as e:
+            return None, f"Invalid ISO-like format: {e}"
+
+    # Strategy 2: It's a time string (e.g., "7:30pm").
+    if 'am' in time_str.lower() or 'pm' in time_str.lower():
+        try:
+            date_str = apt_data.get('date')
+            if not date_str:
+                return None, "Missing 'date' field for time-only appointment"
+            
+            # The 'date' field itself can have multiple formats.
+            try:
+                dt_part = datetime.strptime(date_str, '%Y-%m-%d')
+            except ValueError:
+                dt_part = datetime.strptime(date_str, '%B %d, %Y')
+                
+            time_part = datetime.strptime(time_str, '%I:%M%p').time()
+            naive_dt = datetime.combine(dt_part.date(), time_part)
+
+            # Apply timezone if available.
+            tz_str = apt_data.get('timezone')
+            if tz_str:
+                try:
+                    tz = ZoneInfo(tz_str)
+                    dt_with_tz = naive_dt.replace(tzinfo=tz)
+                    # Convert to UTC for storage using safe conversion
+                    utc_dt, success = baseline_safe_convert_to_utc(dt_with_tz, tz)
+                    # Return the UTC time - the timezone info will be stored separately in the database
+                    return utc_dt, None
+                except ZoneInfoNotFoundError:
+                    print(f"Warning: Unknown timezone '{tz_str}' for apt {apt_data.get('id')}. Using naive dt.")
+                    return naive_dt, None
+            return naive_dt, None
+        except (ValueError, TypeError) as e:
+            return None, f"Could not parse date/time combination: {e}"
+    
+    return None, f"Unrecognized datetime format: '{time_str}'"
+
+
+
+def build_samples(count=20000):
+    """Acuity rows as the API returns them: ISO datetimes with offsets and 'h:mmam' end times."""
+    zones = [
+        ('America/New_York', '-0400'),
+        ('America/Chicago', '-0500'),
+        ('America/Denver', '-0600'),
+        ('America/Los_Angeles', '-0700'),
+    ]
+    samples = []
+    for i in range(count):
+        tz_name, offset = zones[i % len(zones)]
+        day = 1 + i % 28
+        hour = 10 + i % 10
+        samples.append({
+            'date': f"2025-09-{day:02d}",
+            'timezone': tz_name,
+            'datetime': f"2025-09-{day:02d}T{hour:02d}:{(i * 5) % 60:02d}:00{offset}",
+            'endTime': f"{(hour + 2) % 12 or 12}:{(i * 5) % 60:02d}{'pm' if hour + 2 >= 12 else 'am'}",
+        })
+    return samples
+
+
+def run(label, parse, samples, repeats=5):
+    """Best of `repeats` passes over the samples."""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        results = []
+        for apt in samples:
+            results.append(parse(apt, 'datetime'))
+            results.append(parse(apt, 'endTime'))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(samples) * 2 / best
+    print(f"{label:<7} {rate:>12,.0f} parses/sec ({best:.3f}s, best of {repeats})")
+    return results, rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    samples = build_samples(count)
+    service = AcuityService()
+
+    baseline_results, baseline_rate = run('before', baseline_parse_acuity_datetime, samples)
+    slow_results, slow_rate = run('slow', service._parse_acuity_datetime_slow, samples)
+    fast_results, fast_rate = run('fast', service._parse_acuity_datetime, samples)
+
+    mismatches = sum(1 for before, fast in zip(baseline_results, fast_results) if before != fast)
+    mismatches += sum(1 for before, slow in zip(baseline_results, slow_results) if before != slow)
+    print(f"Speedup over the original parser: {fast_rate / baseline_rate:.1f}x "
+          f"(its current fallback: {slow_rate / baseline_rate:.1f}x), mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Benchmark for reading intake form fields.
+
+Compares the repeated get_form_field scans a confirmation PDF used to do
+(one nested scan per field) with the single-pass registry extractor, on a
+realistic Acuity form, and checks both return the same values.
+"""
+import os
+import sys
+import time
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'acquity_pdf_generator.settings')
+django.setup()
+
+from acquity.form_fields import FORM_FIELD_PATTERNS, extract_form_fields
+from acquity.utils import flatten_form_data, get_form_field
+
+FORMS = [
+    {'name': 'Contact', 'values': [
+        {'name': 'Full Address', 'value': '19 Main St, Newark, NJ 07102'},
+        {'name': 'Phone (alternate)', 'value': ''},
+        {'name': 'How did you hear about us?', 'value': 'Instagram'},
+    ]},
+    {'name': 'Party details', 'values': [
+        {'name': 'How many adults?', 'value': '14'},
+        {'name': 'How many kids?', 'value': '2'},
+        {'name': 'Lobster Tail (Upgraded Protein)', 'value': '1'},
+        {'name': 'Filet Mignon (Upgraded Protein)', 'value': '1'},
+        {'name': 'Noodle / Rice', 'value': '3'},
+        {'name': 'Appetizer: Pork Gyoza', 'value': '2'},
+        {'name': 'Appetizer: Edamame', 'value': '1'},
+        {'name': 'Additional Premium Protein ($15)', 'value': '0'},
+        {'name': 'Additional Protein ($10)', 'value': '2'},
+        {'name': 'Do you need tables and chairs?', 'value': 'No'},
+        {'name': 'Travel Fee', 'value': '50'},
+        {'name': 'Deposit (Deducted from Total)', 'value': '100'},
+        {'name': 'Processing fee (if any)', 'value': '4'},
+        {'name': 'Order', 'value': '10 adults chicken steak, 4 adults shrimp'},
+        {'name': 'Note / Allergy / Restrictions', 'value': 'peanuts'},
+    ]},
+]
+
+
+def repeated_scans(forms):
+    return {field: get_form_field(forms, fragments) for field, fragments in FORM_FIELD_PATTERNS.items()}
+
+
+def time_it(label, func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<45} {repeat / elapsed:>12,.0f} forms/sec")
+    return elapsed
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    flattened = flatten_form_data(FORMS)
+    expected = repeated_scans(FORMS)
+    if expected != repeated_scans(flattened) or extract_form_fields(FORMS) != expected \
+            or extract_form_fields(flattened) != expected:
+        print("Mismatch between the extractor and get_form_field")
+        return 1
+
+    print(f"Extracting {len(FORM_FIELD_PATTERNS)} fields, {repeat} times:")
+    baseline = time_it("repeated get_form_field scans (form_data)", lambda: repeated_scans(FORMS), repeat)
+    time_it("get_form_field per field (form_fields)", lambda: repeated_scans(flattened), repeat)
+    time_it("single pass (form_data)", lambda: extract_form_fields(FORMS), repeat)
+    single = time_it("single pass (flattened form_fields)", lambda: extract_form_fields(flattened), repeat)
+    print(f"Speedup: {baseline / single:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
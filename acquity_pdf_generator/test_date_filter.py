@@ -47,17 +47,17 @@ def test_date_filtering():
     print(f"\nTesting filter: start_date >= {test_start_date}, end_date <= {test_end_date}")
     
     # Apply start date filter
-    filtered_by_start = appointments.filter(start_time__date__gte=test_start_date)
+    filtered_by_start = appointments.filter(local_date__gte=test_start_date)
     print(f"Appointments after start_date filter: {filtered_by_start.count()}")
     
     # Apply end date filter
-    filtered_by_end = appointments.filter(start_time__date__lte=test_end_date)
+    filtered_by_end = appointments.filter(local_date__lte=test_end_date)
     print(f"Appointments after end_date filter: {filtered_by_end.count()}")
     
     # Apply both filters
     filtered_both = appointments.filter(
-        start_time__date__gte=test_start_date,
-        start_time__date__lte=test_end_date
+        local_date__gte=test_start_date,
+        local_date__lte=test_end_date
     )
     print(f"Appointments after both filters: {filtered_both.count()}")
     
@@ -67,8 +67,8 @@ def test_date_filtering():
     print(f"\nTesting specific range: {specific_start} to {specific_end}")
     
     specific_filtered = appointments.filter(
-        start_time__date__gte=specific_start,
-        start_time__date__lte=specific_end
+        local_date__gte=specific_start,
+        local_date__lte=specific_end
     )
     print(f"Appointments in specific range: {specific_filtered.count()}")
     